@@ -0,0 +1,46 @@
+"""Runs the benchmark suite and prints (or saves) the results as JSON.
+
+Usage:
+    python -m benchmarks [--output results.json] [--skip-crawl] [--urls 200]
+"""
+import argparse
+import json
+import platform
+import time
+
+from . import bench_extractors, bench_orchestrator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extractor and crawler benchmarks")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--pages", type=int, default=5, help="Number of synthetic pages")
+    parser.add_argument("--page-kb", type=int, default=500, help="Size of a synthetic page in KB")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="Measuring time per extractor")
+    parser.add_argument("--urls", type=int, default=200, help="URLs crawled by the end-to-end benchmark")
+    parser.add_argument("--workers", type=int, default=8, help="Workers of the end-to-end benchmark")
+    parser.add_argument("--skip-crawl", action="store_true", help="Only run the extractor benchmark")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "extractors": bench_extractors.run(args.pages, args.page_kb, args.min_seconds)
+    }
+
+    if not args.skip_crawl:
+        results["crawl"] = [
+            bench_orchestrator.run(urls=args.urls, engine=engine, num_processes=args.workers)
+            for engine in ("process", "async", "pipeline")
+        ]
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Extractor benchmark.
+
+Measures pages per second and peak memory of every registered extractor with
+every page reader backend on synthetic product pages.
+"""
+import time
+import tracemalloc
+from typing import Dict, List
+
+from crawler.extractors.engine import JsonLdExtractor
+from crawler.extractors.page_scan import parse_page, read_page
+from crawler.parser import EXTRACTOR_MAP
+
+from .pages import product_page
+
+BACKENDS = {
+    "scan": read_page,
+    "bs4": parse_page
+}
+
+
+def _measure(extractor, pages: List[str], min_seconds: float) -> Dict:
+    extractor(pages[0], "warm-up")
+
+    processed = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds or processed < len(pages):
+        extractor(pages[processed % len(pages)], "bench")
+        processed += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    extractor(pages[0], "bench")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "pages": processed,
+        "seconds": round(elapsed, 4),
+        "pages_per_sec": round(processed / elapsed, 2),
+        "peak_memory_bytes": peak
+    }
+
+
+def run(page_count: int = 5, size_kb: int = 500, min_seconds: float = 1.0) -> Dict:
+    """
+    Runs the extractor benchmark.
+
+    Args:
+        page_count (int): Number of distinct synthetic pages.
+        size_kb (int): Approximate size of each page in kilobytes.
+        min_seconds (float): Minimum measuring time per extractor and backend.
+
+    Returns:
+        Dict: Results keyed by store and backend.
+    """
+    pages = [product_page(seed, size_kb=size_kb, graph=seed % 2 == 0) for seed in range(page_count)]
+
+    results = {}
+    for store, extractor in sorted(EXTRACTOR_MAP.items()):
+        spec = getattr(extractor, "spec", None)
+        if spec is None:
+            continue
+        results[store] = {
+            backend: _measure(JsonLdExtractor(spec, page_reader=reader), pages, min_seconds)
+            for backend, reader in BACKENDS.items()
+        }
+
+    return {
+        "page_count": page_count,
+        "page_bytes": sum(len(page) for page in pages) // len(pages),
+        "extractors": results
+    }
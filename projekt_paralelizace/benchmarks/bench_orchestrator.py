@@ -0,0 +1,146 @@
+"""End-to-end crawler benchmark.
+
+Serves synthetic product pages from a local HTTP server that injects latency
+and crawls them with the real Orchestrator. Every crawl runs in a freshly
+spawned process, so its peak RSS is not inflated by earlier crawls.
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from crawler.orchestrator import Orchestrator
+
+from .pages import product_page
+
+
+class FixtureServer:
+    """
+    Local HTTP server serving synthetic product pages.
+
+    Every response is delayed by a random latency between `min_latency` and
+    `max_latency` seconds. Pages are served from a small pool of generated pages.
+    """
+
+    def __init__(self, min_latency: float = 0.05, max_latency: float = 0.2, size_kb: int = 300, variants: int = 10):
+        pages = [product_page(seed, size_kb=size_kb).encode("utf-8") for seed in range(variants)]
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                time.sleep(random.uniform(min_latency, max_latency))
+                if self.path == "/":
+                    body = b"<html><body>home</body></html>"
+                else:
+                    body = pages[hash(self.path) % len(pages)]
+                server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.requests = 0
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """
+    Returns the largest RSS of this process and its finished child processes.
+
+    Both figures are lifetime maximums, so they only describe one crawl when
+    called from the process that ran it (see _crawl). Children still running,
+    such as a fork server and the processes it started, are not included.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+def _crawl(config: Dict) -> Tuple[float, Optional[int]]:
+    """Runs one crawl and returns its duration and peak RSS; called in a fresh process."""
+    start = time.perf_counter()
+    Orchestrator(config).run()
+    return time.perf_counter() - start, _peak_rss_bytes()
+
+
+def run(urls: int = 200, engine: str = "process", num_processes: int = 8,
+        min_latency: float = 0.05, max_latency: float = 0.2, extra_config: Optional[Dict] = None) -> Dict:
+    """
+    Runs the end-to-end benchmark.
+
+    Args:
+        urls (int): Number of product URLs to crawl.
+        engine (str): Crawl engine passed to the Orchestrator.
+        num_processes (int): Number of worker processes / concurrency.
+        min_latency (float): Minimum injected latency in seconds.
+        max_latency (float): Maximum injected latency in seconds.
+        extra_config (Optional[Dict]): Additional Orchestrator configuration.
+
+    Returns:
+        Dict: Throughput and memory figures of the crawl.
+    """
+    with tempfile.TemporaryDirectory() as work_dir, FixtureServer(min_latency, max_latency) as server:
+        config = {
+            "stores": [{
+                "name": "fixture",
+                "type": "alza",
+                "urls": [f"{server.base_url}/product-{i}.htm" for i in range(urls)]
+            }],
+            "engine": engine,
+            "num_processes": num_processes,
+            "concurrency": num_processes,
+            "per_domain_concurrency": num_processes,
+            "timeout": 30,
+            "output_dir": os.path.join(work_dir, "output"),
+            "logs_dir": os.path.join(work_dir, "logs")
+        }
+        config.update(extra_config or {})
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            elapsed, peak_rss = executor.submit(_crawl, config).result()
+
+        with open(os.path.join(config["output_dir"], "results.csv"), encoding="utf-8") as f:
+            rows = sum(1 for _ in f) - 1
+
+        return {
+            "engine": engine,
+            "workers": num_processes,
+            "urls": urls,
+            "rows": rows,
+            "requests": server.requests,
+            "seconds": round(elapsed, 3),
+            "urls_per_sec": round(urls / elapsed, 2),
+            "peak_rss_bytes": peak_rss
+        }
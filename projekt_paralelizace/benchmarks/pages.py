@@ -0,0 +1,114 @@
+"""Generator of synthetic product pages for the benchmarks.
+
+The pages imitate real store pages: large inline JavaScript bundles, many
+unrelated scripts, markup noise and JSON-LD blocks, some of them nested in an
+@graph.
+"""
+import json
+import random
+from typing import Optional
+
+_WORDS = ["telefon", "displej", "baterie", "pamět", "procesor", "fotoaparát", "záruka", "doprava"]
+
+
+def _inline_js(rng: random.Random, size: int) -> str:
+    chunks = []
+    length = 0
+    while length < size:
+        chunk = (
+            f"var v{rng.randrange(10**6)} = {{'html': '<h1>{rng.choice(_WORDS)}</h1>', "
+            f"'n': {rng.random()}}}; function f{rng.randrange(10**6)}(a) {{ return a < 3 && a > 1; }}\n"
+        )
+        chunks.append(chunk)
+        length += len(chunk)
+    return "".join(chunks)
+
+
+def _markup(rng: random.Random, size: int) -> str:
+    chunks = []
+    length = 0
+    while length < size:
+        word = rng.choice(_WORDS)
+        chunk = (
+            f'<div class="box box--{word}"><a href="/p/{rng.randrange(10**6)}">'
+            f'<span>{word} &amp; {rng.choice(_WORDS)}</span></a><!-- {word} --></div>\n'
+        )
+        chunks.append(chunk)
+        length += len(chunk)
+    return "".join(chunks)
+
+
+def product_page(
+    seed: int = 0,
+    size_kb: int = 500,
+    scripts: int = 40,
+    graph: bool = True,
+    name: Optional[str] = None,
+    price: Optional[int] = None
+) -> str:
+    """
+    Builds a synthetic product page.
+
+    Args:
+        seed (int): Seed of the random generator, so pages are reproducible.
+        size_kb (int): Approximate page size in kilobytes.
+        scripts (int): Number of inline scripts.
+        graph (bool): Put the Product entity into a nested @graph.
+        name (Optional[str]): Product name (generated if omitted).
+        price (Optional[int]): Product price (generated if omitted).
+
+    Returns:
+        str: The page HTML.
+    """
+    rng = random.Random(seed)
+    name = name or f"Produkt {seed} {rng.choice(_WORDS)}"
+    price = price if price is not None else rng.randrange(500, 60000)
+
+    product = {
+        "@type": "Product",
+        "name": name,
+        "sku": str(seed),
+        "image": [{"@type": "ImageObject", "url": f"https://img.example.cz/{seed}.jpg"}],
+        "offers": {
+            "@type": "Offer",
+            "price": str(price),
+            "priceCurrency": "CZK",
+            "availability": rng.choice([
+                "http://schema.org/InStock",
+                "http://schema.org/OutOfStock",
+                "http://schema.org/PreOrder"
+            ])
+        },
+        "review": [{"@type": "Review", "reviewBody": " ".join(rng.choices(_WORDS, k=40))} for _ in range(20)]
+    }
+
+    breadcrumbs = {
+        "@context": "https://schema.org",
+        "@type": "BreadcrumbList",
+        "itemListElement": [{"@type": "ListItem", "position": i, "name": rng.choice(_WORDS)} for i in range(5)]
+    }
+
+    if graph:
+        product_block = {
+            "@context": "https://schema.org",
+            "@graph": [{"@type": "WebPage", "name": name}, {"@type": "Organization", "name": "Shop"}, product]
+        }
+    else:
+        product_block = dict(product, **{"@context": "https://schema.org"})
+
+    budget = size_kb * 1024
+    script_size = budget // 2 // max(1, scripts)
+    head = "".join(f"<script>{_inline_js(rng, script_size)}</script>\n" for _ in range(scripts))
+    body = _markup(rng, budget // 2)
+
+    return (
+        "<!DOCTYPE html><html lang=\"cs\"><head><meta charset=\"utf-8\">"
+        f"<title>{name}</title>\n{head}"
+        f"<script type=\"application/ld+json\">{json.dumps(breadcrumbs, ensure_ascii=False)}</script>\n"
+        "</head><body>\n"
+        f"{body[:len(body) // 2]}"
+        f"<h1 class=\"product-title\">{name}</h1>\n"
+        f"<script type=\"application/ld+json\">{json.dumps(product_block, ensure_ascii=False)}</script>\n"
+        f"{body[len(body) // 2:]}"
+        "</body></html>"
+    )
@@ -0,0 +1,180 @@
+"""Adaptive per-domain concurrency.
+
+An AIMD (additive increase, multiplicative decrease) controller per domain:
+while responses are clean, the number of concurrent fetches allowed for the
+domain grows by one every `limit` clean responses; when the share of anti-bot
+blocks (HTTP 403, captcha pages) among the last `window` responses reaches
+`block_rate`, the limit is multiplied by `decrease` and frozen for `cooldown`
+seconds, so requests already in flight cannot trigger a cascade of cuts.
+The block rate is only judged once `min_samples` responses (by default the
+whole window) were seen since the last cut, so a single block right after a
+cut does not count as a 100% block rate.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from .metrics import CrawlMetrics
+
+LIMIT_GAUGE = "crawler_concurrency_limit"
+
+
+def is_block(error: Optional[str]) -> bool:
+    """Tells whether a fetch error is an anti-bot block (HTTP 403 or captcha)."""
+    return bool(error) and (error.startswith("HTTP 403") or error.startswith("Captcha"))
+
+
+class _DomainState:
+    __slots__ = ("limit", "active", "outcomes", "clean", "cooldown_until")
+
+    def __init__(self, limit: float, window: int):
+        self.limit = limit
+        self.active = 0
+        self.outcomes = deque(maxlen=window)
+        self.clean = 0
+        self.cooldown_until = 0.0
+
+
+class AdaptiveConcurrency:
+    """
+    Per-domain concurrency limits adjusted by the AIMD rule.
+
+    acquire()/release() are for threads; the asyncio engine uses the
+    non-blocking try_acquire() from its event loop thread.
+    """
+
+    def __init__(
+        self,
+        initial: int = 2,
+        minimum: int = 1,
+        maximum: int = 8,
+        decrease: float = 0.5,
+        cooldown: float = 30.0,
+        window: int = 20,
+        block_rate: float = 0.1,
+        min_samples: Optional[int] = None,
+        metrics: Optional[CrawlMetrics] = None
+    ):
+        """
+        Args:
+            initial (int): Starting limit of every domain.
+            minimum (int): The limit never drops below this.
+            maximum (int): The limit never grows above this.
+            decrease (float): Factor applied to the limit on a cut.
+            cooldown (float): Seconds after a cut during which the limit does not change.
+            window (int): Number of recent responses the block rate is computed over.
+            block_rate (float): Share of blocked responses that triggers a cut.
+            min_samples (Optional[int]): Responses needed before the block rate is
+                judged (default: the whole window).
+            metrics (Optional[CrawlMetrics]): Receives the current limit of each domain as a gauge.
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.initial = min(max(initial, self.minimum), self.maximum)
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.window = max(1, window)
+        self.block_rate = block_rate
+        self.min_samples = self.window if min_samples is None else min(max(1, min_samples), self.window)
+        self.metrics = metrics
+        self._domains: Dict[str, _DomainState] = {}
+        self._cond = threading.Condition()
+
+    def _state(self, domain: str) -> _DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = _DomainState(float(self.initial), self.window)
+            self._publish(domain, state)
+        return state
+
+    def _publish(self, domain: str, state: _DomainState):
+        if self.metrics is not None:
+            self.metrics.set_gauge(LIMIT_GAUGE, int(state.limit), domain=domain)
+
+    def limit(self, domain: str) -> int:
+        """The current number of concurrent fetches allowed for a domain."""
+        with self._cond:
+            return int(self._state(domain).limit)
+
+    def try_acquire(self, domain: str) -> bool:
+        """Takes a slot of the domain if one is free."""
+        with self._cond:
+            state = self._state(domain)
+            if state.active >= int(state.limit):
+                return False
+            state.active += 1
+            return True
+
+    def acquire(self, domain: str):
+        """Blocks until a slot of the domain is free and takes it."""
+        with self._cond:
+            state = self._state(domain)
+            while state.active >= int(state.limit):
+                self._cond.wait()
+            state.active += 1
+
+    def release(self, domain: str, error: Optional[str] = None):
+        """
+        Returns a slot and records the outcome of its fetch.
+
+        Args:
+            domain (str): The domain.
+            error (Optional[str]): The fetch error, None for a clean response.
+        """
+        with self._cond:
+            state = self._state(domain)
+            state.active = max(0, state.active - 1)
+            self._record(domain, state, is_block(error))
+            self._cond.notify_all()
+
+    def _record(self, domain: str, state: _DomainState, blocked: bool):
+        now = time.monotonic()
+        state.outcomes.append(blocked)
+        if now < state.cooldown_until:
+            return
+
+        sampled = len(state.outcomes)
+        if blocked and sampled >= self.min_samples and sum(state.outcomes) >= self.block_rate * sampled:
+            state.limit = max(float(self.minimum), state.limit * self.decrease)
+            state.cooldown_until = now + self.cooldown
+            state.outcomes.clear()
+            state.clean = 0
+            self._publish(domain, state)
+            return
+
+        if blocked:
+            state.clean = 0
+            return
+
+        state.clean += 1
+        if state.clean >= int(state.limit) and state.limit < self.maximum:
+            state.limit = min(float(self.maximum), state.limit + 1)
+            state.clean = 0
+            self._publish(domain, state)
+
+
+def from_config(settings: Optional[Dict], maximum: int, metrics: Optional[CrawlMetrics] = None) -> Optional[AdaptiveConcurrency]:
+    """
+    Builds the controller from the "adaptive_concurrency" configuration.
+
+    Args:
+        settings (Optional[Dict]): The configuration section; None or empty disables adaptation.
+        maximum (int): Default upper limit (the fixed per-domain concurrency).
+        metrics (Optional[CrawlMetrics]): Receives the current limits.
+    """
+    if not settings:
+        return None
+    if settings is True:
+        settings = {}
+    return AdaptiveConcurrency(
+        initial=settings.get("initial", 2),
+        minimum=settings.get("min", 1),
+        maximum=settings.get("max", maximum),
+        decrease=settings.get("decrease", 0.5),
+        cooldown=settings.get("cooldown", 30.0),
+        window=settings.get("window", 20),
+        block_rate=settings.get("block_rate", 0.1),
+        min_samples=settings.get("min_samples"),
+        metrics=metrics
+    )
@@ -0,0 +1,240 @@
+"""Content-addressed archive of the downloaded pages.
+
+Every page is stored once, compressed, in a blob named by the SHA-256 of its
+content, so identical pages (the same page in successive crawls, or pages
+reachable under several URLs) are stored only once. A SQLite index maps the
+URL of each page of a crawl to its blob:
+
+    <root>/index.sqlite
+    <root>/blobs/3f/3fa2...e1.zst   (or .gz)
+
+With the pages archived, the extractors can be re-run over a crawl without
+any network access (see reparse.py).
+"""
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .sqlite_util import ProcessLocalConnection
+
+logger = logging.getLogger("projekt_paralelizace")
+
+# File name suffix of each codec.
+CODECS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError("The zstd archive codec requires the 'zstandard' package") from exc
+    return zstandard
+
+
+def default_codec() -> str:
+    """zstd if the 'zstandard' package is installed, gzip otherwise."""
+    try:
+        _zstd()
+    except RuntimeError:
+        return "gzip"
+    return "zstd"
+
+
+def new_crawl_id() -> str:
+    """A sortable identifier of a new crawl, e.g. '20240518-101502-1a2b'."""
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:4]
+
+
+class HtmlArchive(ProcessLocalConnection):
+    """
+    Page archive of one or more crawls.
+
+    The index connection is opened lazily by each process using the archive
+    (one inherited through fork is replaced, never used), so an instance can
+    be handed to pool workers. One instance may be shared by
+    several threads. Blobs are written to a temporary file and renamed, so
+    concurrent writers of the same page are safe.
+    """
+
+    def __init__(self, root: str, crawl_id: Optional[str] = None, codec: Optional[str] = None, level: int = 3):
+        """
+        Initializes the archive.
+
+        Args:
+            root (str): Directory of the archive.
+            crawl_id (Optional[str]): The crawl new pages are recorded under.
+            codec (Optional[str]): "zstd" or "gzip" for new blobs (default: zstd if available).
+            level (int): Compression level.
+        """
+        self.root = root
+        self.crawl_id = crawl_id
+        self.codec = codec or default_codec()
+        self.level = level
+        if self.codec not in CODECS:
+            raise ValueError(f"Unknown archive codec: {self.codec}")
+        if self.codec == "zstd":
+            _zstd()
+        self._init_connection()
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(
+            os.path.join(self.root, "index.sqlite"), timeout=30, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "crawl_id TEXT NOT NULL, url TEXT NOT NULL, store TEXT, hash TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL, PRIMARY KEY (crawl_id, url));"
+            "CREATE TABLE IF NOT EXISTS crawls (crawl_id TEXT PRIMARY KEY, started_at REAL NOT NULL);"
+        )
+        conn.commit()
+        return conn
+
+    def _blob_path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest + CODECS[codec])
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return _zstd().ZstdCompressor(level=self.level).compress(data)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def begin(self, crawl_id: Optional[str] = None) -> str:
+        """
+        Registers a crawl (a new one by default) and records new pages under it.
+
+        Returns:
+            str: The crawl id.
+        """
+        self.crawl_id = crawl_id or new_crawl_id()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO crawls (crawl_id, started_at) VALUES (?, ?)",
+                    (self.crawl_id, time.time())
+                )
+        return self.crawl_id
+
+    def put_blob(self, html: str) -> str:
+        """Stores a page body unless it is already archived and returns its hash."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if any(os.path.exists(self._blob_path(digest, codec)) for codec in CODECS):
+            return digest
+
+        path = self._blob_path(digest, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(self._compress(data))
+        os.replace(temporary, path)
+        return digest
+
+    def get_blob(self, digest: str) -> str:
+        """Returns the archived page body with the given hash."""
+        for codec, suffix in CODECS.items():
+            path = self._blob_path(digest, codec)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            if codec == "zstd":
+                data = _zstd().ZstdDecompressor().decompress(data)
+            else:
+                data = gzip.decompress(data)
+            return data.decode("utf-8")
+        raise KeyError(f"Blob not found in the archive: {digest}")
+
+    def add(self, url: str, store: Optional[str], html: str) -> str:
+        """
+        Archives a page of the current crawl.
+
+        Returns:
+            str: The hash of the page body.
+        """
+        if self.crawl_id is None:
+            raise ValueError("No crawl to record the page under, call begin() first")
+        digest = self.put_blob(html)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (crawl_id, url, store, hash, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.crawl_id, url, store, digest, time.time())
+                )
+        return digest
+
+    def crawls(self) -> List[Tuple[str, int]]:
+        """Returns the archived crawls (oldest first) with their page counts."""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT c.crawl_id, COUNT(p.url) FROM crawls c "
+                "LEFT JOIN pages p ON p.crawl_id = c.crawl_id "
+                "GROUP BY c.crawl_id ORDER BY c.started_at, c.crawl_id"
+            ).fetchall()
+
+    def latest_crawl(self) -> Optional[str]:
+        """Returns the id of the most recently started crawl, or None."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT crawl_id FROM crawls ORDER BY started_at DESC, crawl_id DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def iter_pages(self, crawl_id: str, page_size: int = 1000) -> Iterator[Tuple[str, Optional[str], str]]:
+        """
+        Yields the (url, store, hash) of every page of a crawl, a page of rows at a time.
+        """
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT url, store, hash FROM pages WHERE crawl_id = ? AND url > ? ORDER BY url LIMIT ?",
+                    (crawl_id, last, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][0]
+
+
+def archive_page(archive: Optional[HtmlArchive], job: Dict, html: Optional[str]):
+    """
+    Archives a downloaded page of a job, if an archive is used.
+
+    A failure is logged and does not affect the crawl.
+    """
+    if archive is None or html is None:
+        return
+    try:
+        archive.add(job.get("url"), job.get("type"), html)
+    except Exception as exc:
+        logger.warning("Archiving %s failed: %s", job.get("url"), exc)
+
+
+def from_config(settings, crawl_id: Optional[str] = None) -> Optional[HtmlArchive]:
+    """
+    Opens the archive configured by the "archive" configuration.
+
+    Args:
+        settings: The configuration section; None or empty disables the
+            archive, True uses the defaults.
+        crawl_id (Optional[str]): The crawl new pages are recorded under.
+    """
+    if not settings:
+        return None
+    if settings is True:
+        settings = {}
+    return HtmlArchive(
+        settings.get("path", "archive"),
+        crawl_id=crawl_id,
+        codec=settings.get("codec"),
+        level=settings.get("level", 3)
+    )
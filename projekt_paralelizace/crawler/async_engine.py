@@ -0,0 +1,318 @@
+"""Asyncio based crawl engine.
+
+Runs many concurrent downloads from a single process. The event loop limits
+how many fetches are in flight globally and per domain, while the CPU heavy
+extraction runs in a small process pool.
+"""
+import asyncio
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from .adaptive import AdaptiveConcurrency
+from .archive import HtmlArchive, archive_page
+from .cache import ResponseCache
+from .deadline import (
+    CRAWL_DEADLINE_ERROR, JOB_DEADLINE_ERROR, PARSE_BROKEN_ERROR, PARSE_CONTEXT, Deadline, init_parse_process,
+    parse_within
+)
+from .downloader import DEFAULT_MAX_BODY_SIZE, Downloader
+from .metrics import CrawlMetrics
+from .parser import build_result_row, build_result_row_with_metrics
+from .retry import RetryPolicy
+from .scheduler import PolitenessScheduler
+from .session_store import SessionStore
+
+
+class AsyncEngine:
+    """
+    Crawl engine that schedules downloads on an asyncio event loop.
+
+    tls_client sessions are blocking, so each fetch runs on a thread of a pool
+    sized to the global concurrency limit; the event loop only decides which
+    fetches may run. All fetches share one Downloader, and so one session and
+    one warm-up per domain.
+
+    A job waiting for a retry sleeps on the event loop without holding its
+    domain slot or a fetch thread.
+    """
+
+    def __init__(
+        self,
+        timeout: int = 15,
+        concurrency: int = 100,
+        per_domain_concurrency: int = 8,
+        parse_processes: int = 2,
+        scheduler: Optional[PolitenessScheduler] = None,
+        cache: Optional[ResponseCache] = None,
+        session_store: Optional[SessionStore] = None,
+        archive: Optional[HtmlArchive] = None,
+        max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[CrawlMetrics] = None,
+        adaptive: Optional[AdaptiveConcurrency] = None,
+        crawl_deadline: Optional[float] = None,
+        job_deadline: Optional[float] = None
+    ):
+        """
+        Initializes the engine.
+
+        Args:
+            timeout (int): The timeout for HTTP requests in seconds.
+            concurrency (int): Maximum number of jobs in flight at once.
+            per_domain_concurrency (int): Maximum number of concurrent fetches per domain.
+            parse_processes (int): Number of processes used for extraction.
+            scheduler (Optional[PolitenessScheduler]): Per-domain rate limits.
+            cache (Optional[ResponseCache]): Response cache used by the downloader.
+            session_store (Optional[SessionStore]): Persistent warm-up state used by the downloader.
+            archive (Optional[HtmlArchive]): Archive receiving every downloaded page.
+            max_body_size (Optional[int]): Largest accepted response body in bytes.
+            retry_policy (Optional[RetryPolicy]): Retry policy for failed downloads.
+            metrics (Optional[CrawlMetrics]): Collects download and parse metrics.
+            adaptive (Optional[AdaptiveConcurrency]): Adjusts the per-domain limits to
+                the block rate; replaces the fixed per_domain_concurrency.
+            crawl_deadline (Optional[float]): Time budget of the whole crawl in seconds.
+            job_deadline (Optional[float]): Time limit of one attempt of a job (fetch
+                including the warm-up, and extraction) in seconds.
+        """
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.per_domain_concurrency = max(1, per_domain_concurrency)
+        self.parse_processes = max(1, parse_processes)
+        self.scheduler = scheduler
+        self.cache = cache
+        self.session_store = session_store
+        self.archive = archive
+        self.max_body_size = max_body_size
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        self.adaptive = adaptive
+        self.crawl_deadline = crawl_deadline
+        self.job_deadline = job_deadline
+        self.retried = 0
+        # Number of unfinished jobs recorded as timed out when the crawl deadline passed.
+        self.timed_out: Optional[int] = None
+
+    def run(self, jobs: Iterable[Dict], on_result: Callable[[Dict], None]) -> int:
+        """
+        Crawls all jobs and passes every result row to on_result.
+
+        on_result is always called from the thread running the event loop.
+
+        Args:
+            jobs (Iterable[Dict]): Jobs with the 'url' and store 'type'.
+            on_result (Callable[[Dict], None]): Callback receiving each result row.
+
+        Returns:
+            int: The number of processed jobs.
+        """
+        return asyncio.run(self._run(jobs, on_result))
+
+    async def _run(self, jobs: Iterable[Dict], on_result: Callable[[Dict], None]) -> int:
+        loop = asyncio.get_running_loop()
+        throttle = self.scheduler.acquire if self.scheduler is not None else None
+        downloader = Downloader(
+            timeout=self.timeout, throttle=throttle, cache=self.cache, metrics=self.metrics,
+            session_store=self.session_store, max_body_size=self.max_body_size
+        )
+
+        slots = asyncio.Semaphore(self.concurrency)
+        domain_slots: Dict[str, asyncio.Semaphore] = {}
+        domain_released: Dict[str, asyncio.Event] = {}
+        tasks: Dict[asyncio.Task, Dict] = {}
+        processed = 0
+        crawl_deadline = Deadline(self.crawl_deadline)
+
+        fetch_executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        parse_started = PARSE_CONTEXT.SimpleQueue()
+
+        def parse_pool() -> ProcessPoolExecutor:
+            return ProcessPoolExecutor(
+                max_workers=self.parse_processes, mp_context=PARSE_CONTEXT,
+                initializer=init_parse_process, initargs=(parse_started,)
+            )
+
+        parse_executor = parse_pool()
+        parse_function = build_result_row_with_metrics if self.metrics is not None else build_result_row
+        tokens = itertools.count()
+        # Extractions submitted to the current pool: token -> seconds left of the job deadline.
+        parsing: Dict[int, Optional[float]] = {}
+        # Token -> monotonic time the extraction began, as reported by parse_within.
+        started: Dict[int, float] = {}
+        # Token -> outcome of an extraction lost with a broken pool: JOB_DEADLINE_ERROR
+        # if it overran, PARSE_BROKEN_ERROR if it was running when the pool broke
+        # for another reason, None if it is to be run again.
+        lost: Dict[int, Optional[str]] = {}
+
+        def drain_started():
+            while not parse_started.empty():
+                token, began = parse_started.get()
+                started[token] = began
+
+        def recycle(executor: ProcessPoolExecutor):
+            # A parse process was killed (see parse_within), which breaks the
+            # whole pool. The first extraction to notice replaces the pool and
+            # judges every extraction of the broken one, like the pipeline engine.
+            nonlocal parse_executor
+            if executor is not parse_executor:
+                return
+            parse_executor = parse_pool()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+            drain_started()
+            now = time.monotonic()
+            began = {token: started.pop(token, None) for token in parsing}
+            overran = {
+                token for token, seconds in parsing.items()
+                if seconds is not None and began[token] is not None and now >= began[token] + seconds
+            }
+            for token in parsing:
+                if token in overran:
+                    lost[token] = JOB_DEADLINE_ERROR
+                elif overran or began[token] is None:
+                    lost[token] = None
+                else:
+                    lost[token] = PARSE_BROKEN_ERROR
+            parsing.clear()
+
+        async def extract(store_type: str, url: str, html: str, error: Optional[str], seconds: Optional[float]) -> Dict:
+            # The time limit is enforced in the parse process from the start of
+            # the extraction, so waiting for a free parse process does not count.
+            breaks = 0
+            while True:
+                executor = parse_executor
+                token = next(tokens)
+                parsing[token] = seconds
+                try:
+                    result = await loop.run_in_executor(
+                        executor, parse_within, token, seconds, parse_function, store_type, url, html, error
+                    )
+                except BrokenProcessPool:
+                    recycle(executor)
+                    outcome = lost.pop(token, None)
+                    if outcome == JOB_DEADLINE_ERROR:
+                        return build_result_row(store_type, url, None, JOB_DEADLINE_ERROR)
+                    if outcome == PARSE_BROKEN_ERROR:
+                        breaks += 1
+                        if breaks > 1:
+                            return build_result_row(store_type, url, None, PARSE_BROKEN_ERROR)
+                    continue
+                finally:
+                    parsing.pop(token, None)
+
+                # Read the reported starts as they come, so the pipe never fills up.
+                drain_started()
+                started.pop(token, None)
+                if self.metrics is not None:
+                    row, parse_metrics = result
+                    self.metrics.merge(parse_metrics)
+                    return row
+                return result
+
+        async def fetch(url: str, domain: str) -> asyncio.Future:
+            # Waits for a domain slot and starts the download. A fetch abandoned
+            # at its job deadline keeps running in its thread, so its domain slot
+            # is released when the download really ends, not when the waiting
+            # coroutine is cancelled.
+            if self.adaptive is None:
+                domain_slot = domain_slots.get(domain)
+                if domain_slot is None:
+                    domain_slot = asyncio.Semaphore(self.per_domain_concurrency)
+                    domain_slots[domain] = domain_slot
+                await domain_slot.acquire()
+                future = loop.run_in_executor(fetch_executor, downloader.fetch, url)
+                future.add_done_callback(lambda _: domain_slot.release())
+                return future
+
+            # All slot bookkeeping runs on the event loop thread, so nothing can
+            # release a slot between the failed try_acquire and clear().
+            while not self.adaptive.try_acquire(domain):
+                released = domain_released.setdefault(domain, asyncio.Event())
+                released.clear()
+                await released.wait()
+
+            def release_adaptive(future: asyncio.Future):
+                error = None
+                if not future.cancelled() and future.exception() is None:
+                    error = future.result()[1]
+                self.adaptive.release(domain, error)
+                if domain in domain_released:
+                    domain_released[domain].set()
+
+            future = loop.run_in_executor(fetch_executor, downloader.fetch, url)
+            future.add_done_callback(release_adaptive)
+            return future
+
+        async def crawl(job: Dict):
+            nonlocal processed
+            store_type = job.get("type")
+            url = job.get("url")
+            domain = urlparse(url).netloc
+
+            try:
+                attempt = 0
+                while True:
+                    # The wait for a domain slot does not count against the job deadline.
+                    download = await fetch(url, domain)
+                    deadline = Deadline(self.job_deadline)
+                    try:
+                        html, error = await asyncio.wait_for(asyncio.shield(download), deadline.remaining())
+                    except asyncio.TimeoutError:
+                        html, error = None, JOB_DEADLINE_ERROR
+
+                    if html is not None or self.retry_policy is None:
+                        break
+                    if not self.retry_policy.should_retry(attempt, error):
+                        break
+
+                    attempt += 1
+                    self.retried += 1
+                    await asyncio.sleep(self.retry_policy.delay(attempt))
+
+                if html is not None and self.archive is not None:
+                    await loop.run_in_executor(fetch_executor, archive_page, self.archive, job, html)
+
+                if html is not None:
+                    row = await extract(store_type, url, html, error, deadline.remaining())
+                else:
+                    row = build_result_row(store_type, url, None, error)
+            except Exception as exc:
+                row = build_result_row(store_type, url, None, str(exc))
+
+            on_result(row)
+            processed += 1
+
+        def release(task: asyncio.Task):
+            tasks.pop(task, None)
+            slots.release()
+
+        try:
+            for job in jobs:
+                try:
+                    await asyncio.wait_for(slots.acquire(), crawl_deadline.remaining())
+                except asyncio.TimeoutError:
+                    break
+                task = asyncio.create_task(crawl(job))
+                tasks[task] = job
+                task.add_done_callback(release)
+
+            if tasks:
+                running = list(tasks.items())
+                try:
+                    await asyncio.wait_for(asyncio.gather(*tasks), crawl_deadline.remaining())
+                except asyncio.TimeoutError:
+                    # The running jobs were cancelled by wait_for.
+                    expired = [job for task, job in running if task.cancelled()]
+                    for job in expired:
+                        on_result(build_result_row(job.get("type"), job.get("url"), None, CRAWL_DEADLINE_ERROR))
+                    processed += len(expired)
+                    self.timed_out = len(expired)
+        finally:
+            fetch_executor.shutdown(wait=False, cancel_futures=True)
+            parse_executor.shutdown(wait=True, cancel_futures=True)
+            downloader.close()
+
+        return processed
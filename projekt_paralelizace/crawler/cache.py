@@ -0,0 +1,211 @@
+"""On-disk HTTP response cache.
+
+Stores downloaded pages with their validators (ETag, Last-Modified) in a
+SQLite file, so later runs can revalidate them with conditional requests or
+skip the network entirely while they are fresh.
+"""
+import os
+import sqlite3
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from .sqlite_util import ProcessLocalConnection
+
+_TRACKING_PARAMS = ("utm_", "gclid", "fbclid")
+
+# Number of read access times buffered before they are written without a put.
+_ACCESS_BATCH = 256
+
+
+class CachedResponse(NamedTuple):
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL for use as a cache key.
+
+    The scheme and host are lowercased, default ports and the fragment are
+    dropped and query parameters are sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+
+    if (scheme == "https" and netloc.endswith(":443")) or (scheme == "http" and netloc.endswith(":80")):
+        netloc = netloc.rsplit(":", 1)[0]
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def canonical_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the normalized absolute form of a product URL.
+
+    Relative URLs are resolved against base, tracking parameters (utm_*,
+    gclid, fbclid) and a trailing slash of the path are dropped and the result
+    is normalized like a cache key. Anything that is not an http(s) URL yields None.
+    """
+    url = urljoin(base, url.strip()) if base else url.strip()
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PARAMS)
+    ]
+    path = parts.path.rstrip("/")
+    return normalize_url(urlunsplit((parts.scheme, parts.netloc, path, urlencode(query), "")))
+
+
+class ResponseCache(ProcessLocalConnection):
+    """
+    Bounded response cache backed by a SQLite file.
+
+    Entries are evicted in least-recently-used order once the cache holds more
+    than `max_entries` pages. Bodies are stored zlib compressed. The number of
+    pages is kept up to date by triggers, so a put never counts the table, and
+    the access times of reads are buffered and written with the next write
+    (or every _ACCESS_BATCH reads), so a read starts no write transaction.
+
+    The database connection is opened lazily by each process using the cache
+    (one inherited through fork is replaced, never used), so an instance can
+    be handed to pool workers. One instance may be shared by
+    several threads.
+    """
+
+    def __init__(self, path: str, max_age: float = 0, max_entries: int = 10000):
+        """
+        Initializes the cache.
+
+        Args:
+            path (str): Path of the SQLite file.
+            max_age (float): Seconds for which a cached page is used without any
+                             request. 0 means every use is revalidated.
+            max_entries (int): Maximum number of cached pages.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max(1, max_entries)
+        # Read access times not written yet: key -> time.
+        self._accessed: Dict[str, float] = {}
+        self._init_connection()
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["_accessed"] = {}
+        return state
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, last_modified TEXT, "
+            "fetched_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        conn.execute("CREATE TABLE IF NOT EXISTS response_count (n INTEGER NOT NULL)")
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_added AFTER INSERT ON responses "
+            "BEGIN UPDATE response_count SET n = n + 1; END"
+        )
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_removed AFTER DELETE ON responses "
+            "BEGIN UPDATE response_count SET n = n - 1; END"
+        )
+        # A cache file of an older version is counted once; pages stored after
+        # the triggers exist are counted by them.
+        conn.execute(
+            "INSERT INTO response_count (n) SELECT COUNT(*) FROM responses "
+            "WHERE NOT EXISTS (SELECT 1 FROM response_count)"
+        )
+        conn.commit()
+        return conn
+
+    def _write_accesses(self, conn: sqlite3.Connection):
+        """Writes the buffered access times in the current transaction."""
+        if self._accessed:
+            conn.executemany(
+                "UPDATE responses SET last_access = MAX(last_access, ?) WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Returns the cached page for the URL, or None."""
+        key = normalize_url(url)
+        with self._lock:
+            conn = self._connection()
+            entry = conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if entry is None:
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= _ACCESS_BATCH:
+                self._write_accesses(conn)
+                conn.commit()
+
+        body, etag, last_modified, fetched_at = entry
+        return CachedResponse(zlib.decompress(body).decode("utf-8"), etag, last_modified, fetched_at)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """Returns True if the entry may be used without contacting the server."""
+        return self.max_age > 0 and time.time() - entry.fetched_at < self.max_age
+
+    def put(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]):
+        """Stores a downloaded page and evicts the least recently used pages if needed."""
+        key = normalize_url(url)
+        now = time.time()
+        blob = zlib.compress(body.encode("utf-8"), 1)
+        with self._lock:
+            conn = self._connection()
+            self._write_accesses(conn)
+            # An upsert, not INSERT OR REPLACE: the replaced row would be
+            # deleted without firing the trigger that counts it out.
+            conn.execute(
+                "INSERT INTO responses (key, body, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET body = excluded.body, "
+                "etag = excluded.etag, last_modified = excluded.last_modified, "
+                "fetched_at = excluded.fetched_at, last_access = excluded.last_access",
+                (key, blob, etag, last_modified, now, now)
+            )
+            (count,) = conn.execute("SELECT n FROM response_count").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            conn.commit()
+
+    def touch(self, url: str):
+        """Marks a cached page as freshly validated (after a 304 response)."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._write_accesses(conn)
+            conn.execute(
+                "UPDATE responses SET fetched_at = ?, last_access = ? WHERE key = ?",
+                (now, now, normalize_url(url))
+            )
+            conn.commit()
+
+    def close(self):
+        """Writes the buffered access times and closes the connection of this process."""
+        with self._lock:
+            if self._accessed and self._conn is not None and self._pid == os.getpid():
+                self._write_accesses(self._conn)
+                self._conn.commit()
+        super().close()
@@ -0,0 +1,183 @@
+"""Recurring crawl daemon.
+
+Instead of crawling every product on each run, the daemon keeps running and
+crawls, in cycles, only the products whose refresh is due (see refresh.py),
+most overdue first. Each cycle is an ordinary run of the Orchestrator over the
+due jobs, with the configured engine, cache, history and so on. Stores with
+a "discover" section are discovered when the configuration is loaded and
+again every "discover_interval" seconds, and their discovered products are
+scheduled with the listed ones.
+
+The configuration file is checked for changes between cycles and while
+waiting; a changed file is reloaded without a restart (an invalid one is
+logged and ignored), and the schedule follows the new list of products.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from . import refresh
+from .config_loader import load_config
+from .orchestrator import Orchestrator, configure_logging
+from .sources import iter_jobs
+
+logger = logging.getLogger("projekt_paralelizace")
+
+
+class CrawlDaemon:
+    """Long-running crawler re-crawling each product when its refresh is due."""
+
+    def __init__(self, config_path: str):
+        """
+        Loads the configuration and opens the refresh schedule.
+
+        Args:
+            config_path (str): Path of the JSON configuration, watched for changes.
+        """
+        self.config_path = config_path
+        self.config: Dict = {}
+        self.schedule: Optional[refresh.RefreshSchedule] = None
+        self._mtime: Optional[float] = None
+        self.cycles = 0
+        self._discovered_at: Optional[float] = None
+        if not self.reload():
+            raise RuntimeError(f"Cannot load the configuration from {config_path}")
+
+    @property
+    def settings(self) -> Dict:
+        settings = self.config.get("daemon")
+        return settings if isinstance(settings, dict) else {}
+
+    def _modified(self) -> Optional[float]:
+        try:
+            return os.stat(self.config_path).st_mtime
+        except OSError:
+            return None
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Reloads the configuration if the file changed since the last load.
+
+        Returns:
+            bool: True if a new configuration was applied.
+        """
+        mtime = self._modified()
+        if not force and self.schedule is not None and mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        schedule = None
+        try:
+            config = load_config(self.config_path)
+            schedule = refresh.from_config(config.get("daemon"), config["output_dir"])
+            added, removed = self._sync(config, schedule)
+        except Exception as exc:
+            if schedule is not None:
+                schedule.close()
+            if self.schedule is None:
+                logger.error("Loading the configuration failed: %s", exc)
+            else:
+                logger.error("Reloading the configuration failed, keeping the previous one: %s", exc)
+            return False
+
+        if self.schedule is not None:
+            self.schedule.close()
+        self.config = config
+        self.schedule = schedule
+        configure_logging(config.get("logs_dir", "logs"))
+        logger.info(
+            "Configuration loaded: %d products scheduled (%d added, %d removed)",
+            len(schedule), added, removed
+        )
+        return True
+
+    def _sync(self, config: Dict, schedule: refresh.RefreshSchedule) -> Tuple[int, int]:
+        """
+        Runs the discovery of the stores with a "discover" section, then syncs
+        the schedule with the listed and discovered products of the stores.
+        """
+        frontier = None
+        if any(store.get("discover") for store in config.get("stores", [])):
+            frontier = Orchestrator(config).discover()
+            self._discovered_at = time.time()
+        try:
+            return schedule.sync(iter_jobs(config.get("stores", []), frontier=frontier))
+        finally:
+            if frontier is not None:
+                frontier.close()
+
+    def rediscover(self, now: Optional[float] = None) -> bool:
+        """
+        Repeats the discovery once "discover_interval" seconds have passed since
+        the last one, so newly listed products get scheduled.
+
+        Returns:
+            bool: True if the discovery ran.
+        """
+        now = time.time() if now is None else now
+        interval = self.settings.get("discover_interval", 86400)
+        if self._discovered_at is None or now - self._discovered_at < interval:
+            return False
+        try:
+            added, removed = self._sync(self.config, self.schedule)
+        except Exception as exc:
+            logger.error("Discovery failed: %s", exc)
+            self._discovered_at = now
+            return False
+        logger.info("Discovery: %d products added, %d removed from the schedule", added, removed)
+        return True
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """
+        Crawls the products that are due, up to the configured batch size.
+
+        Returns:
+            int: The number of crawled products.
+        """
+        due = self.schedule.pop_due(self.settings.get("batch_size", 500), now)
+        if not due:
+            return 0
+
+        rows: Dict = {}
+
+        def on_rows(batch: List[Dict]):
+            for row in batch:
+                rows[(row.get("store"), row.get("url"))] = row
+
+        logger.info("Refresh cycle %d: %d products due", self.cycles + 1, len(due))
+        try:
+            Orchestrator(self.config).run(due, on_rows=on_rows)
+        except Exception as exc:
+            logger.error("Refresh cycle failed: %s", exc)
+        finally:
+            # Jobs without a row (a failed cycle, or not started before the
+            # crawl deadline) are tried again after the error interval.
+            for job in due:
+                self.schedule.complete(job, rows.get((job.get("type"), job.get("url"))))
+            self.cycles += 1
+        return len(rows)
+
+    def run(self, stop: Optional[threading.Event] = None):
+        """
+        Runs refresh cycles until `stop` is set.
+
+        Between cycles the daemon sleeps until the next product is due, waking
+        up every "reload_interval" seconds to reload a changed configuration.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.reload()
+            self.rediscover()
+            self.run_once()
+
+            next_due = self.schedule.next_due()
+            wait = self.settings.get("reload_interval", 30)
+            if next_due is not None:
+                wait = min(wait, next_due - time.time())
+            if wait > 0:
+                stop.wait(wait)
+
+        self.schedule.close()
+        logger.info("Daemon stopped after %d refresh cycles", self.cycles)
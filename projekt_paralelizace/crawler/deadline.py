@@ -0,0 +1,149 @@
+"""Crawl and job deadlines.
+
+The crawl deadline is a wall-clock budget of the whole crawl: once it has
+passed, no more jobs are started and the jobs still running are recorded as
+timed out. The job deadline bounds one attempt of a job, from the warm-up
+through the download to the extraction; the HTTP `timeout` covers only the
+main request.
+
+A blocking call (tls_client runs in native code) cannot be interrupted, so a
+download that overruns its deadline is abandoned: it keeps running on its own
+daemon thread, its result is discarded and the worker moves on. An extraction
+is CPU-bound and is stopped instead: in a parse process by ending the process
+(parse_within), on the main thread of a pool worker by raising
+DeadlineExceeded in it (call_with_alarm).
+"""
+import multiprocessing
+import signal
+import threading
+import time
+from typing import Callable, Optional
+
+JOB_DEADLINE_ERROR = "Job deadline exceeded"
+CRAWL_DEADLINE_ERROR = "Crawl deadline exceeded"
+PARSE_BROKEN_ERROR = "Parse process terminated"
+
+# Start method of the parse processes: they are started by a fork server (or
+# spawned), never forked from an engine while its fetch threads may hold locks.
+PARSE_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Set in every parse process by init_parse_process: receives (token, start time)
+# when an extraction with a deadline begins.
+_parse_started = None
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a job overruns its deadline."""
+
+    def __init__(self, message: str = JOB_DEADLINE_ERROR):
+        super().__init__(message)
+
+
+class Deadline:
+    """A point in time given as a number of seconds from now (None = never)."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+def call_with_deadline(seconds: Optional[float], function: Callable, *args):
+    """
+    Calls function(*args) and returns its result, giving up after `seconds`.
+
+    Without a deadline (None) the function runs on the calling thread; otherwise it
+    runs on a new daemon thread, which is abandoned if it overruns.
+
+    Raises:
+        DeadlineExceeded: The function did not return in time.
+    """
+    if seconds is None:
+        return function(*args)
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = function(*args)
+        except BaseException as exc:
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=target, name="deadline-job", daemon=True)
+    thread.start()
+    thread.join(seconds)
+
+    if thread.is_alive():
+        raise DeadlineExceeded()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def call_with_alarm(seconds: Optional[float], function: Callable, *args):
+    """
+    Calls function(*args) on the calling thread, raising DeadlineExceeded in
+    it once `seconds` have passed.
+
+    The exception interrupts Python code only: a call into native code finishes
+    first. Off the main thread, or without setitimer (Windows), the function is
+    not limited.
+
+    Raises:
+        DeadlineExceeded: The function did not return in time.
+    """
+    if (
+        seconds is None or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        return function(*args)
+
+    def expire(signum, frame):
+        raise DeadlineExceeded()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, max(seconds, 0.001))
+    try:
+        return function(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def init_parse_process(started):
+    """Process pool initializer: `started` (a SimpleQueue) receives the starts reported by parse_within."""
+    global _parse_started
+    _parse_started = started
+
+
+def parse_within(token: int, seconds: Optional[float], function: Callable, *args):
+    """
+    Runs an extraction in a parse process, limited to `seconds`.
+
+    A CPU-bound extraction cannot be interrupted from Python, so the process
+    arms SIGALRM with its default action and the kernel ends the process once
+    the time is up; the engine then replaces the broken pool. The clock starts
+    when the extraction begins, and (token, start) is reported to the engine
+    so it can tell the extraction that overran from the ones the broken pool
+    took down with it. Without setitimer (Windows) the extraction is not limited.
+    """
+    if seconds is None or not hasattr(signal, "setitimer"):
+        return function(*args)
+    # time.monotonic() is system-wide, so the engine can compare it with its own.
+    _parse_started.put((token, time.monotonic()))
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+    signal.setitimer(signal.ITIMER_REAL, max(seconds, 0.001))
+    try:
+        return function(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
@@ -0,0 +1,165 @@
+"""Product URL discovery.
+
+Reads a store's sitemaps (sitemap indexes, nested and gzipped sitemaps) and
+category listings (following rel="next" pagination), normalizes the product
+URLs found and adds them to the URL frontier. Configured per store:
+
+    {"name": "alza", "type": "alza", "discover": {
+        "sitemaps": ["https://www.alza.cz/sitemap.xml"],
+        "categories": ["https://www.alza.cz/mobily/18843445.htm"],
+        "product_pattern": "-d\\d+\\.htm$"
+    }}
+"""
+import gzip
+import io
+import logging
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from .cache import canonical_url
+from .frontier import UrlFrontier
+from .sources import iter_sitemap_entries
+
+FetchBytes = Callable[[str], Tuple[Optional[bytes], Optional[str]]]
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ANCHOR_RE = re.compile(r"<(a|link)\b([^>]*)>", re.IGNORECASE)
+_HREF_RE = re.compile(r"""\bhref\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+_REL_NEXT_RE = re.compile(r"""\brel\s*=\s*["']?next\b""", re.IGNORECASE)
+
+logger = logging.getLogger("projekt_paralelizace")
+
+
+def iter_links(html: str, base_url: str) -> Iterator[Tuple[str, bool]]:
+    """Yields (absolute URL, is rel="next") for every <a>/<link> with an href."""
+    for match in _ANCHOR_RE.finditer(html):
+        attributes = match.group(2)
+        href = _HREF_RE.search(attributes)
+        if href is None:
+            continue
+        url = canonical_url(href.group(1), base_url)
+        if url is not None:
+            yield url, bool(_REL_NEXT_RE.search(attributes))
+
+
+class Discovery:
+    """Discovers product URLs of a store through a fetch function."""
+
+    def __init__(self, fetch_bytes: FetchBytes, max_depth: int = 3, max_pages: int = 50):
+        """
+        Args:
+            fetch_bytes (FetchBytes): Returns (body, error) for a URL, e.g. Downloader.fetch_bytes.
+            max_depth (int): How deep nested sitemap indexes are followed.
+            max_pages (int): Maximum number of pages read per category listing.
+        """
+        self.fetch_bytes = fetch_bytes
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+
+    def _fetch(self, url: str) -> Optional[bytes]:
+        body, error = self.fetch_bytes(url)
+        if error is not None:
+            logger.warning("Discovery: cannot fetch %s: %s", url, error)
+            return None
+        return body
+
+    def iter_sitemap(self, url: str) -> Iterator[str]:
+        """
+        Yields the page URLs of a sitemap, following sitemap indexes.
+
+        Gzipped sitemaps are decompressed while they are parsed; every sitemap
+        is read at most once.
+        """
+        pending: List[Tuple[str, int]] = [(url, 0)]
+        visited = set()
+
+        while pending:
+            sitemap_url, depth = pending.pop()
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+
+            body = self._fetch(sitemap_url)
+            if not body:
+                continue
+
+            stream = io.BytesIO(body)
+            if body[:2] == _GZIP_MAGIC:
+                stream = gzip.GzipFile(fileobj=stream)
+
+            nested = []
+            try:
+                for kind, loc in iter_sitemap_entries(stream):
+                    if kind == "url":
+                        yield loc
+                    elif depth < self.max_depth:
+                        nested.append((urljoin(sitemap_url, loc), depth + 1))
+            except Exception as exc:
+                logger.warning("Discovery: invalid sitemap %s: %s", sitemap_url, exc)
+
+            pending.extend(reversed(nested))
+
+    def iter_category(self, url: str, pattern: Optional[Pattern] = None) -> Iterator[str]:
+        """
+        Yields the links of a category listing that match the product pattern,
+        following rel="next" links for up to max_pages pages.
+        """
+        domain = urlsplit(url).netloc
+        visited = set()
+
+        while url is not None and url not in visited and len(visited) < self.max_pages:
+            visited.add(url)
+            body = self._fetch(url)
+            if not body:
+                return
+
+            next_url = None
+            for link, is_next in iter_links(body.decode("utf-8", "replace"), url):
+                if is_next:
+                    next_url = next_url or link
+                elif urlsplit(link).netloc == domain and (pattern is None or pattern.search(link)):
+                    yield link
+            url = next_url
+
+    def iter_store_urls(self, discover: Dict) -> Iterator[str]:
+        """Yields the canonical product URLs of a store's "discover" configuration."""
+        pattern = re.compile(discover["product_pattern"]) if discover.get("product_pattern") else None
+
+        for sitemap in discover.get("sitemaps", []):
+            for loc in self.iter_sitemap(sitemap):
+                url = canonical_url(loc)
+                if url is not None and (pattern is None or pattern.search(url)):
+                    yield url
+
+        for category in discover.get("categories", []):
+            yield from self.iter_category(canonical_url(category) or category, pattern)
+
+    def discover(self, store: Dict, frontier: UrlFrontier, batch_size: int = 1000) -> int:
+        """
+        Adds the discovered URLs of a store to the frontier.
+
+        Returns:
+            int: Number of new URLs.
+        """
+        name = store.get("name", store.get("type"))
+        added = 0
+        batch = []
+
+        for url in self.iter_store_urls(store.get("discover", {})):
+            batch.append((name, url))
+            if len(batch) >= batch_size:
+                added += frontier.add_many(batch)
+                batch = []
+        added += frontier.add_many(batch)
+
+        return added
+
+
+def discover_stores(stores: Iterable[Dict], frontier: UrlFrontier, fetch_bytes: FetchBytes) -> Dict[str, int]:
+    """Runs the discovery of every store with a "discover" section; returns the new URLs per store."""
+    discovery = Discovery(fetch_bytes)
+    return {
+        store.get("name", store.get("type")): discovery.discover(store, frontier)
+        for store in stores if store.get("discover")
+    }
@@ -0,0 +1,287 @@
+"""Coordinator / worker mode over a shared WorkQueue.
+
+The coordinator (the Orchestrator with "engine": "distributed") puts the jobs
+into the queue, writes the results the workers send back and requeues the
+jobs of workers that stopped heartbeating. Workers (`python main.py --worker`,
+on any machine that can reach the queue file) lease jobs, download and parse
+them and send the rows back.
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from .downloader import DEFAULT_MAX_BODY_SIZE, Downloader
+from .metrics import CrawlMetrics
+from .parser import build_result_row
+from .retry import RetryPolicy
+from . import archive, session_store
+from .archive import archive_page
+from .deadline import (
+    CRAWL_DEADLINE_ERROR, JOB_DEADLINE_ERROR, Deadline, DeadlineExceeded, call_with_alarm, call_with_deadline
+)
+from .scheduler import PolitenessScheduler
+from .work_queue import WorkQueue
+
+logger = logging.getLogger("projekt_paralelizace")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Coordinator:
+    """Feeds a WorkQueue and collects the results of the workers."""
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        retry_policy: Optional[RetryPolicy] = None,
+        max_leases: int = 3,
+        poll_interval: float = 0.5,
+        crawl_id: Optional[str] = None,
+        crawl_deadline: Optional[float] = None
+    ):
+        """
+        Args:
+            queue (WorkQueue): The shared queue.
+            retry_policy (Optional[RetryPolicy]): Retry policy for failed downloads.
+            max_leases (int): How many expired leases a job survives before it is given up.
+            poll_interval (float): Pause between polls of an idle queue in seconds.
+            crawl_id (Optional[str]): Crawl the workers archive the pages under.
+            crawl_deadline (Optional[float]): Time budget of the crawl in seconds. Once it
+                has passed, the queue is closed and the started jobs are recorded as timed out.
+        """
+        self.queue = queue
+        self.retry_policy = retry_policy
+        self.max_leases = max_leases
+        self.poll_interval = poll_interval
+        self.crawl_id = crawl_id
+        self.crawl_deadline = crawl_deadline
+        self.retried = 0
+        self.timed_out: Optional[int] = None
+        self.requeued = 0
+
+    def run(
+        self,
+        jobs: Iterable[Dict],
+        on_result: Callable[[Dict], None],
+        metrics: Optional[CrawlMetrics] = None
+    ) -> int:
+        """
+        Enqueues the jobs and waits until all of them are finished.
+
+        Args:
+            jobs (Iterable[Dict]): Jobs with the 'url' and store 'type'.
+            on_result (Callable[[Dict], None]): Callback receiving each final result row.
+            metrics (Optional[CrawlMetrics]): Receives the metrics sent by the workers.
+
+        Returns:
+            int: The number of processed jobs.
+        """
+        self.queue.reset()
+        if self.crawl_id is not None:
+            self.queue.set_meta("crawl_id", self.crawl_id)
+        queued = self.queue.enqueue(jobs)
+        logger.info("Distributed crawl: %d jobs queued in %s", queued, self.queue.path)
+
+        processed = 0
+        deadline = Deadline(self.crawl_deadline)
+        try:
+            while True:
+                if deadline.expired():
+                    # Results the workers already sent are written as they are
+                    # (there is no time left to retry them), then the jobs still
+                    # leased or waiting for another lease are recorded as timed
+                    # out. Jobs no worker has leased are not written, so a
+                    # resumed crawl continues with them.
+                    self.queue.close_queue()
+                    started = self.queue.started()
+                    written = set()
+                    while True:
+                        results = self.queue.collect()
+                        if not results:
+                            break
+                        for _, job, row, snapshot in results:
+                            if metrics is not None:
+                                metrics.merge(snapshot)
+                            on_result(row)
+                            written.add(job.get("url"))
+                        processed += len(results)
+                    expired = [job for job in started if job.get("url") not in written]
+                    for job in expired:
+                        on_result(build_result_row(job.get("type"), job.get("url"), None, CRAWL_DEADLINE_ERROR))
+                    processed += len(expired)
+                    self.timed_out = len(expired)
+                    break
+
+                # Read before collecting: a worker marks a job done and stores its
+                # result in one transaction, so once nothing is unfinished, this
+                # collect() returns every remaining result.
+                finished = self.queue.unfinished() == 0
+                results = self.queue.collect()
+
+                for job_id, job, row, snapshot in results:
+                    if metrics is not None:
+                        metrics.merge(snapshot)
+                    attempt = job.get("attempt", 0)
+                    if self.retry_policy is not None and self.retry_policy.should_retry(attempt, row.get("error")):
+                        self.queue.retry(job_id, self.retry_policy.delay(attempt + 1))
+                        self.retried += 1
+                        continue
+                    on_result(row)
+                    processed += 1
+
+                requeued, given_up = self.queue.requeue_expired(self.max_leases)
+                if requeued:
+                    self.requeued += requeued
+                    logger.warning("Distributed crawl: requeued %d jobs of expired leases", requeued)
+                for _, job in given_up:
+                    on_result(build_result_row(job.get("type"), job.get("url"), None, "Lease expired"))
+                    processed += 1
+
+                if not results and not given_up:
+                    if finished:
+                        break
+                    time.sleep(min(self.poll_interval, deadline.remaining() or self.poll_interval))
+        finally:
+            self.queue.close_queue()
+
+        return processed
+
+
+def run_worker(
+    config: Dict,
+    worker_id: Optional[str] = None,
+    queue_path: Optional[str] = None
+) -> int:
+    """
+    Runs a worker through one run of the coordinator.
+
+    The worker waits until the coordinator has opened a run (a queue still
+    holding the closed run of a previous crawl does not count) and exits once
+    that run is closed.
+
+    Args:
+        config (Dict): The crawler configuration ("distributed", "timeout", "rate_limits",
+            "session_store", "archive", "job_deadline", "max_body_size").
+        worker_id (Optional[str]): Name of the worker (default host-pid).
+        queue_path (Optional[str]): Overrides config["distributed"]["queue"].
+
+    Returns:
+        int: The number of jobs the worker completed.
+    """
+    settings = config.get("distributed", {})
+    worker_id = worker_id or default_worker_id()
+    lease_seconds = settings.get("lease_seconds", 60.0)
+    batch_size = settings.get("batch_size", 4)
+    poll_interval = settings.get("poll_interval", 0.5)
+
+    queue_path = queue_path or settings.get("queue", os.path.join(config.get("output_dir", "output"), "queue.sqlite"))
+    queue = WorkQueue(queue_path, lease_seconds)
+
+    rate_limits = config.get("rate_limits")
+    scheduler = PolitenessScheduler(rate_limits) if rate_limits else None
+    metrics = CrawlMetrics()
+    downloader_args = dict(
+        timeout=config.get("timeout", 5),
+        throttle=scheduler.acquire if scheduler is not None else None,
+        metrics=metrics,
+        session_store=session_store.from_config(config.get("session_store")),
+        max_body_size=config.get("max_body_size", DEFAULT_MAX_BODY_SIZE)
+    )
+    downloader = Downloader(**downloader_args)
+    job_deadline = config.get("job_deadline") or None
+
+    pages = archive.from_config(config.get("archive"))
+
+    def fetch(downloader: Downloader, job: Dict):
+        html, error = downloader.fetch(job.get("url"))
+        if pages is not None and pages.crawl_id is not None:
+            archive_page(pages, job, html)
+        return html, error
+
+    stop = threading.Event()
+    beat_failure = []
+
+    def heartbeat(run_id: str):
+        # A SQLite connection belongs to the thread that opened it, so the
+        # heartbeat thread has its own.
+        try:
+            heartbeat_queue = WorkQueue(queue.path, lease_seconds)
+        except Exception as exc:
+            beat_failure.append(exc)
+            return
+        heartbeat_queue.run_id = run_id
+        try:
+            while not stop.wait(lease_seconds / 3):
+                try:
+                    heartbeat_queue.heartbeat(worker_id)
+                except sqlite3.OperationalError as exc:
+                    # The queue file is locked by another node; the next beat tries again.
+                    logger.warning("Worker %s: heartbeat failed: %s", worker_id, exc)
+        except Exception as exc:
+            beat_failure.append(exc)
+        finally:
+            heartbeat_queue.close()
+
+    beat: Optional[threading.Thread] = None
+    logger.info("Worker %s: polling %s", worker_id, queue.path)
+
+    completed = 0
+    try:
+        while not queue.join_run():
+            time.sleep(poll_interval)
+        beat = threading.Thread(target=heartbeat, args=(queue.run_id,), name="worker-heartbeat", daemon=True)
+        beat.start()
+
+        # The coordinator closes the queue once the crawl is over, or early
+        # when the crawl deadline passes.
+        while not queue.is_closed():
+            leased = queue.lease(worker_id, batch_size)
+            if not leased:
+                time.sleep(poll_interval)
+                continue
+
+            if pages is not None:
+                pages.crawl_id = queue.get_meta("crawl_id")
+
+            for job_id, job in leased:
+                if beat_failure:
+                    # Without heartbeats the leases expire and the jobs are crawled twice.
+                    raise RuntimeError(f"Worker {worker_id}: heartbeat stopped") from beat_failure[0]
+                if queue.is_closed():
+                    break
+                store_type = job.get("type")
+                url = job.get("url")
+                deadline = Deadline(job_deadline)
+                try:
+                    html, error = call_with_deadline(deadline.remaining(), fetch, downloader, job)
+                except DeadlineExceeded as exc:
+                    row = build_result_row(store_type, url, None, str(exc))
+                    # The abandoned download keeps the old downloader.
+                    downloader = Downloader(**downloader_args)
+                else:
+                    # The extraction is interrupted on the main thread rather than
+                    # left running; build_result_row records a DeadlineExceeded
+                    # raised in the extractor as the row's error.
+                    try:
+                        row = call_with_alarm(deadline.remaining(), build_result_row, store_type, url, html, error, metrics)
+                    except DeadlineExceeded:
+                        row = build_result_row(store_type, url, None, JOB_DEADLINE_ERROR)
+                if queue.complete(worker_id, job_id, row, metrics.drain()):
+                    completed += 1
+    finally:
+        stop.set()
+        if beat is not None:
+            beat.join()
+        downloader.close()
+        if pages is not None:
+            pages.close()
+        queue.close()
+
+    logger.info("Worker %s: finished %d jobs", worker_id, completed)
+    return completed
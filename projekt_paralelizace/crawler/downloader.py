@@ -1,9 +1,15 @@
 import random
+import re
+import threading
 import time
-from typing import Optional, Tuple
+from typing import Callable, Dict, Optional, Tuple
 import tls_client
 from urllib.parse import urlparse
 
+from .cache import CachedResponse, ResponseCache
+from .metrics import CrawlMetrics
+from .session_store import SessionStore, add_cookies, cookies_to_dicts
+
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
@@ -12,25 +18,82 @@ USER_AGENTS = [
 ]
 
 
+# Default limit of a response body in bytes.
+DEFAULT_MAX_BODY_SIZE = 10 * 1024 * 1024
+
+# Default limit of a sitemap body in bytes (the sitemap protocol allows 50 MB uncompressed).
+DEFAULT_MAX_SITEMAP_SIZE = 50 * 1024 * 1024
+
+# Only bodies smaller than this (in bytes) are scanned for captcha markers;
+# a captcha page is small, a product page is not.
+CAPTCHA_SCAN_LIMIT = 10000
+
+_CAPTCHA_RE = re.compile(rb"captcha|robot", re.IGNORECASE)
+
+
+def _header(headers, name: str) -> Optional[str]:
+    value = headers.get(name) if headers else None
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value
+
+
 class Downloader:
     """
     Universal downloader for extracting HTML content from various e-commerce sites (Alza, Datart, CZC, etc.).
 
     This class handles TLS fingerprinting, session management, cookie warm-up, and header randomization
     to mimic a real browser and bypass basic anti-bot protections.
+
+    A single instance is meant to be long-lived: it keeps one TLS session per domain, so
+    connections and warm-up cookies are reused by every request to that domain. It is safe
+    to share one instance between threads; the warm-up of a domain runs only once.
     """
 
-    def __init__(self, timeout: int = 15):
+    def __init__(
+        self,
+        timeout: int = 15,
+        throttle: Optional[Callable[[str], None]] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[CrawlMetrics] = None,
+        session_store: Optional[SessionStore] = None,
+        max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE,
+        max_sitemap_size: Optional[int] = DEFAULT_MAX_SITEMAP_SIZE
+    ):
         """
         Initializes the Downloader with a specific timeout.
 
         Args:
             timeout (int): The timeout for HTTP requests in seconds. Defaults to 15.
+            throttle (Optional[Callable[[str], None]]): Called with the domain before every
+                request and expected to block until the request is allowed (for example
+                PolitenessScheduler.acquire). When set, it replaces the random pause
+                after the warm-up request.
+            cache (Optional[ResponseCache]): Response cache used to skip or revalidate
+                downloads of already fetched pages.
+            metrics (Optional[CrawlMetrics]): Collects per-domain timings, status codes
+                and sizes of the downloads.
+            session_store (Optional[SessionStore]): Persists the warm-up cookies, so a
+                domain warmed up within the store's TTL (by any run) is not warmed up again.
+            max_body_size (Optional[int]): Responses with a larger body (in bytes) are
+                rejected before being decoded. None disables the limit.
+            max_sitemap_size (Optional[int]): The same limit for fetch_bytes (sitemaps).
         """
         self.timeout = timeout
+        self.throttle = throttle
+        self.cache = cache
+        self.metrics = metrics
+        self.session_store = session_store
+        self.max_body_size = max_body_size
+        self.max_sitemap_size = max_sitemap_size
         self.client_identifier = "chrome_124"
-        self.session = self._create_session()
+        self.sessions: Dict[str, tls_client.Session] = {}
         self.cookies_warmed_up = set()
+        # Domains whose warm-up got a response, successful or not; a failed
+        # warm-up is not repeated before every request.
+        self._warm_up_attempted = set()
+        self._lock = threading.Lock()
+        self._warm_up_locks: Dict[str, threading.Lock] = {}
 
     def _create_session(self) -> tls_client.Session:
         session = tls_client.Session(
@@ -39,6 +102,15 @@ class Downloader:
         )
         return session
 
+    def _get_session(self, domain: str) -> tls_client.Session:
+        with self._lock:
+            session = self.sessions.get(domain)
+            if session is None:
+                session = self._create_session()
+                self.sessions[domain] = session
+                self._warm_up_locks[domain] = threading.Lock()
+            return session
+
     def _get_headers(self, url: str) -> dict:
         parsed_url = urlparse(url)
         domain = parsed_url.netloc
@@ -74,35 +146,125 @@ class Downloader:
 
         return headers
 
-    def _warm_up(self, url: str) -> None:
+    @staticmethod
+    def _add_validators(headers: dict, cached: CachedResponse) -> None:
+        headers["cache-control"] = "max-age=0"
+        headers.pop("pragma", None)
+        if cached.etag:
+            headers["if-none-match"] = cached.etag
+        if cached.last_modified:
+            headers["if-modified-since"] = cached.last_modified
+
+    def _wait_turn(self, domain: str) -> None:
+        if self.throttle is not None:
+            start = time.perf_counter()
+            self.throttle(domain)
+            if self.metrics is not None:
+                self.metrics.observe_wait(domain, time.perf_counter() - start)
+
+    def _warm_up(self, url: str) -> bool:
         parsed_url = urlparse(url)
         domain = parsed_url.netloc
 
-        if domain in self.cookies_warmed_up:
-            return
-
-        try:
-            home_url = f"https://{domain}/"
-            headers = self._get_headers(home_url)
-
-            self.session.get(
-                home_url,
-                headers=headers,
-                timeout_seconds=10
-            )
+        if domain in self.cookies_warmed_up or domain in self._warm_up_attempted:
+            return domain in self.cookies_warmed_up
+
+        session = self._get_session(domain)
+
+        with self._warm_up_locks[domain]:
+            if domain in self.cookies_warmed_up or domain in self._warm_up_attempted:
+                return domain in self.cookies_warmed_up
+
+            if self._restore_warm_up(domain, session):
+                return True
+
+            try:
+                home_url = f"{parsed_url.scheme or 'https'}://{domain}/"
+                headers = self._get_headers(home_url)
+
+                self._wait_turn(domain)
+                start = time.perf_counter()
+                response = session.get(
+                    home_url,
+                    headers=headers,
+                    timeout_seconds=10
+                )
+                if self.metrics is not None:
+                    self.metrics.observe_warm_up(domain, time.perf_counter() - start)
+
+                self._warm_up_attempted.add(domain)
+                # Only the cookies of a real homepage are worth keeping; those of
+                # a block or captcha page would be reused by every worker.
+                if self._warm_up_succeeded(response):
+                    self.cookies_warmed_up.add(domain)
+                    if self.session_store is not None:
+                        self.session_store.save(domain, cookies_to_dicts(session.cookies))
+                if self.throttle is None:
+                    pause = random.uniform(1.0, 2.5)
+                    time.sleep(pause)
+                    if self.metrics is not None:
+                        self.metrics.observe_wait(domain, pause)
+
+            except Exception:
+                pass
+
+        return domain in self.cookies_warmed_up
+
+    @staticmethod
+    def _warm_up_succeeded(response) -> bool:
+        if not 200 <= response.status_code < 300:
+            return False
+        content = response.content or b""
+        return not (len(content) < CAPTCHA_SCAN_LIMIT and _CAPTCHA_RE.search(content))
+
+    def warm_up(self, url: str) -> bool:
+        """
+        Warms up the domain of the URL (see fetch) unless it is warmed up already.
 
-            self.cookies_warmed_up.add(domain)
-            time.sleep(random.uniform(1.0, 2.5))
+        Returns:
+            bool: True if the domain is warmed up; False if the homepage request
+                failed or was answered with an error status or a captcha page.
+        """
+        return self._warm_up(url)
 
+    def _restore_warm_up(self, domain: str, session: tls_client.Session) -> bool:
+        if self.session_store is None:
+            return False
+        try:
+            cookies = self.session_store.load(domain)
+            if cookies is None:
+                return False
+            add_cookies(session.cookies, cookies)
         except Exception:
-            return
+            return False
+        self.cookies_warmed_up.add(domain)
+        return True
+
+    @staticmethod
+    def _oversized(response, limit: Optional[int]) -> Optional[str]:
+        """Returns an error if the response body exceeds the limit in bytes."""
+        if limit is None:
+            return None
+        declared = _header(response.headers, "Content-Length")
+        size = len(response.content or b"")
+        if declared is not None and declared.isdigit():
+            size = max(size, int(declared))
+        if size > limit:
+            return f"Response body too large ({size} bytes)"
+        return None
 
     def fetch(self, url: str) -> Tuple[Optional[str], Optional[str]]:
         """
         Fetches the HTML content of the given URL.
 
-        This method performs a 'warm-up' request to the domain's homepage to establish cookies
-        before requesting the specific URL. It handles HTTP errors and basic captcha detection.
+        The first request to a domain performs a 'warm-up' request to its homepage to establish
+        cookies; later requests reuse the warmed-up session. It handles HTTP errors and basic captcha detection.
+
+        With a response cache, a fresh cached page is returned without any request, and a stale
+        one is revalidated with If-None-Match / If-Modified-Since and reused on HTTP 304.
+
+        A body larger than max_body_size is rejected. The body is decoded once, and only
+        bodies under CAPTCHA_SCAN_LIMIT bytes are scanned for captcha markers.
 
         Args:
             url (str): The target URL to download.
@@ -112,40 +274,144 @@ class Downloader:
                 - The HTML content (str) if successful, otherwise None.
                 - An error message (str) if failed, otherwise None.
         """
+        html, error, status_code, size, seconds = self._fetch(url)
+
+        if self.metrics is not None:
+            self.metrics.observe_fetch(urlparse(url).netloc, status_code, seconds, size, error)
+
+        return html, error
+
+    def _fetch(self, url: str) -> Tuple[Optional[str], Optional[str], Optional[int], int, float]:
+        """
+        Implements fetch; additionally returns the HTTP status (None for a fresh
+        cache hit, 0 if no response was received), the body size in bytes and
+        the duration of the request itself, without the warm-up and throttling.
+        """
+        status_code = 0
+        size = 0
+        seconds = 0.0
+
         try:
+            cached = self.cache.get(url) if self.cache is not None else None
+            if cached is not None and self.cache.is_fresh(cached):
+                return cached.body, None, None, 0, seconds
+
             self._warm_up(url)
 
             headers = self._get_headers(url)
-
-            response = self.session.get(
-                url,
-                headers=headers,
-                allow_redirects=True,
-                timeout_seconds=self.timeout
-            )
+            if cached is not None:
+                self._add_validators(headers, cached)
+
+            domain = urlparse(url).netloc
+            session = self._get_session(domain)
+
+            self._wait_turn(domain)
+            start = time.perf_counter()
+            try:
+                response = session.get(
+                    url,
+                    headers=headers,
+                    allow_redirects=True,
+                    timeout_seconds=self.timeout
+                )
+            finally:
+                seconds = time.perf_counter() - start
 
             status_code = response.status_code
+            size = len(response.content or b"")
+
+            if status_code == 304 and cached is not None:
+                self.cache.touch(url)
+                return cached.body, None, status_code, size, seconds
 
             if status_code == 403:
-                domain = urlparse(url).netloc
-                return None, f"HTTP 403 Forbidden (Anti-bot block) - {domain}"
+                if self.session_store is not None:
+                    self.session_store.forget(domain)
+                return None, f"HTTP 403 Forbidden (Anti-bot block) - {domain}", status_code, size, seconds
 
             if status_code == 404:
-                return None, "HTTP 404 Not Found"
+                return None, "HTTP 404 Not Found", status_code, size, seconds
 
             if not (200 <= status_code < 300):
-                return None, f"HTTP {status_code}"
+                return None, f"HTTP {status_code}", status_code, size, seconds
 
+            error = self._oversized(response, self.max_body_size)
+            if error is not None:
+                return None, error, status_code, size, seconds
+
+            if size < CAPTCHA_SCAN_LIMIT and _CAPTCHA_RE.search(response.content or b""):
+                return None, "Captcha detected in content", status_code, size, seconds
+
+            # Response.text decodes the body on every access, so it is read once.
             response_text = response.text
-            response_lower = response_text.lower()
 
-            if (
-                ("captcha" in response_lower or "robot" in response_lower)
-                and len(response_text) < 10000
-            ):
-                return None, "Captcha detected in content"
+            if self.cache is not None:
+                self.cache.put(
+                    url,
+                    response_text,
+                    _header(response.headers, "ETag"),
+                    _header(response.headers, "Last-Modified")
+                )
 
-            return response_text, None
+            return response_text, None, status_code, size, seconds
+
+        except Exception as e:
+            return None, str(e), status_code, size, seconds
+
+    def fetch_bytes(self, url: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Fetches the raw response body of the given URL (for example a gzipped sitemap).
+
+        Uses the same sessions, warm-up and throttling as fetch, but no cache
+        and no captcha detection, and max_sitemap_size instead of max_body_size.
+
+        Args:
+            url (str): The target URL to download.
+
+        Returns:
+            Tuple[Optional[bytes], Optional[str]]: The body if successful, otherwise
+            None, and an error message if failed, otherwise None.
+        """
+        try:
+            self._warm_up(url)
+
+            domain = urlparse(url).netloc
+            session = self._get_session(domain)
+            headers = self._get_headers(url)
+            headers["accept"] = "application/xml,text/xml,text/html;q=0.9,*/*;q=0.8"
+
+            self._wait_turn(domain)
+            response = session.get(
+                url,
+                headers=headers,
+                allow_redirects=True,
+                timeout_seconds=self.timeout
+            )
+
+            if not (200 <= response.status_code < 300):
+                return None, f"HTTP {response.status_code}"
+
+            error = self._oversized(response, self.max_sitemap_size)
+            if error is not None:
+                return None, error
+
+            return response.content, None
 
         except Exception as e:
             return None, str(e)
+
+    def close(self) -> None:
+        """Closes all open sessions and forgets their warm-up state."""
+        for session in self.sessions.values():
+            try:
+                session.close()
+            except Exception:
+                pass
+        self.sessions.clear()
+        self._warm_up_locks.clear()
+        self.cookies_warmed_up.clear()
+        self._warm_up_attempted.clear()
+        if self.cache is not None:
+            self.cache.close()
+        if self.session_store is not None:
+            self.session_store.close()
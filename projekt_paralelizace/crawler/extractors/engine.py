@@ -0,0 +1,177 @@
+"""Declarative JSON-LD extraction engine shared by all stores.
+
+Every supported store publishes its product data as schema.org JSON-LD, so a
+store is described by a small StoreSpec and served by a JsonLdExtractor built
+from it. Adding a store only takes a new spec.
+"""
+import json
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from ..normalize import UNKNOWN_NAME, Availability, price_to_halere, schema_availability_code
+from .page_scan import LD_JSON_MARKER, parse_page, read_page
+
+# schema.org availability values mapped to the labels used in the output, checked in order.
+DEFAULT_AVAILABILITY = (
+    ("InStock", "Skladem"),
+    ("OutOfStock", "Nedostupné"),
+    ("Discontinued", "Nedostupné"),
+    ("PreOrder", "Předobjednávka"),
+)
+
+
+class StoreSpec(NamedTuple):
+    """
+    Declarative description of a store's product pages.
+
+    Attributes:
+        store (str): Store name written to the 'store' field.
+        resolve_image_objects (bool): Read the 'url' of ImageObject entries in
+            the 'image' field instead of returning them as they are.
+        product_type (str): JSON-LD @type of the product entity.
+        availability (Tuple[Tuple[str, str], ...]): (schema.org value, label) pairs.
+        price_suffix (str): Appended to the price.
+    """
+    store: str
+    resolve_image_objects: bool = False
+    product_type: str = "Product"
+    availability: Tuple[Tuple[str, str], ...] = DEFAULT_AVAILABILITY
+    price_suffix: str = ",-"
+
+
+class JsonLdExtractor:
+    """
+    Extractor compiled from a StoreSpec.
+
+    Instances are called like the former per-store functions:
+    extractor(html, url) -> dict with url, name, price, availability, image and store,
+    plus the typed price_halere (int or None) and availability_code (Availability value).
+    """
+
+    def __init__(
+        self,
+        spec: StoreSpec,
+        page_reader: Callable[[str], Tuple[Optional[str], List[str]]] = read_page
+    ):
+        """
+        Compiles the extractor.
+
+        Args:
+            spec (StoreSpec): The store description.
+            page_reader (Callable): Returns the h1 text and JSON-LD scripts of a page.
+                                    Defaults to the fast scanner with full-parse fallback.
+        """
+        self.spec = spec
+        self._page_reader = page_reader
+        # The fast scanner may miss the product script of malformed markup, so a
+        # page with JSON-LD but no product found in it is parsed fully once more.
+        self._fallback_reader = parse_page if page_reader is read_page else None
+        self._store = spec.store
+        self._product_type = spec.product_type
+        self._availability = tuple(spec.availability)
+        self._price_suffix = spec.price_suffix
+        self._read_image = self._image_with_objects if spec.resolve_image_objects else self._image_plain
+
+    def __repr__(self):
+        return f"JsonLdExtractor({self._store!r})"
+
+    def _find_product(self, data) -> Optional[dict]:
+        product_type = self._product_type
+
+        if isinstance(data, dict):
+            if data.get("@type") == product_type:
+                return data
+            data = data.get("@graph")
+
+        if isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict) and item.get("@type") == product_type:
+                    return item
+
+        return None
+
+    @staticmethod
+    def _image_with_objects(image_field):
+        if isinstance(image_field, list) and len(image_field) > 0:
+            first_item = image_field[0]
+            if isinstance(first_item, dict):
+                return first_item.get("url", "")
+            return str(first_item)
+
+        if isinstance(image_field, dict):
+            return image_field.get("url", "")
+
+        if isinstance(image_field, str):
+            return image_field
+
+        return None
+
+    @staticmethod
+    def _image_plain(image_field):
+        if isinstance(image_field, list) and len(image_field) > 0:
+            return image_field[0]
+
+        if isinstance(image_field, str):
+            return image_field
+
+        return None
+
+    def _read_product(self, json_scripts: List[str]) -> Optional[dict]:
+        """The product entity of the first JSON-LD script that holds one."""
+        for script_text in json_scripts:
+            try:
+                product_data = self._find_product(json.loads(script_text))
+            except Exception:
+                continue
+            if product_data is not None:
+                return product_data
+        return None
+
+    def __call__(self, html: str, url: str) -> dict:
+        result = {
+            "url": url,
+            "name": UNKNOWN_NAME,
+            "price": "N/A",
+            "availability": "Neznámá",
+            "image": "",
+            "store": self._store,
+            "price_halere": None,
+            "availability_code": Availability.UNKNOWN.value
+        }
+
+        heading, json_scripts = self._page_reader(html)
+        product_data = self._read_product(json_scripts)
+        if product_data is None and self._fallback_reader is not None and LD_JSON_MARKER in html:
+            heading, json_scripts = self._fallback_reader(html)
+            product_data = self._read_product(json_scripts)
+
+        if heading is not None:
+            result["name"] = heading
+
+        if product_data is not None:
+            try:
+                image_url = self._read_image(product_data.get("image"))
+                if image_url is not None:
+                    result["image"] = image_url
+
+                offers = product_data.get("offers")
+                if isinstance(offers, list) and len(offers) > 0:
+                    offers = offers[0]
+
+                if isinstance(offers, dict):
+                    if "price" in offers:
+                        result["price"] = str(offers["price"]) + self._price_suffix
+                        result["price_halere"] = price_to_halere(offers["price"])
+
+                    availability_url = offers.get("availability", "")
+                    for token, label in self._availability:
+                        if token in availability_url:
+                            result["availability"] = label
+                            break
+                    # The code follows the schema.org value, not the store's label,
+                    # so values without a label of the store are coded too.
+                    result["availability_code"] = schema_availability_code(availability_url)
+
+            except Exception:
+                pass
+
+        return result
@@ -0,0 +1,90 @@
+"""Fast scanner for the parts of a product page the extractors read.
+
+The extractors only need the first <h1> and the application/ld+json scripts.
+Instead of building a BeautifulSoup tree of the whole page, the scanner finds
+them with a single regular expression pass that skips comments, scripts and
+styles the same way an HTML parser does.
+"""
+import html as html_lib
+import re
+from typing import List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+_TOKEN_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(?P<raw>script|style)\b(?P<attrs>[^>]*)>(?P<body>.*?)</(?P=raw)\s*>"
+    r"|<h1\b[^>]*>(?P<h1>.*?)</h1\s*>",
+    re.IGNORECASE | re.DOTALL
+)
+_LD_JSON_TYPE_RE = re.compile(r"""\btype\s*=\s*(["']?)\s*application/ld\+json\s*\1""", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]*>")
+_H1_OPEN_RE = re.compile(r"<h1\b", re.IGNORECASE)
+LD_JSON_MARKER = "application/ld+json"
+
+
+def _element_text(fragment: str) -> str:
+    """Text of an HTML fragment, like BeautifulSoup's get_text(strip=True)."""
+    parts = (html_lib.unescape(part).strip() for part in _TAG_RE.split(fragment))
+    return "".join(part for part in parts if part)
+
+
+def scan_page(html: str) -> Tuple[Optional[str], List[str]]:
+    """
+    Scans the page for the first h1 and the JSON-LD scripts without building a DOM.
+
+    Args:
+        html (str): The page HTML.
+
+    Returns:
+        Tuple[Optional[str], List[str]]: The text of the first h1 (None if there
+        is none) and the raw contents of all application/ld+json scripts.
+    """
+    heading = None
+    scripts = []
+
+    for match in _TOKEN_RE.finditer(html):
+        raw_tag = match.group("raw")
+        if raw_tag is not None:
+            if raw_tag.lower() == "script" and _LD_JSON_TYPE_RE.search(match.group("attrs")):
+                scripts.append(match.group("body"))
+        elif heading is None and match.group("h1") is not None:
+            heading = _element_text(match.group("h1"))
+
+    return heading, scripts
+
+
+def parse_page(html: str) -> Tuple[Optional[str], List[str]]:
+    """
+    Reads the first h1 and the JSON-LD scripts from a full BeautifulSoup parse.
+
+    Returns the same values as scan_page.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    heading = None
+    h1_elem = soup.find("h1")
+    if h1_elem is not None:
+        heading = h1_elem.get_text(strip=True)
+
+    scripts = [script.get_text() for script in soup.find_all("script", type="application/ld+json")]
+    return heading, scripts
+
+
+def read_page(html: str) -> Tuple[Optional[str], List[str]]:
+    """
+    Returns the first h1 and the JSON-LD scripts of a page.
+
+    The fast scanner is used first. If it misses an h1 or JSON-LD block that the
+    page appears to contain (for example because of malformed markup), the page
+    is parsed with BeautifulSoup instead.
+    """
+    heading, scripts = scan_page(html)
+
+    missed_heading = heading is None and _H1_OPEN_RE.search(html) is not None
+    missed_scripts = not scripts and LD_JSON_MARKER in html
+
+    if missed_heading or missed_scripts:
+        return parse_page(html)
+
+    return heading, scripts
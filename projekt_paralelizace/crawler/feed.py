@@ -0,0 +1,170 @@
+"""Job feed for the worker pool.
+
+The feed is the iterable handed to Pool.imap_unordered. It yields jobs from
+the job source and re-injects retried jobs once their backoff delay has passed,
+without any worker waiting for them.
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .retry import RetryPolicy
+
+
+class JobFeed:
+    """
+    Thread-safe iterable of jobs with delayed re-enqueueing.
+
+    The pool consumes the feed from its task handler thread, while the main
+    thread reports every finished job through complete(). The feed ends once
+    the source is exhausted and no job is in flight or waiting for a retry.
+
+    At most `max_in_flight` jobs are handed out and not yet completed at any
+    time, so retries are dispatched promptly instead of queueing behind the
+    whole job source.
+    """
+
+    def __init__(self, jobs: Iterable[Dict], policy: Optional[RetryPolicy] = None, max_in_flight: int = 8):
+        """
+        Initializes the feed.
+
+        Args:
+            jobs (Iterable[Dict]): The job source.
+            policy (Optional[RetryPolicy]): Retry policy; None disables retries.
+            max_in_flight (int): Maximum number of jobs dispatched but not completed.
+        """
+        self.policy = policy
+        self.max_in_flight = max(1, max_in_flight)
+        self.retried = 0
+
+        self._jobs = iter(jobs)
+        self._exhausted = False
+        self._closed = False
+        self._in_flight = 0
+        # Jobs dispatched and not completed, by id() of the dispatched dict, so
+        # two jobs for the same URL are both kept.
+        self._running: Dict[int, Dict] = {}
+        self._delayed = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def __iter__(self) -> Iterator[Dict]:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                if job is None:
+                    return
+                self._dispatched(job)
+            yield job
+
+    def batches(self, size: int) -> Iterator[List[Dict]]:
+        """
+        Yields the jobs in lists of up to `size` jobs.
+
+        A batch is cut short rather than waiting for more jobs, so a partial
+        batch never holds back jobs that the feed is waiting on.
+        """
+        while True:
+            with self._cond:
+                job = self._next_job()
+                if job is None:
+                    return
+                self._dispatched(job)
+                batch = [job]
+                while len(batch) < size:
+                    job = self._next_job(block=False)
+                    if job is None:
+                        break
+                    self._dispatched(job)
+                    batch.append(job)
+            yield batch
+
+    def _dispatched(self, job: Dict):
+        self._in_flight += 1
+        self._running[id(job)] = job
+
+    def _next_job(self, block: bool = True) -> Optional[Dict]:
+        while not self._closed:
+            now = time.monotonic()
+
+            if self._in_flight < self.max_in_flight:
+                if self._delayed and self._delayed[0][0] <= now:
+                    return heapq.heappop(self._delayed)[2]
+
+                if not self._exhausted:
+                    try:
+                        return next(self._jobs)
+                    except StopIteration:
+                        self._exhausted = True
+                        continue
+
+            if not block or (self._exhausted and not self._delayed and self._in_flight == 0):
+                return None
+
+            timeout = None
+            if self._delayed and self._in_flight < self.max_in_flight:
+                timeout = max(0.0, self._delayed[0][0] - now)
+            self._cond.wait(timeout)
+
+        return None
+
+    def complete(self, job: Dict, row: Dict) -> bool:
+        """
+        Reports a finished job.
+
+        Args:
+            job (Dict): The job as it was dispatched.
+            row (Dict): Its result row.
+
+        Returns:
+            bool: True if the row is the final outcome of the job, False if the
+                  job was scheduled for a retry and the row should be discarded.
+        """
+        attempt = job.get("attempt", 0)
+        retry = self.policy is not None and self.policy.should_retry(attempt, row.get("error"))
+
+        with self._cond:
+            self._in_flight -= 1
+            self._forget(job)
+            if retry:
+                retry_job = dict(job, attempt=attempt + 1)
+                ready_at = time.monotonic() + self.policy.delay(attempt + 1)
+                heapq.heappush(self._delayed, (ready_at, next(self._sequence), retry_job))
+                self.retried += 1
+            self._cond.notify_all()
+
+        return not retry
+
+    def _forget(self, job: Dict):
+        if self._running.pop(id(job), None) is not None:
+            return
+        # The pool engine completes a copy of the dispatched job sent back by
+        # its worker process.
+        for key, running in self._running.items():
+            if running == job:
+                del self._running[key]
+                return
+
+    def close(self):
+        """Stops the feed; a consumer blocked in the iterator returns immediately."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def abandon(self) -> List[Dict]:
+        """
+        Stops the feed and returns the jobs dispatched but not completed and
+        the jobs waiting for a retry (for example because the crawl deadline
+        has passed).
+        """
+        with self._cond:
+            self._closed = True
+            unfinished = list(self._running.values())
+            unfinished += [job for _, _, job in sorted(self._delayed)]
+            self._running.clear()
+            self._delayed = []
+            self._in_flight = 0
+            self._cond.notify_all()
+        return unfinished
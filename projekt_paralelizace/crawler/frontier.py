@@ -0,0 +1,154 @@
+"""Deduplicating URL frontier.
+
+Discovered URLs are kept in a SQLite file in the order they were found. A Bloom
+filter in memory answers most "seen before?" questions without touching the
+disk: a URL it has never seen is inserted directly, and only possible
+duplicates are checked against the on-disk set.
+"""
+import hashlib
+import math
+import os
+import sqlite3
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        Sizes the filter for the expected number of items.
+
+        Args:
+            capacity (int): Expected number of items.
+            error_rate (float): Target false positive probability at capacity.
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, item: str) -> bool:
+        """Adds an item; returns True if it may have been present already."""
+        present = True
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                present = False
+                self.bits[position >> 3] |= mask
+        return present
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class UrlFrontier:
+    """
+    Set of discovered product URLs backed by a SQLite file.
+
+    A URL is stored in its canonical form, which is the deduplication key;
+    a URL whose crawled form differs from it (a listed URL) keeps that form
+    as its href.
+
+    URLs are deduplicated across stores and runs; reopening the file restores
+    the Bloom filter from the stored URLs.
+    """
+
+    def __init__(self, path: str, capacity: int = 1_000_000, error_rate: float = 0.001):
+        """
+        Opens (or creates) the frontier.
+
+        Args:
+            path (str): Path of the SQLite file.
+            capacity (int): Expected number of URLs (sizes the Bloom filter).
+            error_rate (float): Bloom filter false positive rate at capacity.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.bloom = BloomFilter(capacity, error_rate)
+        # The crawl reads the frontier from the pool's task handler thread once
+        # discovery is done; it is never used by two threads at once.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, store TEXT NOT NULL, href TEXT)"
+        )
+        # A frontier of an older version has no href column.
+        if "href" not in [column[1] for column in self._conn.execute("PRAGMA table_info(urls)")]:
+            self._conn.execute("ALTER TABLE urls ADD COLUMN href TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS urls_store ON urls (store, id)")
+        self._conn.commit()
+
+        for (url,) in self._conn.execute("SELECT url FROM urls"):
+            self.bloom.add(url)
+
+    def add_many(self, entries: Iterable[Tuple[str, ...]]) -> int:
+        """
+        Adds (store, url) pairs, or (store, url, href) triples, in one transaction.
+
+        Returns:
+            int: Number of URLs that were not in the frontier yet.
+        """
+        added = 0
+        with self._conn:
+            for store, url, *href in entries:
+                values = (url, store, href[0] if href else None)
+                if self.bloom.add(url):
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO urls (url, store, href) VALUES (?, ?, ?)", values
+                    )
+                    added += cursor.rowcount
+                else:
+                    self._conn.execute("INSERT INTO urls (url, store, href) VALUES (?, ?, ?)", values)
+                    added += 1
+        return added
+
+    def add(self, store: str, url: str, href: Optional[str] = None) -> bool:
+        """Adds one URL (crawled as href, if given); returns True if it was new."""
+        return self.add_many([(store, url, href)]) == 1
+
+    def __contains__(self, url: str) -> bool:
+        if url not in self.bloom:
+            return False
+        return self._conn.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def iter_urls(self, store: Optional[str] = None, page_size: int = 1000) -> Iterator[str]:
+        """
+        Yields the URLs to crawl (of one store, if given) in discovery order:
+        the href of a URL that has one.
+
+        The URLs are read page by page, so the frontier is never loaded into memory.
+        """
+        last_id = 0
+        while True:
+            if store is None:
+                page = self._conn.execute(
+                    "SELECT id, COALESCE(href, url) FROM urls WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_size)
+                ).fetchall()
+            else:
+                page = self._conn.execute(
+                    "SELECT id, COALESCE(href, url) FROM urls WHERE id > ? AND store = ? ORDER BY id LIMIT ?",
+                    (last_id, store, page_size)
+                ).fetchall()
+            if not page:
+                return
+            for last_id, url in page:
+                yield url
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
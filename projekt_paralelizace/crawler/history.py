@@ -0,0 +1,127 @@
+"""Price history store.
+
+Keeps the latest known state of every product, keyed by (store, url), and an
+append-only history with one row per observed change of name, price or
+availability. Unchanged products cause no writes at all.
+"""
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+TRACKED_FIELDS = ("name", "price", "availability")
+
+
+class PriceHistory:
+    """
+    SQLite backed price history.
+
+    Table `latest` holds the current state of each product (primary key
+    (store, url)); table `history` holds every change with the time it was
+    observed, indexed by (store, url, observed_at).
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) the history database.
+
+        Args:
+            path (str): Path of the SQLite file.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        # Batches are recorded from the result writer, possibly on its flush thread.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS latest ("
+            "store TEXT NOT NULL, url TEXT NOT NULL, name TEXT, price TEXT, availability TEXT, "
+            "first_seen REAL NOT NULL, last_changed REAL NOT NULL, "
+            "PRIMARY KEY (store, url)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS history ("
+            "store TEXT NOT NULL, url TEXT NOT NULL, name TEXT, price TEXT, availability TEXT, "
+            "observed_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS history_product ON history (store, url, observed_at);"
+        )
+        self._conn.commit()
+
+    def record(self, rows: Iterable[Dict], observed_at: Optional[float] = None) -> int:
+        """
+        Records a batch of crawl results in one transaction.
+
+        Rows with an error are ignored. A history row is appended (and the
+        latest state replaced) only for new products and products whose name,
+        price or availability differ from the latest state.
+
+        Args:
+            rows (Iterable[Dict]): Result rows.
+            observed_at (Optional[float]): Observation time (UNIX seconds); now by default.
+
+        Returns:
+            int: Number of changed (or new) products.
+        """
+        observed_at = time.time() if observed_at is None else observed_at
+        changed = 0
+
+        with self._conn:
+            for row in rows:
+                if row.get("error") or not row.get("url") or not row.get("store"):
+                    continue
+
+                key = (row["store"], row["url"])
+                values = tuple(row.get(field) for field in TRACKED_FIELDS)
+                current = self._conn.execute(
+                    "SELECT name, price, availability, first_seen FROM latest WHERE store = ? AND url = ?",
+                    key
+                ).fetchone()
+
+                if current is not None and tuple(current)[:3] == values:
+                    continue
+
+                first_seen = current["first_seen"] if current is not None else observed_at
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO latest "
+                    "(store, url, name, price, availability, first_seen, last_changed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    key + values + (first_seen, observed_at)
+                )
+                self._conn.execute(
+                    "INSERT INTO history (store, url, name, price, availability, observed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    key + values + (observed_at,)
+                )
+                changed += 1
+
+        return changed
+
+    def latest(self, store: str, url: str) -> Optional[Dict]:
+        """Returns the latest state of a product, or None if it was never recorded."""
+        row = self._conn.execute(
+            "SELECT * FROM latest WHERE store = ? AND url = ?", (store, url)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def history(self, store: str, url: str) -> List[Dict]:
+        """Returns all recorded states of a product, oldest first."""
+        rows = self._conn.execute(
+            "SELECT name, price, availability, observed_at FROM history "
+            "WHERE store = ? AND url = ? ORDER BY observed_at",
+            (store, url)
+        )
+        return [dict(row) for row in rows]
+
+    def snapshot(self, store: Optional[str] = None) -> Iterator[Dict]:
+        """Yields the latest state of every product (of one store, if given)."""
+        if store is None:
+            rows = self._conn.execute("SELECT * FROM latest ORDER BY store, url")
+        else:
+            rows = self._conn.execute("SELECT * FROM latest WHERE store = ? ORDER BY url", (store,))
+        for row in rows:
+            yield dict(row)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,119 @@
+"""Checkpoint journal of completed crawl jobs.
+
+The journal is an append-only JSON Lines file. After each batch of result rows
+is flushed to the output, one line per row is appended with the job's URL, its
+status and the output offset at which the batch ended. A resumed crawl skips
+the journaled URLs and cuts the output back to the last journaled offset.
+"""
+import json
+import os
+from typing import Dict, List, Set, Tuple
+
+
+class CrawlJournal:
+    """
+    Append-only journal of finished jobs.
+
+    Each line looks like:
+    {"url": "...", "store": "alza", "status": "ok", "offset": 12345}
+    where "status" is "ok" or "error" and "offset" is the size of the output
+    file once the row was written.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initializes the journal.
+
+        Args:
+            path (str): Path of the journal file.
+        """
+        self.path = path
+        self._file = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_file"] = None
+        return state
+
+    def load(self) -> Tuple[Set[str], int]:
+        """
+        Reads the journal of a previous run.
+
+        A partially written last line (from a crash) is ignored.
+
+        Returns:
+            Tuple[Set[str], int]: The URLs of finished jobs and the last
+            journaled output offset (0 if there is no journal).
+        """
+        done = set()
+        offset = 0
+
+        if not os.path.exists(self.path):
+            return done, offset
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                done.add(entry["url"])
+                offset = max(offset, entry.get("offset", 0))
+
+        return done, offset
+
+    def open(self, resume: bool = False):
+        """
+        Opens the journal for writing.
+
+        Args:
+            resume (bool): Append to the existing journal instead of starting a new one.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        if resume and os.path.exists(self.path):
+            self._drop_partial_line()
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def _drop_partial_line(self):
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - 65536)
+            f.seek(start)
+            tail = f.read()
+            end = start + tail.rfind(b"\n") + 1
+            if end != size:
+                f.truncate(end)
+
+    def record(self, rows: List[Dict], offset: int):
+        """
+        Appends the finished rows of one flushed output batch.
+
+        Args:
+            rows (List[Dict]): The rows written in the batch.
+            offset (int): Output offset after the batch.
+        """
+        if not rows:
+            return
+
+        lines = []
+        for row in rows:
+            lines.append(json.dumps({
+                "url": row.get("url"),
+                "store": row.get("store"),
+                "status": "error" if row.get("error") else "ok",
+                "offset": offset
+            }, ensure_ascii=False))
+
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    def close(self):
+        """Fsyncs and closes the journal."""
+        if self._file is None or self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
@@ -0,0 +1,307 @@
+"""Crawl instrumentation.
+
+Workers record counters and latency histograms in a process-local
+CrawlMetrics and periodically hand drained snapshots to the parent process,
+which merges them and writes a JSON summary and a Prometheus text file.
+"""
+import json
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_HELP = {
+    "crawler_fetch_seconds": ("histogram", "Duration of page download requests (network time only)"),
+    "crawler_warm_up_seconds": ("histogram", "Duration of homepage warm-up requests"),
+    "crawler_wait_seconds": ("histogram", "Time spent waiting for rate limits and after warm-ups"),
+    "crawler_parse_seconds": ("histogram", "Duration of product extraction"),
+    "crawler_responses_total": ("counter", "Responses by status code (0 = no response)"),
+    "crawler_cache_hits_total": ("counter", "Pages served from the response cache"),
+    "crawler_bytes_total": ("counter", "Bytes of downloaded page bodies"),
+    "crawler_blocked_total": ("counter", "HTTP 403 anti-bot blocks"),
+    "crawler_captcha_total": ("counter", "Captcha pages"),
+    "crawler_errors_total": ("counter", "Failed downloads"),
+    "crawler_concurrency_limit": ("gauge", "Current adaptive limit of concurrent fetches"),
+}
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _key(key) -> Tuple[str, Labels]:
+    """A metric key of a snapshot, with JSON lists turned back into tuples."""
+    name, labels = key
+    return name, tuple(tuple(pair) for pair in labels)
+
+
+class Histogram:
+    """Cumulative-style latency histogram with fixed buckets."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge_state(self, state: Tuple[List[int], float, int]):
+        counts, total, count = state
+        for index, value in enumerate(counts):
+            self.counts[index] += value
+        self.sum += total
+        self.count += count
+
+    def state(self) -> Tuple[List[int], float, int]:
+        return list(self.counts), self.sum, self.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimates a quantile as the upper bound of the bucket containing it.
+
+        A quantile past the last bucket is reported as the last bound (so the
+        estimate is only a lower bound there), keeping the value valid JSON.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank:
+                break
+        return self.buckets[min(index, len(self.buckets) - 1)]
+
+
+class CrawlMetrics:
+    """
+    Thread-safe collection of labelled counters and histograms.
+
+    drain() returns a picklable, JSON-serializable snapshot of everything recorded since the last
+    drain and resets the collection; merge() adds such a snapshot.
+    """
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(**labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(**labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, _labels(**labels))] = value
+
+    def observe_fetch(self, domain: str, status: Optional[int], seconds: float, size: int, error: Optional[str]):
+        """
+        Records one call of Downloader.fetch.
+
+        Args:
+            domain (str): Domain of the URL.
+            status (Optional[int]): HTTP status (0 if no response, None for a fresh cache hit).
+            seconds (float): Duration of the request, without the warm-up and throttling.
+            size (int): Size of the response body in bytes.
+            error (Optional[str]): The error message, if the fetch failed.
+        """
+        if status is None:
+            self.inc("crawler_cache_hits_total", domain=domain)
+            return
+
+        self.observe("crawler_fetch_seconds", seconds, domain=domain)
+        self.inc("crawler_responses_total", domain=domain, status=status)
+        if size:
+            self.inc("crawler_bytes_total", size, domain=domain)
+        if status == 403:
+            self.inc("crawler_blocked_total", domain=domain)
+        if error is not None:
+            self.inc("crawler_errors_total", domain=domain)
+            if error.startswith("Captcha"):
+                self.inc("crawler_captcha_total", domain=domain)
+
+    def observe_warm_up(self, domain: str, seconds: float):
+        self.observe("crawler_warm_up_seconds", seconds, domain=domain)
+
+    def observe_wait(self, domain: str, seconds: float):
+        self.observe("crawler_wait_seconds", seconds, domain=domain)
+
+    def observe_parse(self, store: str, seconds: float):
+        self.observe("crawler_parse_seconds", seconds, store=store)
+
+    def drain(self) -> Dict:
+        """Returns and resets everything recorded so far (gauges are kept)."""
+        with self._lock:
+            snapshot = {
+                "counters": list(self.counters.items()),
+                "histograms": [(key, histogram.state()) for key, histogram in self.histograms.items()],
+                "gauges": list(self.gauges.items())
+            }
+            self.counters = {}
+            self.histograms = {}
+        return snapshot
+
+    def merge(self, snapshot: Optional[Dict]):
+        """Adds a snapshot returned by drain(), as it is or after a JSON round trip."""
+        if not snapshot:
+            return
+        with self._lock:
+            for key, value in snapshot["counters"]:
+                key = _key(key)
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, state in snapshot["histograms"]:
+                key = _key(key)
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.merge_state(state)
+            for key, value in snapshot.get("gauges", []):
+                self.gauges[_key(key)] = value
+
+    def _counter(self, name: str, label: str, value: str) -> float:
+        return sum(
+            count for (metric, labels), count in self.counters.items()
+            if metric == name and (label, value) in labels
+        )
+
+    def summary(self) -> Dict:
+        """Builds a JSON-friendly per-domain and per-store summary."""
+        domains = sorted({
+            dict(labels)["domain"]
+            for (_, labels) in list(self.counters) + list(self.histograms) + list(self.gauges)
+            if "domain" in dict(labels)
+        })
+        stores = sorted({
+            dict(labels)["store"] for (name, labels) in self.histograms if name == "crawler_parse_seconds"
+        })
+
+        summary = {"domains": {}, "stores": {}}
+
+        for domain in domains:
+            statuses = {
+                dict(labels)["status"]: int(count)
+                for (name, labels), count in self.counters.items()
+                if name == "crawler_responses_total" and dict(labels).get("domain") == domain
+            }
+            requests = sum(statuses.values())
+            fetch = self.histograms.get(("crawler_fetch_seconds", _labels(domain=domain)))
+            warm_up = self.histograms.get(("crawler_warm_up_seconds", _labels(domain=domain)))
+            wait = self.histograms.get(("crawler_wait_seconds", _labels(domain=domain)))
+            blocked = self._counter("crawler_blocked_total", "domain", domain)
+            captcha = self._counter("crawler_captcha_total", "domain", domain)
+
+            entry = {
+                "requests": requests,
+                "status_codes": statuses,
+                "cache_hits": int(self._counter("crawler_cache_hits_total", "domain", domain)),
+                "errors": int(self._counter("crawler_errors_total", "domain", domain)),
+                "bytes": int(self._counter("crawler_bytes_total", "domain", domain)),
+                "blocked_rate": round(blocked / requests, 4) if requests else 0.0,
+                "captcha_rate": round(captcha / requests, 4) if requests else 0.0,
+                "fetch_seconds": _histogram_summary(fetch),
+                "warm_up_seconds": _histogram_summary(warm_up),
+                "wait_seconds": _histogram_summary(wait)
+            }
+            for (name, labels), value in self.gauges.items():
+                if dict(labels).get("domain") == domain:
+                    entry[name] = value
+            summary["domains"][domain] = entry
+
+        for store in stores:
+            parse = self.histograms.get(("crawler_parse_seconds", _labels(store=store)))
+            summary["stores"][store] = {"parse_seconds": _histogram_summary(parse)}
+
+        return summary
+
+    def to_prometheus(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = []
+        names = sorted({name for name, _ in list(self.counters) + list(self.histograms) + list(self.gauges)})
+
+        for name in names:
+            kind, help_text = _HELP.get(name, ("gauge", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for (metric, labels), value in sorted(self.counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+            for (metric, labels), value in sorted(self.gauges.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+            for (metric, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_dir: str):
+        """Writes metrics.json and metrics.prom to the output directory."""
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, "metrics.json"), "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(os.path.join(output_dir, "metrics.prom"), "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+
+
+def _histogram_summary(histogram: Optional[Histogram]) -> Dict:
+    if histogram is None or histogram.count == 0:
+        return {"count": 0}
+    return {
+        "count": histogram.count,
+        "mean": round(histogram.sum / histogram.count, 4),
+        "p50": histogram.quantile(0.5),
+        "p95": histogram.quantile(0.95),
+        "p99": histogram.quantile(0.99)
+    }
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + "}"
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -0,0 +1,118 @@
+"""Typed normalization of extracted values.
+
+Prices are converted to integer haléř (1/100 CZK) and availability values to
+a small enum, so analyses do not have to re-parse display strings.
+"""
+import re
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+from typing import Optional, Union
+
+
+# Name of a product whose page has no heading.
+UNKNOWN_NAME = "Unknown"
+
+
+class Availability(str, Enum):
+    IN_STOCK = "in_stock"
+    OUT_OF_STOCK = "out_of_stock"
+    PREORDER = "preorder"
+    UNKNOWN = "unknown"
+
+
+# schema.org ItemAvailability values (the last path segment of the URL).
+AVAILABILITY_BY_SCHEMA = {
+    "InStock": Availability.IN_STOCK,
+    "InStoreOnly": Availability.IN_STOCK,
+    "OnlineOnly": Availability.IN_STOCK,
+    "LimitedAvailability": Availability.IN_STOCK,
+    "OutOfStock": Availability.OUT_OF_STOCK,
+    "SoldOut": Availability.OUT_OF_STOCK,
+    "Discontinued": Availability.OUT_OF_STOCK,
+    "PreOrder": Availability.PREORDER,
+    "PreSale": Availability.PREORDER
+}
+
+_PRICE_NOISE_RE = re.compile(r"(,-|\.-|kč|czk|'|\s)", re.IGNORECASE)
+_KEY_NOISE_RE = re.compile(r"[^0-9a-z]+")
+
+
+def schema_availability_code(value: Optional[str]) -> str:
+    """
+    Returns the Availability value of a schema.org availability
+    ("https://schema.org/InStock" or "InStock"); "unknown" for anything else.
+    """
+    if not value:
+        return Availability.UNKNOWN.value
+    token = str(value).rstrip("/").rsplit("/", 1)[-1]
+    return AVAILABILITY_BY_SCHEMA.get(token, Availability.UNKNOWN).value
+
+
+def _normalize_separators(text: str) -> str:
+    """
+    Rewrites a number with "," / "." separators to use "." as the only
+    (decimal) separator.
+
+    With both separators, the last one is the decimal separator. A single
+    separator is a thousands separator if it repeats ("1.299.000") or is
+    followed by exactly three digits ("29,990"), and a decimal one otherwise.
+    """
+    if "," in text and "." in text:
+        decimal = max(text.rfind(","), text.rfind("."))
+        return text[:decimal].replace(",", "").replace(".", "") + "." + text[decimal + 1:]
+
+    for separator in ",.":
+        if separator not in text:
+            continue
+        whole, _, fraction = text.rpartition(separator)
+        if text.count(separator) > 1 or (len(fraction) == 3 and fraction.isdigit()):
+            return text.replace(separator, "")
+        return whole + "." + fraction
+
+    return text
+
+
+def price_to_halere(price: Union[str, int, float, Decimal, None]) -> Optional[int]:
+    """
+    Converts a price to integer haléř.
+
+    Accepts JSON-LD values (29990, "29990.50") as well as display strings
+    ("29 990,-", "29990,50 Kč", "1.299,90", "29,990").
+
+    Returns:
+        Optional[int]: The price in haléř, or None if it cannot be parsed.
+    """
+    if price is None or isinstance(price, bool):
+        return None
+
+    if isinstance(price, (int, Decimal)):
+        value = Decimal(price)
+    elif isinstance(price, float):
+        value = Decimal(repr(price))
+    else:
+        text = _normalize_separators(_PRICE_NOISE_RE.sub("", str(price)))
+        try:
+            value = Decimal(text)
+        except InvalidOperation:
+            return None
+
+    if not value.is_finite() or value < 0:
+        return None
+
+    return int((value * 100).to_integral_value())
+
+
+def product_key(name: Optional[str]) -> str:
+    """
+    Returns a store independent key of a product name.
+
+    The name is case-folded, stripped of diacritics and reduced to
+    alphanumeric words, so "Apple iPhone 17 Pro, stříbrná" and
+    "apple iphone 17 pro stribrna" share a key.
+    """
+    if not name:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    ascii_name = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _KEY_NOISE_RE.sub(" ", ascii_name).strip()
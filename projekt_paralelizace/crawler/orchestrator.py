@@ -1,153 +1,671 @@
-import csv
+import itertools
 import multiprocessing
 import time
 import os
 import logging
-from typing import Dict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from .downloader import Downloader
-from .parser import parse_product
-from .writer import ensure_dir
+from . import adaptive, archive, session_store
+from .archive import HtmlArchive, archive_page
+from .async_engine import AsyncEngine
+from .cache import ResponseCache
+from .deadline import CRAWL_DEADLINE_ERROR, JOB_DEADLINE_ERROR, Deadline, DeadlineExceeded, call_with_alarm, call_with_deadline
+from .downloader import DEFAULT_MAX_BODY_SIZE, DEFAULT_MAX_SITEMAP_SIZE, Downloader
+from .discovery import discover_stores
+from .distributed import Coordinator
+from .feed import JobFeed
+from .frontier import UrlFrontier
+from .history import PriceHistory
+from .journal import CrawlJournal
+from .metrics import CrawlMetrics
+from .parser import RESULT_FIELD_TYPES, RESULT_FIELDS, build_result_row
+from .pipeline import PipelineEngine
+from .prewarm import home_urls, prewarm
+from .reparse import reparse_crawl
+from .retry import RetryPolicy
+from .scheduler import PolitenessScheduler
+from .session_store import SessionStore
+from .sources import iter_jobs
+from .work_queue import WorkQueue
+from .writer import SINKS, BatchedWriter, ResultSink, create_sink, ensure_dir
+
+
+# Long-lived downloader of the current worker process, created by _init_worker.
+_worker_downloader: Optional[Downloader] = None
+
+# Arguments the downloader of the current worker process was created with.
+_worker_downloader_args: Dict = {}
+
+# Metrics recorded by the current worker process since they were last returned.
+_worker_metrics: Optional[CrawlMetrics] = None
+
+# Archive receiving the pages downloaded by the current worker process.
+_worker_archive: Optional[HtmlArchive] = None
+
+
+def _init_worker(
+    timeout: int,
+    scheduler: Optional[PolitenessScheduler] = None,
+    cache: Optional[ResponseCache] = None,
+    session_store: Optional[SessionStore] = None,
+    archive: Optional[HtmlArchive] = None,
+    max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE
+):
+    """
+    Pool initializer that creates the per-process Downloader.
+
+    The downloader (and its per-domain sessions and warm-up state) is reused by
+    every job the worker process handles.
+
+    Args:
+        timeout (int): The timeout for HTTP requests in seconds.
+        scheduler (Optional[PolitenessScheduler]): Rate limits shared by all workers.
+        cache (Optional[ResponseCache]): Response cache shared by all workers.
+        session_store (Optional[SessionStore]): Warm-up state shared by all workers.
+        archive (Optional[HtmlArchive]): Archive receiving the downloaded pages.
+        max_body_size (Optional[int]): Largest accepted response body in bytes.
+    """
+    global _worker_downloader, _worker_downloader_args, _worker_metrics, _worker_archive
+    _worker_archive = archive
+    throttle = scheduler.acquire if scheduler is not None else None
+    _worker_metrics = CrawlMetrics()
+    _worker_downloader_args = dict(
+        timeout=timeout,
+        throttle=throttle,
+        cache=cache,
+        metrics=_worker_metrics,
+        session_store=session_store,
+        max_body_size=max_body_size
+    )
+    _worker_downloader = Downloader(**_worker_downloader_args)
+
+
+def _get_worker_downloader(timeout: int) -> Downloader:
+    if _worker_downloader is None:
+        _init_worker(timeout)
+    return _worker_downloader
+
+
+def _recycle_worker_downloader():
+    """
+    Gives the worker process a new downloader after a job overran its deadline.
+
+    The abandoned job keeps running with the old downloader, whose sessions may
+    be stuck, so it is left to that job instead of being closed.
+    """
+    global _worker_downloader
+    if _worker_downloader is not None:
+        _worker_downloader = Downloader(**_worker_downloader_args)
+
+
+# Handlers installed by configure_logging.
+_log_file_handler: Optional[logging.FileHandler] = None
+_log_console_handler: Optional[logging.StreamHandler] = None
+
+
+def configure_logging(logs_dir: str):
+    """
+    Logs to <logs_dir>/crawler.log and to the console.
+
+    Calling it again (every Orchestrator does) adds nothing; with another
+    directory the log file is switched and the previous one closed.
+    """
+    global _log_file_handler, _log_console_handler
+    root = logging.getLogger()
+    path = os.path.abspath(os.path.join(logs_dir, "crawler.log"))
+    if _log_file_handler is not None and _log_file_handler.baseFilename == path:
+        return
+
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    ensure_dir(logs_dir)
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(formatter)
+    root.addHandler(handler)
+    if _log_file_handler is not None:
+        root.removeHandler(_log_file_handler)
+        _log_file_handler.close()
+    _log_file_handler = handler
+
+    if _log_console_handler is None:
+        _log_console_handler = logging.StreamHandler()
+        _log_console_handler.setFormatter(formatter)
+        root.addHandler(_log_console_handler)
+    root.setLevel(logging.INFO)
 
 
 class Orchestrator:
     """
     Main orchestration class for running the crawler.
 
-    It manages the configuration, logging, worker process pool, and synchronizes
-    writing results to the output CSV file.
+    It manages the configuration, logging and worker process pool. Workers
+    return their results to the parent process, which is the only writer of
+    the output (CSV by default, or another sink selected by "output").
     """
 
-    def __init__(self, raw_config: Dict):
+    def __init__(self, raw_config: Dict, resume: bool = False):
         """
         Initializes the Orchestrator with the given configuration.
 
         Args:
             raw_config (Dict): The configuration dictionary containing settings
                                for stores, timeouts, and output directories.
+            resume (bool): Continue an interrupted crawl instead of starting over.
         """
         self.raw_config = raw_config
         self.config = raw_config
+        self.resume = resume
 
         self.num_processes = self.config.get("num_processes", 4)
+        self.chunksize = max(1, self.config.get("chunksize", 1))
         self.timeout = self.config.get("timeout", 5)
+        self.max_body_size = self.config.get("max_body_size", DEFAULT_MAX_BODY_SIZE)
         self.output_dir = self.config.get("output_dir", "output")
         self.logs_dir = self.config.get("logs_dir", "logs")
+        self.engine = self.config.get("engine", "process")
+        self.concurrency = self.config.get("concurrency", 100)
+        self.per_domain_concurrency = self.config.get("per_domain_concurrency", 8)
+        self.parse_processes = self.config.get("parse_processes", 2)
+        self.fetch_threads = self.config.get("fetch_threads", 32)
+        self.queue_size = self.config.get("queue_size", 64)
+        self.distributed_config = self.config.get("distributed", {})
+        self.adaptive_config = self.config.get("adaptive_concurrency")
+        self.rate_limits = self.config.get("rate_limits")
+        self.flush_rows = self.config.get("flush_rows", 100)
+        self.flush_interval = self.config.get("flush_interval", 5.0)
+        self.cache_config = self.config.get("cache")
+        self.session_config = self.config.get("session_store")
+        self.archive_config = self.config.get("archive")
+        self.prewarm_config = self.config.get("prewarm")
+        self.output_config = self.config.get("output", {})
+        self.output_format = self.output_config.get("format", "csv")
+        self.history_config = self.config.get("history")
+        self.frontier_config = self.config.get("frontier", {})
+        self.write_metrics = self.config.get("metrics", True)
+        self.crawl_deadline = self.config.get("crawl_deadline") or None
+        self.job_deadline = self.config.get("job_deadline") or None
+        self.retry_policy = RetryPolicy(
+            retry_count=self.config.get("retry_count", 0),
+            base_delay=self.config.get("retry_backoff", 1.0),
+            max_delay=self.config.get("retry_max_delay", 30.0)
+        )
+
+        if self.engine not in ("process", "async", "pipeline", "distributed"):
+            raise ValueError(f"Unknown crawl engine: {self.engine}")
+
+        if self.output_format not in SINKS:
+            raise ValueError(f"Unknown output format: {self.output_format}")
 
         ensure_dir(self.output_dir)
         ensure_dir(self.logs_dir)
 
-        self.csv_path = os.path.join(self.output_dir, "results.csv")
-        self.csv_header = [
-            "url",
-            "name",
-            "price",
-            "availability",
-            "image",
-            "store",
-            "error"
-        ]
-
-        if os.path.exists(self.csv_path):
-            os.remove(self.csv_path)
-
-            with open(self.csv_path, "w", newline="", encoding="utf-8") as file:
-                writer = csv.writer(file)
-                writer.writerow(self.csv_header)
-
-        log_path = os.path.join(self.logs_dir, "crawler.log")
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s %(levelname)s %(message)s",
-            handlers=[
-                logging.FileHandler(log_path, encoding="utf-8"),
-                logging.StreamHandler()
-            ]
-        )
+        self.fieldnames = list(RESULT_FIELDS)
+        self.journal = CrawlJournal(os.path.join(self.output_dir, "journal.jsonl"))
 
-        self.logger = logging.getLogger("projekt_paralelizace")
+        configure_logging(self.logs_dir)
 
-        manager = multiprocessing.Manager()
-        self.lock = manager.Lock()
+        self.logger = logging.getLogger("projekt_paralelizace")
 
-    def _crawl_one(self, job: Dict):
+    def _crawl_one(self, job: Dict) -> Tuple[Dict, Dict]:
         """
-        Worker method used by the multiprocessing pool.
+        Crawls a single job in a worker process.
+
+        It downloads the HTML using the worker's long-lived downloader and
+        parses the product data. The result row (or error) is returned to the
+        parent process, which decides whether to retry the job or write the row.
 
-        It downloads the HTML for a single job, parses the product data,
-        and safely writes the result (or error) to the shared CSV file
-        using a lock.
+        With a job deadline, an attempt (warm-up, download and extraction) that
+        overruns it is recorded as timed out. A download that overruns it is
+        abandoned and the worker continues with a new downloader; an extraction
+        is interrupted by an alarm on the worker's main thread (once a call into
+        native code has returned).
 
         Args:
             job (Dict): A dictionary containing the 'url' and store 'type'.
+
+        Returns:
+            Tuple[Dict, Dict]: The job and its result row.
         """
         store_type = job.get("type")
         url = job.get("url")
+        deadline = Deadline(self.job_deadline)
+        try:
+            html, error = call_with_deadline(deadline.remaining(), self._fetch, job)
+        except DeadlineExceeded as exc:
+            _recycle_worker_downloader()
+            return job, build_result_row(store_type, url, None, str(exc))
+
+        try:
+            # build_result_row records a DeadlineExceeded raised in the extractor as the row's error.
+            row = call_with_alarm(deadline.remaining(), build_result_row, store_type, url, html, error, _worker_metrics)
+        except DeadlineExceeded:
+            row = build_result_row(store_type, url, None, JOB_DEADLINE_ERROR)
+        return job, row
 
-        downloader = Downloader(timeout=self.timeout)
-        html, error = downloader.fetch(url)
+    def _fetch(self, job: Dict) -> Tuple[Optional[str], Optional[str]]:
+        downloader = _get_worker_downloader(self.timeout)
+        html, error = downloader.fetch(job.get("url"))
+        archive_page(_worker_archive, job, html)
+        return html, error
 
-        row = {
-            "url": url,
-            "name": None,
-            "price": None,
-            "availability": None,
-            "image": None,
-            "store": store_type,
-            "error": error
-        }
+    def _crawl_chunk(self, jobs: List[Dict]) -> Tuple[List[Tuple[Dict, Dict]], Optional[Dict]]:
+        """
+        Worker method used by the multiprocessing pool.
+
+        Args:
+            jobs (List[Dict]): A chunk of jobs.
+
+        Returns:
+            Tuple[List[Tuple[Dict, Dict]], Optional[Dict]]: The job and result
+            row of every job, and the metrics the worker recorded since its
+            previous chunk (a drained CrawlMetrics snapshot).
+        """
+        results = [self._crawl_one(job) for job in jobs]
+        return results, _worker_metrics.drain() if _worker_metrics is not None else None
+
+    def _run_pool(self, jobs, writer, scheduler, cache, metrics, sessions=None, pages=None) -> int:
+        """
+        Crawls the jobs with the multiprocessing pool and returns the number of retries.
+        """
+        feed = JobFeed(jobs, self.retry_policy, max_in_flight=self.num_processes * self.chunksize * 2)
+        crawl_deadline = Deadline(self.crawl_deadline)
 
-        if html is not None:
+        with multiprocessing.Pool(
+            processes=self.num_processes,
+            initializer=_init_worker,
+            initargs=(self.timeout, scheduler, cache, sessions, pages, self.max_body_size)
+        ) as pool:
             try:
-                product = parse_product(store_type, html, url)
-                row.update(product)
-                row["error"] = None
-            except Exception as exc:
-                row["error"] = str(exc)
-
-        with self.lock:
-            with open(self.csv_path, "a", newline="", encoding="utf-8") as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    row["url"],
-                    row["name"],
-                    row["price"],
-                    row["availability"],
-                    row["image"],
-                    row["store"],
-                    row["error"]
-                ])
-
-    def run(self):
+                chunks = pool.imap_unordered(self._crawl_chunk, feed.batches(self.chunksize))
+                while True:
+                    try:
+                        results, snapshot = chunks.next(crawl_deadline.remaining())
+                    except StopIteration:
+                        break
+                    except multiprocessing.TimeoutError:
+                        # Leaving the with block terminates the workers.
+                        self._record_timed_out(feed.abandon(), writer.write)
+                        break
+
+                    metrics.merge(snapshot)
+                    for job, row in results:
+                        if feed.complete(job, row):
+                            writer.write(row)
+            finally:
+                feed.close()
+
+        return feed.retried
+
+    def _record_timed_out(self, jobs: List[Dict], on_result):
+        """Records the jobs unfinished when the crawl deadline passed as timed out."""
+        for job in jobs:
+            on_result(build_result_row(job.get("type"), job.get("url"), None, CRAWL_DEADLINE_ERROR))
+        self._log_deadline(len(jobs))
+
+    def _log_deadline(self, timed_out: Optional[int]):
+        if timed_out is not None:
+            self.logger.warning("Crawl deadline reached: %d unfinished jobs recorded as timed out", timed_out)
+
+    def _run_async(self, jobs, writer, scheduler, cache, metrics, sessions=None, pages=None) -> int:
+        """
+        Crawls the jobs with the asyncio engine and returns the number of retries.
+        """
+        engine = AsyncEngine(
+            timeout=self.timeout,
+            concurrency=self.concurrency,
+            per_domain_concurrency=self.per_domain_concurrency,
+            parse_processes=self.parse_processes,
+            scheduler=scheduler,
+            cache=cache,
+            session_store=sessions,
+            archive=pages,
+            max_body_size=self.max_body_size,
+            retry_policy=self.retry_policy,
+            metrics=metrics,
+            adaptive=adaptive.from_config(self.adaptive_config, self.per_domain_concurrency, metrics),
+            crawl_deadline=self.crawl_deadline,
+            job_deadline=self.job_deadline
+        )
+        engine.run(jobs, writer.write)
+        self._log_deadline(engine.timed_out)
+        return engine.retried
+
+    def _run_pipeline(self, jobs, writer, scheduler, cache, metrics, sessions=None, pages=None) -> int:
+        """
+        Crawls the jobs with the pipelined engine and returns the number of retries.
+        """
+        engine = PipelineEngine(
+            timeout=self.timeout,
+            fetch_threads=self.fetch_threads,
+            parse_processes=self.config.get("parse_processes"),
+            queue_size=self.queue_size,
+            per_domain_concurrency=self.per_domain_concurrency,
+            scheduler=scheduler,
+            cache=cache,
+            session_store=sessions,
+            archive=pages,
+            max_body_size=self.max_body_size,
+            retry_policy=self.retry_policy,
+            metrics=metrics,
+            adaptive=adaptive.from_config(self.adaptive_config, self.per_domain_concurrency, metrics),
+            crawl_deadline=self.crawl_deadline,
+            job_deadline=self.job_deadline
+        )
+        engine.run(jobs, writer.write)
+        self._log_deadline(engine.timed_out)
+        return engine.retried
+
+    def _run_distributed(self, jobs, writer, metrics, pages=None) -> int:
+        """
+        Coordinates a distributed crawl: queues the jobs in the shared work
+        queue, waits for the results of the workers and returns the number of retries.
+        """
+        queue = WorkQueue(
+            self.distributed_config.get("queue", os.path.join(self.output_dir, "queue.sqlite")),
+            lease_seconds=self.distributed_config.get("lease_seconds", 60.0)
+        )
+        coordinator = Coordinator(
+            queue,
+            retry_policy=self.retry_policy,
+            max_leases=self.distributed_config.get("max_leases", 3),
+            poll_interval=self.distributed_config.get("poll_interval", 0.5),
+            crawl_id=pages.crawl_id if pages is not None else None,
+            crawl_deadline=self.crawl_deadline
+        )
+        try:
+            coordinator.run(jobs, writer.write, metrics)
+        finally:
+            queue.close()
+        self._log_deadline(coordinator.timed_out)
+        return coordinator.retried
+
+    def _create_sink(self, append: bool = False) -> ResultSink:
+        return create_sink(
+            self.output_format,
+            self.output_dir,
+            self.fieldnames,
+            types=RESULT_FIELD_TYPES,
+            path=self.output_config.get("path"),
+            append=append
+        )
+
+    def _load_checkpoint(self) -> Tuple[set, Optional[ResultSink]]:
+        """
+        Prepares the output for resuming.
+
+        Everything written after the last journaled offset is cut from the
+        output, because those jobs are not journaled and will be crawled again.
+        If the output does not match the journal, the crawl starts over.
+
+        Returns:
+            Tuple[set, Optional[ResultSink]]: The URLs already finished and the
+            sink to append to (None when starting over).
+        """
+        done, offset = self.journal.load()
+
+        sink_class = SINKS[self.output_format][0]
+        if not sink_class.supports_resume:
+            raise ValueError(f"The {self.output_format} output format does not support --resume")
+
+        if done:
+            sink = self._create_sink(append=True)
+            if sink.truncate(offset):
+                self.logger.info("Resuming crawl: %d jobs already finished", len(done))
+                return done, sink
+            sink.close()
+
+        self.logger.warning("No usable checkpoint found, starting a new crawl")
+        self.resume = False
+        return set(), None
+
+    def _discover(self, scheduler: Optional[PolitenessScheduler]) -> Optional[UrlFrontier]:
+        """
+        Opens the URL frontier and runs the discovery of the stores with a
+        "discover" section (skipped when resuming, the frontier is kept on disk).
+
+        Returns:
+            Optional[UrlFrontier]: The frontier, or None if no store uses discovery.
+        """
+        stores = [store for store in self.config.get("stores", []) if store.get("discover")]
+        if not stores:
+            return None
+
+        frontier = UrlFrontier(
+            self.frontier_config.get("path", os.path.join(self.output_dir, "frontier.sqlite")),
+            capacity=self.frontier_config.get("capacity", 1_000_000)
+        )
+        if self.resume:
+            return frontier
+
+        throttle = scheduler.acquire if scheduler is not None else None
+        downloader = Downloader(
+            timeout=self.timeout,
+            throttle=throttle,
+            session_store=session_store.from_config(self.session_config),
+            max_sitemap_size=self.config.get("max_sitemap_size", DEFAULT_MAX_SITEMAP_SIZE)
+        )
+        try:
+            for store, added in discover_stores(stores, frontier, downloader.fetch_bytes).items():
+                self.logger.info("Discovery: %d new URLs for %s", added, store)
+        finally:
+            downloader.close()
+
+        self.logger.info("Frontier holds %d URLs", len(frontier))
+        return frontier
+
+    def discover(self) -> Optional[UrlFrontier]:
+        """
+        Runs the discovery of the stores with a "discover" section outside of a
+        crawl (the daemon schedules the discovered URLs itself).
+
+        Returns:
+            Optional[UrlFrontier]: The frontier, to be closed by the caller, or
+            None if no store uses discovery.
+        """
+        scheduler = PolitenessScheduler(self.rate_limits) if self.rate_limits else None
+        return self._discover(scheduler)
+
+    def _prewarm(self, jobs, scheduler, sessions: Optional[SessionStore]):
+        """
+        Warms up all domains of the first jobs concurrently before the crawl starts.
+
+        The warm-up state reaches the workers through the session store; without
+        a configured "session_store", one in the output directory is used.
+
+        Returns:
+            Tuple: The jobs (with the inspected ones put back in front) and the session store.
+        """
+        settings = {} if self.prewarm_config is True else self.prewarm_config
+        head = list(itertools.islice(jobs, settings.get("lookahead", 1000)))
+        jobs = itertools.chain(head, jobs)
+
+        if sessions is None:
+            sessions = SessionStore(
+                os.path.join(self.output_dir, "sessions.sqlite"),
+                ttl=settings.get("ttl", 3600)
+            )
+
+        throttle = scheduler.acquire if scheduler is not None else None
+        downloader = Downloader(
+            timeout=self.timeout,
+            throttle=throttle,
+            session_store=sessions,
+            max_body_size=self.max_body_size
+        )
+        start_time = time.time()
+        try:
+            results = prewarm(
+                downloader,
+                home_urls(head),
+                concurrency=settings.get("concurrency", 16),
+                resolve_names=settings.get("resolve", True)
+            )
+        finally:
+            downloader.close()
+
+        warmed = sum(error is None for error in results.values())
+        self.logger.info(
+            "Pre-warmed %d of %d domains in %.2fs", warmed, len(results), time.time() - start_time
+        )
+        return jobs, sessions
+
+    def run(
+        self,
+        jobs: Optional[Iterable[Dict]] = None,
+        on_rows: Optional[Callable[[List[Dict]], None]] = None
+    ):
         """
         Prepares the jobs from configuration and executes the crawling process
-        using a parallel process pool.
+        using a parallel process pool, or the asyncio, pipelined or distributed
+        engine when the configuration sets "engine" to "async", "pipeline" or
+        "distributed".
+
+        Args:
+            jobs (Optional[Iterable[Dict]]): Jobs to crawl instead of the configured
+                stores (no discovery runs).
+            on_rows (Optional[Callable[[List[Dict]], None]]): Called with every batch
+                of result rows once it is written.
         """
-        jobs = []
+        done, sink = self._load_checkpoint() if self.resume else (set(), None)
+
+        scheduler = None
+        if self.rate_limits:
+            scheduler = PolitenessScheduler(self.rate_limits)
+
+        frontier = None
+        if jobs is None:
+            frontier = self._discover(scheduler)
+
+            # Jobs are generated lazily from the inline URLs, the external sources
+            # and the discovered URLs of every store, alternating between the stores.
+            jobs = iter_jobs(self.config.get("stores", []), skip=done, frontier=frontier)
+        elif done:
+            jobs = (job for job in jobs if job.get("url") not in done)
 
-        stores = self.config.get("stores", [])
-        for store in stores:
-            store_type = store.get("type")
-            urls = store.get("urls", [])
+        cache = None
+        if self.cache_config:
+            cache = ResponseCache(
+                self.cache_config.get("path", os.path.join("cache", "responses.sqlite")),
+                max_age=self.cache_config.get("max_age", 0),
+                max_entries=self.cache_config.get("max_entries", 10000)
+            )
 
-            for url in urls:
-                jobs.append({
-                    "type": store_type,
-                    "url": url
-                })
+        sessions = session_store.from_config(self.session_config)
+        if self.prewarm_config:
+            jobs, sessions = self._prewarm(jobs, scheduler, sessions)
+
+        pages = archive.from_config(self.archive_config)
+        if pages is not None:
+            # A resumed crawl keeps archiving under the id of the interrupted one.
+            crawl_id = pages.begin(pages.latest_crawl() if self.resume else None)
+            self.logger.info("Archiving pages of crawl %s in %s", crawl_id, pages.root)
+
+        # The stores handed to the workers are closed rather than carried into
+        # forked workers; they are reopened lazily where they are used. The
+        # frontier and the price history stay open: only this process uses them,
+        # and the workers leave the copies they inherit untouched.
+        for store in (pages, sessions, cache):
+            if store is not None:
+                store.close()
 
         start_time = time.time()
 
-        self.logger.info("Starting crawl: %d jobs", len(jobs))
+        self.logger.info("Starting crawl")
+
+        if sink is None:
+            sink = self._create_sink()
+        self.journal.open(resume=self.resume)
 
-        with multiprocessing.Pool(processes=self.num_processes) as pool:
-            pool.map(self._crawl_one, jobs)
+        history = None
+        if self.history_config:
+            history = PriceHistory(
+                self.history_config.get("path", os.path.join(self.output_dir, "history.sqlite"))
+            )
+        changed = 0
+        metrics = CrawlMetrics()
+
+        def on_flush(rows, offset):
+            nonlocal changed
+            self.journal.record(rows, offset)
+            if history is not None:
+                changed += history.record(rows)
+            if on_rows is not None:
+                on_rows(rows)
+
+        try:
+            with BatchedWriter(
+                sink,
+                batch_size=self.flush_rows,
+                flush_interval=self.flush_interval,
+                on_flush=on_flush
+            ) as writer:
+                if self.engine == "async":
+                    retried = self._run_async(jobs, writer, scheduler, cache, metrics, sessions, pages)
+                elif self.engine == "pipeline":
+                    retried = self._run_pipeline(jobs, writer, scheduler, cache, metrics, sessions, pages)
+                elif self.engine == "distributed":
+                    retried = self._run_distributed(jobs, writer, metrics, pages)
+                else:
+                    retried = self._run_pool(jobs, writer, scheduler, cache, metrics, sessions, pages)
+        finally:
+            self.journal.close()
+            if history is not None:
+                history.close()
+            if frontier is not None:
+                frontier.close()
+            if pages is not None:
+                pages.close()
 
         elapsed = time.time() - start_time
 
         self.logger.info(
-            "Finished crawl: %d products in %.2fs",
-            len(jobs),
-            elapsed
+            "Finished crawl: %d products in %.2fs (%d retries)",
+            writer.rows_written,
+            elapsed,
+            retried
+        )
+        if history is not None:
+            self.logger.info("Price history: %d products changed", changed)
+        if self.write_metrics:
+            metrics.write(self.output_dir)
+            self.logger.info("Metrics written to %s", os.path.join(self.output_dir, "metrics.json"))
+
+    def reparse(self, crawl_id: Optional[str] = None) -> int:
+        """
+        Re-extracts an archived crawl into the output, without any download.
+
+        The current extractors run over the pages stored by the "archive" of
+        the configuration, in num_processes worker processes.
+
+        Args:
+            crawl_id (Optional[str]): The crawl to re-extract (default: the latest).
+
+        Returns:
+            int: The number of rows written.
+        """
+        pages = archive.from_config(self.archive_config)
+        if pages is None:
+            raise ValueError("Re-extraction requires an \"archive\" section in the configuration")
+
+        try:
+            crawl_id = crawl_id or pages.latest_crawl()
+            if crawl_id is None:
+                raise ValueError(f"No archived crawl found in {pages.root}")
+
+            start_time = time.time()
+            self.logger.info("Re-extracting crawl %s from %s", crawl_id, pages.root)
+
+            with BatchedWriter(
+                self._create_sink(),
+                batch_size=self.flush_rows,
+                flush_interval=self.flush_interval
+            ) as writer:
+                reparse_crawl(pages, crawl_id, writer.write, processes=self.num_processes)
+        finally:
+            pages.close()
+
+        self.logger.info(
+            "Finished re-extraction: %d products in %.2fs",
+            writer.rows_written,
+            time.time() - start_time
         )
+        return writer.rows_written
@@ -1,7 +1,12 @@
 """Parser that selects the correct extractor per store type."""
+import time
+from typing import Dict, Optional, Tuple
+
 from .extractors.alza import extract_alza
 from .extractors.mironet import extract_mironet
 from .extractors.datart import extract_datart
+from .extractors.engine import JsonLdExtractor, StoreSpec
+from .metrics import CrawlMetrics
 
 EXTRACTOR_MAP = {
     "alza": extract_alza,
@@ -9,9 +14,77 @@ EXTRACTOR_MAP = {
     "datart": extract_datart
 }
 
-def parse_product(store_type: str, html: str, url: str):
-    """Run the extractor for the given store_type on the provided HTML."""
+
+def register_store(spec: StoreSpec) -> JsonLdExtractor:
+    """Build the extractor for a store spec and register it under the store name."""
+    extractor = JsonLdExtractor(spec)
+    EXTRACTOR_MAP[spec.store] = extractor
+    return extractor
+
+def parse_product(store_type: str, html: str, url: str, metrics: Optional[CrawlMetrics] = None):
+    """Run the extractor for the given store_type on the provided HTML.
+
+    With metrics, the extraction time is recorded per store (also when it fails).
+    """
     extractor = EXTRACTOR_MAP.get(store_type)
     if extractor is None:
         raise ValueError(f"Unknown store type: {store_type}")
-    return extractor(html,url)
+    start = time.perf_counter()
+    try:
+        return extractor(html,url)
+    finally:
+        if metrics is not None:
+            metrics.observe_parse(store_type, time.perf_counter() - start)
+
+
+RESULT_FIELDS = [
+    "url", "name", "price", "availability", "image", "store", "error",
+    "price_halere", "availability_code"
+]
+
+# Column types of the typed output sinks; other fields are strings.
+RESULT_FIELD_TYPES = {"price_halere": int}
+
+
+def build_result_row(
+    store_type: str,
+    url: str,
+    html: Optional[str],
+    error: Optional[str],
+    metrics: Optional[CrawlMetrics] = None
+) -> Dict:
+    """
+    Build one output row from a download result.
+
+    If the HTML was downloaded, it is parsed with the store's extractor; a parse
+    failure is recorded in the row's 'error' field instead of being raised.
+    """
+    row = dict.fromkeys(RESULT_FIELDS)
+    row["url"] = url
+    row["store"] = store_type
+    row["error"] = error
+
+    if html is not None:
+        try:
+            product = parse_product(store_type, html, url, metrics)
+            row.update(product)
+            row["error"] = None
+        except Exception as exc:
+            row["error"] = str(exc)
+
+    return row
+
+
+def build_result_row_with_metrics(
+    store_type: str,
+    url: str,
+    html: Optional[str],
+    error: Optional[str]
+) -> Tuple[Dict, Dict]:
+    """
+    build_result_row for a parse process: returns the row together with a
+    drained CrawlMetrics snapshot of the parse, for the parent to merge.
+    """
+    metrics = CrawlMetrics()
+    row = build_result_row(store_type, url, html, error, metrics)
+    return row, metrics.drain()
@@ -0,0 +1,391 @@
+"""Pipelined crawl engine.
+
+Fetching and parsing run as separate stages joined by bounded queues:
+
+    JobFeed -> fetch queue -> fetch threads -> parse queue -> parse processes -> results
+
+Each stage is sized on its own: enough fetch threads to saturate the network
+and one parse process per core to saturate the CPU. When the parsers fall
+behind, the parse queue fills up and the fetch threads block on it, so a slow
+stage applies backpressure instead of buffering pages in memory.
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from .adaptive import AdaptiveConcurrency
+from .archive import HtmlArchive, archive_page
+from .cache import ResponseCache
+from .deadline import (
+    CRAWL_DEADLINE_ERROR, JOB_DEADLINE_ERROR, PARSE_BROKEN_ERROR, PARSE_CONTEXT, Deadline, DeadlineExceeded,
+    call_with_deadline, init_parse_process, parse_within
+)
+from .downloader import DEFAULT_MAX_BODY_SIZE, Downloader
+from .feed import JobFeed
+from .metrics import CrawlMetrics
+from .parser import build_result_row, build_result_row_with_metrics
+from .retry import RetryPolicy
+from .scheduler import PolitenessScheduler
+from .session_store import SessionStore
+
+# Marks the end of a queue.
+_DONE = object()
+
+# Seconds between checks of the running extractions.
+_PARSE_POLL_INTERVAL = 0.05
+
+# Seconds a run stopped by the crawl deadline waits for the parse stage to end.
+_PARSE_STOP_TIMEOUT = 1.0
+
+def _broken(future: Future) -> bool:
+    """True if the extraction was lost because its pool broke."""
+    return future.cancelled() or isinstance(future.exception(), BrokenProcessPool)
+
+
+class PipelineEngine:
+    """
+    Crawl engine with a thread pool for downloads and a process pool for extraction.
+
+    All fetch threads share one Downloader, and so one session and one warm-up
+    per domain. Failed downloads are retried through a JobFeed like in the
+    process engine, so waiting retries hold no thread.
+    """
+
+    def __init__(
+        self,
+        timeout: int = 15,
+        fetch_threads: int = 32,
+        parse_processes: Optional[int] = None,
+        queue_size: int = 64,
+        per_domain_concurrency: int = 8,
+        scheduler: Optional[PolitenessScheduler] = None,
+        cache: Optional[ResponseCache] = None,
+        session_store: Optional[SessionStore] = None,
+        archive: Optional[HtmlArchive] = None,
+        max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[CrawlMetrics] = None,
+        adaptive: Optional[AdaptiveConcurrency] = None,
+        crawl_deadline: Optional[float] = None,
+        job_deadline: Optional[float] = None
+    ):
+        """
+        Initializes the engine.
+
+        Args:
+            timeout (int): The timeout for HTTP requests in seconds.
+            fetch_threads (int): Number of download threads.
+            parse_processes (Optional[int]): Number of extraction processes (default: one per core).
+            queue_size (int): Capacity of the queues between the stages.
+            per_domain_concurrency (int): Maximum number of concurrent fetches per domain.
+            scheduler (Optional[PolitenessScheduler]): Per-domain rate limits.
+            cache (Optional[ResponseCache]): Response cache used by the downloader.
+            session_store (Optional[SessionStore]): Persistent warm-up state used by the downloader.
+            archive (Optional[HtmlArchive]): Archive receiving every downloaded page.
+            max_body_size (Optional[int]): Largest accepted response body in bytes.
+            retry_policy (Optional[RetryPolicy]): Retry policy for failed downloads.
+            metrics (Optional[CrawlMetrics]): Collects download and parse metrics.
+            adaptive (Optional[AdaptiveConcurrency]): Adjusts the per-domain limits to
+                the block rate; replaces the fixed per_domain_concurrency.
+            crawl_deadline (Optional[float]): Time budget of the whole crawl in seconds.
+            job_deadline (Optional[float]): Time limit of one attempt of a job (fetch
+                including the warm-up, and extraction, not the time spent in the queues).
+        """
+        self.timeout = timeout
+        self.fetch_threads = max(1, fetch_threads)
+        self.parse_processes = max(1, parse_processes or os.cpu_count() or 1)
+        self.queue_size = max(1, queue_size)
+        self.per_domain_concurrency = max(1, per_domain_concurrency)
+        self.scheduler = scheduler
+        self.cache = cache
+        self.session_store = session_store
+        self.archive = archive
+        self.max_body_size = max_body_size
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        self.adaptive = adaptive
+        self.crawl_deadline = crawl_deadline
+        self.job_deadline = job_deadline
+        self.retried = 0
+        # Number of unfinished jobs recorded as timed out when the crawl deadline passed.
+        self.timed_out: Optional[int] = None
+
+    def run(self, jobs: Iterable[Dict], on_result: Callable[[Dict], None]) -> int:
+        """
+        Crawls all jobs and passes every final result row to on_result.
+
+        on_result is always called from the calling thread.
+
+        Args:
+            jobs (Iterable[Dict]): Jobs with the 'url' and store 'type'.
+            on_result (Callable[[Dict], None]): Callback receiving each result row.
+
+        Returns:
+            int: The number of processed jobs.
+        """
+        throttle = self.scheduler.acquire if self.scheduler is not None else None
+        downloader = Downloader(
+            timeout=self.timeout, throttle=throttle, cache=self.cache, metrics=self.metrics,
+            session_store=self.session_store, max_body_size=self.max_body_size
+        )
+
+        # Jobs dispatched but not completed: everything a fetch thread or a
+        # queue may hold, so the feed never runs ahead of the stages.
+        max_in_flight = self.fetch_threads + 2 * self.queue_size + self.parse_processes
+        feed = JobFeed(jobs, self.retry_policy, max_in_flight=max_in_flight)
+
+        fetch_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        parse_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        results: "queue.Queue" = queue.Queue()
+
+        domain_slots: Dict[str, threading.BoundedSemaphore] = {}
+        domain_lock = threading.Lock()
+        # At most one extraction per process is submitted, so an extraction
+        # starts when it is submitted and pages wait in the bounded parse queue
+        # rather than in the pool.
+        max_parsing = self.parse_processes
+        parse_started = PARSE_CONTEXT.SimpleQueue()
+
+        def parse_pool() -> ProcessPoolExecutor:
+            return ProcessPoolExecutor(
+                max_workers=self.parse_processes, mp_context=PARSE_CONTEXT,
+                initializer=init_parse_process, initargs=(parse_started,)
+            )
+
+        parse_executor = parse_pool()
+        processed = 0
+        crawl_deadline = Deadline(self.crawl_deadline)
+        # Set when the crawl deadline passes: the stages drop the jobs they still hold.
+        stopping = threading.Event()
+
+        def domain_slot(url: str) -> threading.BoundedSemaphore:
+            domain = urlparse(url).netloc
+            with domain_lock:
+                slot = domain_slots.get(domain)
+                if slot is None:
+                    slot = domain_slots[domain] = threading.BoundedSemaphore(self.per_domain_concurrency)
+                return slot
+
+        def acquire_slot(url: str):
+            if self.adaptive is not None:
+                self.adaptive.acquire(urlparse(url).netloc)
+            else:
+                domain_slot(url).acquire()
+
+        def fetch_one(url: str):
+            # Runs with the domain slot taken by acquire_slot and returns it once
+            # the download really ends, also when the job deadline abandoned it.
+            error = None
+            try:
+                html, error = downloader.fetch(url)
+                return html, error
+            finally:
+                if self.adaptive is not None:
+                    self.adaptive.release(urlparse(url).netloc, error)
+                else:
+                    domain_slot(url).release()
+
+        def dispatch():
+            try:
+                for job in feed:
+                    fetch_queue.put(job)
+            except Exception as exc:
+                results.put(exc)
+            finally:
+                for _ in range(self.fetch_threads):
+                    fetch_queue.put(_DONE)
+                results.put(_DONE)
+
+        def fetch():
+            while True:
+                job = fetch_queue.get()
+                if job is _DONE:
+                    return
+                if stopping.is_set():
+                    continue
+                url = job.get("url")
+                # The wait for a domain slot does not count against the job deadline.
+                acquire_slot(url)
+                deadline = Deadline(self.job_deadline)
+                try:
+                    html, error = call_with_deadline(deadline.remaining(), fetch_one, url)
+                except DeadlineExceeded:
+                    html, error = None, JOB_DEADLINE_ERROR
+                except Exception as exc:
+                    html, error = None, str(exc)
+
+                if stopping.is_set():
+                    # The job was recorded as timed out while it downloaded.
+                    continue
+                archive_page(self.archive, job, html)
+                if html is None:
+                    results.put((job, build_result_row(job.get("type"), url, None, error)))
+                else:
+                    # Time spent waiting for a parse process does not count against the deadline.
+                    parse_queue.put((job, html, deadline.remaining()))
+
+        def parse():
+            nonlocal parse_executor
+            function = build_result_row_with_metrics if self.metrics is not None else build_result_row
+            # Running extractions: future -> (job, html, seconds left of the job
+            # deadline or None, number of times the pool broke under it, token).
+            parsing: Dict[Future, Tuple[Dict, str, Optional[float], int, int]] = {}
+            # Token -> monotonic time the extraction began, as reported by parse_within.
+            started: Dict[int, float] = {}
+            tokens = itertools.count()
+            finished = False
+
+            def submit(job: Dict, html: str, seconds: Optional[float], breaks: int = 0):
+                token = next(tokens)
+                try:
+                    future = parse_executor.submit(
+                        parse_within, token, seconds, function, job.get("type"), job.get("url"), html, None
+                    )
+                except Exception as exc:
+                    results.put((job, build_result_row(job.get("type"), job.get("url"), None, str(exc))))
+                    return
+                parsing[future] = (job, html, seconds, breaks, token)
+
+            def drain_started():
+                while not parse_started.empty():
+                    token, began = parse_started.get()
+                    started[token] = began
+
+            def parse_done(job: Dict, future: Future):
+                try:
+                    if self.metrics is not None:
+                        row, snapshot = future.result()
+                        self.metrics.merge(snapshot)
+                    else:
+                        row = future.result()
+                except Exception as exc:
+                    row = build_result_row(job.get("type"), job.get("url"), None, str(exc))
+                results.put((job, row))
+
+            def recycle():
+                # A parse process was killed (see parse_within), which breaks
+                # the whole pool: it is replaced, only the extractions that ran
+                # past their own deadline are recorded as timed out, and the
+                # others are submitted again with their full time. When no
+                # extraction overran, the pool broke for another reason, and a
+                # job whose extraction was running when that happened twice is
+                # given up.
+                nonlocal parse_executor
+                old_executor = parse_executor
+                parse_executor = parse_pool()
+                old_executor.shutdown(wait=False, cancel_futures=True)
+
+                drain_started()
+                now = time.monotonic()
+                running = [(future, entry, started.pop(entry[4], None)) for future, entry in parsing.items()]
+                parsing.clear()
+                overran = {
+                    future for future, (_, _, seconds, _, _), began in running
+                    if seconds is not None and began is not None and now >= began + seconds
+                }
+                for future, (job, html, seconds, breaks, _), began in running:
+                    if future.done() and not _broken(future):
+                        parse_done(job, future)
+                    elif future in overran:
+                        results.put((job, build_result_row(job.get("type"), job.get("url"), None, JOB_DEADLINE_ERROR)))
+                    elif overran or began is None:
+                        submit(job, html, seconds, breaks)
+                    elif breaks:
+                        results.put((job, build_result_row(job.get("type"), job.get("url"), None, PARSE_BROKEN_ERROR)))
+                    else:
+                        submit(job, html, seconds, breaks + 1)
+
+            while True:
+                if stopping.is_set():
+                    # The pool is shut down by run(); the rest of the queue is
+                    # dropped until run() puts _DONE on it.
+                    parsing.clear()
+                    started.clear()
+                # Read the reported starts as they come, so the pipe never fills up.
+                drain_started()
+                broken = False
+                for future in [future for future in parsing if future.done()]:
+                    if _broken(future):
+                        broken = True
+                        continue
+                    job, _, _, _, token = parsing.pop(future)
+                    started.pop(token, None)
+                    parse_done(job, future)
+                if broken:
+                    recycle()
+
+                if finished and not parsing:
+                    return
+                if finished or len(parsing) >= max_parsing:
+                    wait(parsing, timeout=_PARSE_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    continue
+
+                try:
+                    item = parse_queue.get(timeout=_PARSE_POLL_INTERVAL if parsing else None)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    finished = True
+                    continue
+                if stopping.is_set():
+                    continue
+                job, html, remaining = item
+                submit(job, html, remaining)
+
+        fetchers = [
+            threading.Thread(target=fetch, name=f"pipeline-fetch-{index}", daemon=True)
+            for index in range(self.fetch_threads)
+        ]
+        parser = threading.Thread(target=parse, name="pipeline-parse", daemon=True)
+        dispatcher = threading.Thread(target=dispatch, name="pipeline-dispatch", daemon=True)
+
+        for thread in fetchers + [parser, dispatcher]:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    item = results.get(timeout=crawl_deadline.remaining())
+                except queue.Empty:
+                    stopping.set()
+                    expired = feed.abandon()
+                    for job in expired:
+                        on_result(build_result_row(job.get("type"), job.get("url"), None, CRAWL_DEADLINE_ERROR))
+                    processed += len(expired)
+                    self.timed_out = len(expired)
+                    break
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                job, row = item
+                if feed.complete(job, row):
+                    on_result(row)
+                    processed += 1
+        finally:
+            feed.close()
+            if stopping.is_set():
+                # Past the crawl deadline, the downloads still running are not
+                # waited for; their threads are daemons and their sessions are
+                # left open rather than closed under them.
+                parse_executor.shutdown(wait=False, cancel_futures=True)
+                parse_queue.put(_DONE)
+                parser.join(_PARSE_STOP_TIMEOUT)
+            else:
+                dispatcher.join()
+                for thread in fetchers:
+                    thread.join()
+                parse_queue.put(_DONE)
+                parser.join()
+                parse_executor.shutdown(wait=True, cancel_futures=True)
+                downloader.close()
+            self.retried = feed.retried
+
+        return processed
@@ -0,0 +1,69 @@
+"""Pre-warm of the crawled domains.
+
+Before any job is dispatched, all domains among the first jobs are warmed up
+at once instead of one by one inside the first job of each domain: the name is
+resolved and the homepage request obtains the session cookies. The cookies go
+to a SessionStore, from which the downloader of every worker loads them, so no
+job waits for a warm-up request or the pause after it.
+
+TLS connections belong to the process that opened them, so every worker still
+opens its own; what is handed over is the warm-up state.
+"""
+import logging
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("projekt_paralelizace")
+
+
+def home_urls(jobs: Iterable[Dict]) -> Dict[str, str]:
+    """Maps every domain of the jobs to its homepage URL, in order of appearance."""
+    homes = {}
+    for job in jobs:
+        parts = urlsplit(job.get("url") or "")
+        if parts.netloc and parts.netloc not in homes:
+            homes[parts.netloc] = f"{parts.scheme or 'https'}://{parts.netloc}/"
+    return homes
+
+
+def resolve(domain: str) -> Optional[str]:
+    """Resolves a domain name; returns an error message if it fails."""
+    try:
+        socket.getaddrinfo(domain.rsplit(":", 1)[0], 443, proto=socket.IPPROTO_TCP)
+    except OSError as exc:
+        return f"DNS resolution failed: {exc}"
+    return None
+
+
+def prewarm(downloader, urls: Dict[str, str], concurrency: int = 16, resolve_names: bool = True) -> Dict[str, Optional[str]]:
+    """
+    Warms up all domains concurrently.
+
+    Args:
+        downloader (Downloader): Downloader with the session store the warm-up state is saved to.
+        urls (Dict[str, str]): Homepage URL of each domain.
+        concurrency (int): Number of domains warmed up at the same time.
+        resolve_names (bool): Resolve each name first (a domain that does not resolve is skipped).
+
+    Returns:
+        Dict[str, Optional[str]]: For every domain None if it is warmed up, otherwise the error.
+    """
+    def warm(domain: str) -> Optional[str]:
+        if resolve_names:
+            error = resolve(domain)
+            if error is not None:
+                return error
+        return None if downloader.warm_up(urls[domain]) else "Warm-up request failed"
+
+    if not urls:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(urls)))) as executor:
+        results = dict(zip(urls, executor.map(warm, urls)))
+
+    for domain, error in results.items():
+        if error is not None:
+            logger.warning("Pre-warm of %s failed: %s", domain, error)
+    return results
@@ -0,0 +1,197 @@
+"""Adaptive refresh schedule of the recurring crawl.
+
+Every product has its own refresh interval. After each crawl of a product, its
+interval shrinks (times `speedup`) if the name, price or availability changed
+and grows (times `slowdown`) if not, within [min_interval, max_interval], so
+volatile products are re-crawled often and stable ones rarely. The products
+are kept in a heap ordered by the time they are next due; the intervals and
+last seen states are stored in a SQLite file and survive restarts.
+"""
+import heapq
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .history import TRACKED_FIELDS
+
+
+def fingerprint(row: Dict) -> str:
+    """The tracked fields of a result row, serialized for comparison."""
+    return json.dumps([row.get(field) for field in TRACKED_FIELDS], ensure_ascii=False)
+
+
+class RefreshSchedule:
+    """
+    Heap of products ordered by their next refresh, backed by a SQLite file.
+
+    Products are keyed by (store type, url). Not thread-safe; used by the
+    daemon's main thread only.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        initial_interval: float = 3600.0,
+        min_interval: float = 900.0,
+        max_interval: float = 86400.0,
+        speedup: float = 0.5,
+        slowdown: float = 1.5,
+        error_interval: Optional[float] = None
+    ):
+        """
+        Opens (or creates) the schedule.
+
+        Args:
+            path (str): Path of the SQLite file.
+            initial_interval (float): Refresh interval of a new product in seconds.
+            min_interval (float): Shortest refresh interval in seconds.
+            max_interval (float): Longest refresh interval in seconds.
+            speedup (float): Factor applied to the interval when the product changed.
+            slowdown (float): Factor applied to the interval when the product did not change.
+            error_interval (Optional[float]): Delay before a failed product is tried
+                again (default min_interval); its interval is kept.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.initial_interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.error_interval = min_interval if error_interval is None else error_interval
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS products ("
+            "store TEXT NOT NULL, url TEXT NOT NULL, interval REAL NOT NULL, next_due REAL NOT NULL, "
+            "fingerprint TEXT, crawls INTEGER NOT NULL DEFAULT 0, changes INTEGER NOT NULL DEFAULT 0, "
+            "seen INTEGER NOT NULL DEFAULT 1, PRIMARY KEY (store, url)) WITHOUT ROWID;"
+        )
+        self._conn.commit()
+        self._heap: List[Tuple[float, str, str]] = []
+        self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [
+            (next_due, store, url)
+            for store, url, next_due in self._conn.execute("SELECT store, url, next_due FROM products")
+        ]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def sync(self, jobs: Iterable[Dict], now: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Makes the scheduled products match the configured jobs: new products
+        are due immediately, products no longer configured are dropped.
+
+        Returns:
+            Tuple[int, int]: The number of added and removed products.
+        """
+        now = time.time() if now is None else now
+        added = 0
+        with self._conn:
+            self._conn.execute("UPDATE products SET seen = 0")
+            for job in jobs:
+                key = (job.get("type"), job.get("url"))
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO products (store, url, interval, next_due) VALUES (?, ?, ?, ?)",
+                    key + (self.initial_interval, now)
+                )
+                if cursor.rowcount:
+                    added += 1
+                else:
+                    self._conn.execute("UPDATE products SET seen = 1 WHERE store = ? AND url = ?", key)
+            removed = self._conn.execute("DELETE FROM products WHERE seen = 0").rowcount
+        self._rebuild()
+        return added, removed
+
+    def next_due(self) -> Optional[float]:
+        """When the next product is due (UNIX seconds), or None if there is none."""
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, limit: int, now: Optional[float] = None) -> List[Dict]:
+        """
+        Takes up to `limit` due products, most overdue first.
+
+        Every returned job must be passed back to complete().
+        """
+        now = time.time() if now is None else now
+        jobs = []
+        while self._heap and self._heap[0][0] <= now and len(jobs) < limit:
+            _, store, url = heapq.heappop(self._heap)
+            jobs.append({"type": store, "url": url})
+        return jobs
+
+    def complete(self, job: Dict, row: Optional[Dict], now: Optional[float] = None) -> Optional[float]:
+        """
+        Records the crawl of a job popped by pop_due() and schedules its next refresh.
+
+        Args:
+            job (Dict): The job.
+            row (Optional[Dict]): Its result row, None if it was not crawled.
+            now (Optional[float]): Time of the crawl; now by default.
+
+        Returns:
+            Optional[float]: The new refresh interval, None if the product is no longer scheduled.
+        """
+        now = time.time() if now is None else now
+        key = (job.get("type"), job.get("url"))
+        current = self._conn.execute(
+            "SELECT interval, fingerprint FROM products WHERE store = ? AND url = ?", key
+        ).fetchone()
+        if current is None:
+            return None
+
+        interval, previous = current
+        if row is None or row.get("error"):
+            next_due = now + self.error_interval
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE products SET next_due = ? WHERE store = ? AND url = ?", (next_due,) + key
+                )
+        else:
+            state = fingerprint(row)
+            changed = previous is not None and state != previous
+            if previous is not None:
+                factor = self.speedup if changed else self.slowdown
+                interval = min(self.max_interval, max(self.min_interval, interval * factor))
+            next_due = now + interval
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE products SET interval = ?, next_due = ?, fingerprint = ?, "
+                    "crawls = crawls + 1, changes = changes + ? WHERE store = ? AND url = ?",
+                    (interval, next_due, state, int(changed)) + key
+                )
+
+        heapq.heappush(self._heap, (next_due, key[0], key[1]))
+        return interval
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def from_config(settings, output_dir: str = "output") -> RefreshSchedule:
+    """
+    Opens the refresh schedule configured by the "daemon" configuration.
+
+    Args:
+        settings: The configuration section; None or True uses the defaults.
+        output_dir (str): Directory of the default schedule file.
+    """
+    if not settings or settings is True:
+        settings = {}
+    return RefreshSchedule(
+        settings.get("schedule", os.path.join(output_dir, "schedule.sqlite")),
+        initial_interval=settings.get("initial_interval", 3600.0),
+        min_interval=settings.get("min_interval", 900.0),
+        max_interval=settings.get("max_interval", 86400.0),
+        speedup=settings.get("speedup", 0.5),
+        slowdown=settings.get("slowdown", 1.5),
+        error_interval=settings.get("error_interval")
+    )
@@ -0,0 +1,60 @@
+"""Offline re-extraction of an archived crawl.
+
+Runs the current extractors over the pages of a crawl stored in an
+HtmlArchive, in a process pool and without any network access, so an
+extractor fix can be applied to a past crawl in minutes instead of
+re-downloading every page.
+"""
+import multiprocessing
+from typing import Callable, Dict, Optional, Tuple
+
+from .archive import HtmlArchive
+from .parser import build_result_row
+
+# Archive of the current worker process, set by _init_worker.
+_worker_archive: Optional[HtmlArchive] = None
+
+
+def _init_worker(archive: HtmlArchive):
+    global _worker_archive
+    _worker_archive = archive
+
+
+def _reparse_page(page: Tuple[str, Optional[str], str]) -> Dict:
+    url, store, digest = page
+    try:
+        html = _worker_archive.get_blob(digest)
+    except Exception as exc:
+        return build_result_row(store, url, None, str(exc))
+    return build_result_row(store, url, html, None)
+
+
+def reparse_crawl(
+    archive: HtmlArchive,
+    crawl_id: str,
+    on_result: Callable[[Dict], None],
+    processes: Optional[int] = None,
+    chunksize: int = 32
+) -> int:
+    """
+    Re-extracts every page of an archived crawl.
+
+    The workers read the pages from the archive themselves, so only the
+    index rows and the result rows pass between the processes.
+
+    Args:
+        archive (HtmlArchive): The archive holding the crawl.
+        crawl_id (str): The crawl to re-extract.
+        on_result (Callable[[Dict], None]): Callback receiving each result row.
+        processes (Optional[int]): Number of worker processes (default: one per core).
+        chunksize (int): Number of pages handed to a worker at once.
+
+    Returns:
+        int: The number of processed pages.
+    """
+    processed = 0
+    with multiprocessing.Pool(processes=processes, initializer=_init_worker, initargs=(archive,)) as pool:
+        for row in pool.imap_unordered(_reparse_page, archive.iter_pages(crawl_id), chunksize=max(1, chunksize)):
+            on_result(row)
+            processed += 1
+    return processed
@@ -0,0 +1,217 @@
+"""Cross-store price comparison report.
+
+Loads the rows of a crawl into NumPy arrays and computes, per product, the
+minimum, maximum and spread of its price across stores and the ranking of
+the stores from the cheapest. All aggregation is vectorized, so the report
+scales to hundreds of thousands of rows.
+
+Usage:
+    python -m crawler.report output/results.csv -o output/report.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .normalize import UNKNOWN_NAME, price_to_halere, product_key
+from .writer import write_csv
+
+REPORT_FIELDS = [
+    "product", "name", "stores", "min_price_halere", "max_price_halere",
+    "spread_halere", "spread_pct", "cheapest_store", "ranking"
+]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise RuntimeError("The comparison report requires the 'numpy' package") from exc
+    return numpy
+
+
+def iter_results(path: str) -> Iterator[Dict]:
+    """Yields the result rows of a CSV, JSON Lines or SQLite output file."""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in (".sqlite", ".db"):
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute("SELECT * FROM results"):
+                yield dict(row)
+        finally:
+            conn.close()
+    elif extension == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def load_columns(rows: Iterable[Dict], key_func: Callable[[Optional[str]], str] = product_key) -> Dict:
+    """
+    Loads result rows into column arrays.
+
+    Rows with an error, without a name (or with the placeholder name of a page
+    without a heading) or without a parsable price are skipped. The typed
+    price_halere field is used when present, otherwise the display price is
+    parsed.
+
+    Args:
+        rows (Iterable[Dict]): Result rows.
+        key_func (Callable): Maps a product name to the key matching it across stores.
+
+    Returns:
+        Dict: "key", "name" and "store" (string arrays) and "price" (int64 array, haléř).
+    """
+    np = _numpy()
+    keys, names, stores, prices = [], [], [], []
+
+    for row in rows:
+        if row.get("error") or row.get("name") in (None, "", UNKNOWN_NAME):
+            continue
+
+        price = row.get("price_halere")
+        price = int(price) if price not in (None, "") else price_to_halere(row.get("price"))
+        key = key_func(row.get("name"))
+        if price is None or not key:
+            continue
+
+        keys.append(key)
+        names.append(row.get("name") or "")
+        stores.append(row.get("store") or "")
+        prices.append(price)
+
+    return {
+        "key": np.array(keys, dtype=str),
+        "name": np.array(names, dtype=object),
+        "store": np.array(stores, dtype=str),
+        "price": np.array(prices, dtype=np.int64)
+    }
+
+
+def compare_stores(columns: Dict) -> Dict:
+    """
+    Computes the per-product comparison across stores.
+
+    If a store lists a product more than once, its cheapest offer is used.
+
+    Args:
+        columns (Dict): Arrays as returned by load_columns.
+
+    Returns:
+        Dict: Arrays with one entry per product: "product", "name", "stores"
+        (number of stores), "min", "max", "spread", "spread_pct",
+        "cheapest_store" and "ranking" (stores from the cheapest, joined by " < ").
+    """
+    np = _numpy()
+    prices = columns["price"]
+
+    if len(prices) == 0:
+        empty = np.array([], dtype=np.int64)
+        return {
+            "product": np.array([], dtype=str), "name": np.array([], dtype=object),
+            "stores": empty, "min": empty, "max": empty, "spread": empty,
+            "spread_pct": np.array([], dtype=float), "cheapest_store": np.array([], dtype=str),
+            "ranking": np.array([], dtype=object)
+        }
+
+    products, product_ids = np.unique(columns["key"], return_inverse=True)
+    store_names, store_ids = np.unique(columns["store"], return_inverse=True)
+
+    # Sort by product, then store, then price; keep each store's cheapest offer.
+    order = np.lexsort((prices, store_ids, product_ids))
+    product_ids = product_ids[order]
+    store_ids = store_ids[order]
+    prices = prices[order]
+    names = columns["name"][order]
+
+    first_offer = np.ones(len(order), dtype=bool)
+    first_offer[1:] = (product_ids[1:] != product_ids[:-1]) | (store_ids[1:] != store_ids[:-1])
+    product_ids = product_ids[first_offer]
+    store_ids = store_ids[first_offer]
+    prices = prices[first_offer]
+    names = names[first_offer]
+
+    # Sort the remaining offers by product, then price.
+    order = np.lexsort((store_ids, prices, product_ids))
+    product_ids = product_ids[order]
+    store_ids = store_ids[order]
+    prices = prices[order]
+    names = names[order]
+
+    starts = np.flatnonzero(np.r_[True, product_ids[1:] != product_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(prices)])
+
+    minimum = prices[starts]
+    maximum = np.maximum.reduceat(prices, starts)
+    spread = maximum - minimum
+    spread_pct = np.where(minimum > 0, spread * 100.0 / np.maximum(minimum, 1), 0.0)
+
+    ranked_stores = store_names[store_ids]
+    ranking = np.array(
+        [" < ".join(group) for group in np.split(ranked_stores, starts[1:])],
+        dtype=object
+    )
+
+    return {
+        "product": products[product_ids[starts]],
+        "name": names[starts],
+        "stores": counts,
+        "min": minimum,
+        "max": maximum,
+        "spread": spread,
+        "spread_pct": np.round(spread_pct, 2),
+        "cheapest_store": ranked_stores[starts],
+        "ranking": ranking
+    }
+
+
+def report_rows(comparison: Dict) -> List[Dict]:
+    """Converts the comparison arrays to rows with the REPORT_FIELDS columns."""
+    return [
+        {
+            "product": product,
+            "name": name,
+            "stores": int(stores),
+            "min_price_halere": int(minimum),
+            "max_price_halere": int(maximum),
+            "spread_halere": int(spread),
+            "spread_pct": float(spread_pct),
+            "cheapest_store": cheapest,
+            "ranking": ranking
+        }
+        for product, name, stores, minimum, maximum, spread, spread_pct, cheapest, ranking in zip(
+            comparison["product"], comparison["name"], comparison["stores"], comparison["min"],
+            comparison["max"], comparison["spread"], comparison["spread_pct"],
+            comparison["cheapest_store"], comparison["ranking"]
+        )
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-store price comparison report")
+    parser.add_argument("results", help="results file (.csv, .jsonl or .sqlite)")
+    parser.add_argument("-o", "--output", default=os.path.join("output", "report.csv"), help="report CSV path")
+    parser.add_argument("--all", action="store_true", help="include products sold by a single store")
+    args = parser.parse_args()
+
+    comparison = compare_stores(load_columns(iter_results(args.results)))
+    rows = report_rows(comparison)
+    if not args.all:
+        rows = [row for row in rows if row["stores"] > 1]
+
+    if os.path.exists(args.output):
+        os.remove(args.output)
+    write_csv(args.output, rows)
+    print(f"{len(rows)} products written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
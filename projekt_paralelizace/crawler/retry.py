@@ -0,0 +1,84 @@
+"""Retry policy for failed downloads.
+
+Failures are classified as retryable (timeouts, server errors, dropped
+connections) or terminal (404, anti-bot blocks, parse errors). Retryable jobs
+are retried after an exponentially growing, jittered delay. A job that
+overran its own job deadline (or the crawl deadline) is not retried.
+"""
+import random
+import re
+from typing import Optional
+
+from .deadline import CRAWL_DEADLINE_ERROR, JOB_DEADLINE_ERROR
+
+_RETRYABLE_STATUS_RE = re.compile(r"^HTTP (5\d\d|429|408)\b")
+_RETRYABLE_MARKERS = (
+    "timeout",
+    "timed out",
+    # tls_client reports a request timeout as "context deadline exceeded".
+    "deadline exceeded",
+    "connection reset",
+    "connection refused",
+    "connection aborted",
+    "broken pipe",
+    "unexpected eof",
+    "eof occurred",
+    "temporarily unavailable",
+    "temporary failure",
+)
+_TERMINAL_ERRORS = (JOB_DEADLINE_ERROR, CRAWL_DEADLINE_ERROR)
+
+
+def is_retryable(error: Optional[str]) -> bool:
+    """
+    Returns True if the error describes a transient failure worth retrying.
+
+    Args:
+        error (Optional[str]): The error message of a result row.
+    """
+    if not error or error in _TERMINAL_ERRORS:
+        return False
+
+    if _RETRYABLE_STATUS_RE.match(error):
+        return True
+
+    lowered = error.lower()
+    return any(marker in lowered for marker in _RETRYABLE_MARKERS)
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed job is retried.
+
+    The delay before attempt n (1 for the first retry) is drawn uniformly from
+    [0, min(max_delay, base_delay * 2 ** (n - 1))] ("full jitter"), so retries
+    of many jobs failing at once are spread out.
+    """
+
+    def __init__(self, retry_count: int = 2, base_delay: float = 1.0, max_delay: float = 30.0):
+        """
+        Initializes the policy.
+
+        Args:
+            retry_count (int): Maximum number of retries per job.
+            base_delay (float): Upper bound of the first retry delay in seconds.
+            max_delay (float): Upper bound of any retry delay in seconds.
+        """
+        self.retry_count = max(0, retry_count)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, attempt: int, error: Optional[str]) -> bool:
+        """
+        Returns True if a job that failed on the given attempt should be retried.
+
+        Args:
+            attempt (int): Number of the failed attempt (0 for the first try).
+            error (Optional[str]): The error message.
+        """
+        return attempt < self.retry_count and is_retryable(error)
+
+    def delay(self, attempt: int) -> float:
+        """Returns the delay in seconds before retry number `attempt` (1-based)."""
+        cap = min(self.max_delay, self.base_delay * (2 ** max(0, attempt - 1)))
+        return random.uniform(0, cap)
@@ -0,0 +1,157 @@
+"""Per-domain politeness scheduling.
+
+Provides token buckets limiting the request rate of each domain and helpers
+interleaving jobs across domains.
+"""
+import multiprocessing
+import time
+import zlib
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second with bursts of `burst` requests.
+
+    It is implemented as a generic cell rate algorithm: the only state is the
+    theoretical arrival time of the next request, kept in shared memory. The
+    bucket can therefore be handed to pool worker processes (through the pool
+    initializer) and all of them draw from the same budget.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initializes the bucket.
+
+        Args:
+            rate (float): Allowed requests per second.
+            burst (int): Number of requests that may be sent back to back.
+        """
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+
+        self.rate = rate
+        self.burst = max(1, int(burst))
+        self.interval = 1.0 / rate
+        self.tolerance = (self.burst - 1) * self.interval
+        self._arrival = multiprocessing.Value("d", 0.0)
+
+    def reserve(self) -> float:
+        """
+        Takes one token and returns how long the caller has to wait before using it.
+
+        Returns:
+            float: The delay in seconds (0.0 when a token is available now).
+        """
+        with self._arrival.get_lock():
+            now = time.monotonic()
+            arrival = max(self._arrival.value, now)
+            delay = max(0.0, arrival - self.tolerance - now)
+            self._arrival.value = arrival + self.interval
+        return delay
+
+    def acquire(self) -> None:
+        """Blocks until a token is available."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PolitenessScheduler:
+    """
+    Holds one token bucket per domain.
+
+    Limits are configured per registered domain; a configured domain also covers
+    its subdomains ("alza.cz" applies to "www.alza.cz"). Other domains share
+    a fixed set of buckets with the "default" limits ("slots" of them, 64 by
+    default), allocated up front so every process that receives the scheduler
+    uses the same ones; a domain always maps to the same slot, and domains
+    sharing a slot share its budget. Without default limits, such domains are
+    not throttled.
+    """
+
+    def __init__(self, limits: Dict[str, Dict]):
+        """
+        Initializes the scheduler from the "rate_limits" configuration.
+
+        Args:
+            limits (Dict[str, Dict]): Maps a domain (or "default") to a dict
+                                      with "rate" (requests per second) and "burst".
+        """
+        self.default = limits.get("default")
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.default_buckets: List[TokenBucket] = []
+        if self.default is not None:
+            slots = max(1, int(self.default.get("slots", 64)))
+            self.default_buckets = [self._create_bucket(self.default) for _ in range(slots)]
+
+        for domain, limit in limits.items():
+            if domain == "default":
+                continue
+            self.buckets[domain.lower()] = self._create_bucket(limit)
+
+        self._resolved: Dict[str, Optional[TokenBucket]] = {}
+
+    @staticmethod
+    def _create_bucket(limit: Dict) -> TokenBucket:
+        return TokenBucket(float(limit.get("rate", 1.0)), int(limit.get("burst", 1)))
+
+    def bucket_for(self, domain: str) -> Optional[TokenBucket]:
+        """
+        Returns the token bucket that applies to the domain.
+
+        Args:
+            domain (str): The host name, e.g. "www.alza.cz".
+
+        Returns:
+            Optional[TokenBucket]: The bucket, or None if the domain is not throttled.
+        """
+        domain = domain.lower()
+        if domain in self._resolved:
+            return self._resolved[domain]
+
+        bucket = None
+        for registered, candidate in self.buckets.items():
+            if domain == registered or domain.endswith("." + registered):
+                bucket = candidate
+                break
+
+        if bucket is None and self.default_buckets:
+            # crc32 is stable across processes, unlike the salted hash().
+            bucket = self.default_buckets[zlib.crc32(domain.encode("utf-8")) % len(self.default_buckets)]
+
+        # Resolution is deterministic, so concurrent threads store the same bucket.
+        self._resolved[domain] = bucket
+        return bucket
+
+    def reserve(self, domain: str) -> float:
+        """Takes a token of the domain and returns the delay before it may be used."""
+        bucket = self.bucket_for(domain)
+        if bucket is None:
+            return 0.0
+        return bucket.reserve()
+
+    def acquire(self, domain: str) -> None:
+        """Blocks until a request to the domain is allowed."""
+        delay = self.reserve(domain)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def round_robin(iterables: Iterable[Iterable]) -> Iterator:
+    """
+    Yields one item from each iterable in turn until all of them are exhausted.
+
+    The iterables are consumed lazily.
+    """
+    iterators = deque(iter(iterable) for iterable in iterables)
+    while iterators:
+        iterator = iterators.popleft()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            continue
+        yield item
+        iterators.append(iterator)
+
@@ -0,0 +1,128 @@
+"""Persistent warm-up state.
+
+After the warm-up request to a domain, the session cookies are saved to a
+SQLite file together with the time of the warm-up. Until `ttl` seconds have
+passed, any later run loads them into a new session instead of repeating the
+homepage request and the pause after it.
+"""
+import json
+import os
+import sqlite3
+import time
+from http.cookiejar import Cookie, CookieJar
+from typing import Dict, List, Optional
+
+from .sqlite_util import ProcessLocalConnection
+
+
+def cookies_to_dicts(jar: CookieJar) -> List[Dict]:
+    """Serializes the cookies of a jar (expired ones are left out)."""
+    now = time.time()
+    return [
+        {
+            "name": cookie.name,
+            "value": cookie.value,
+            "domain": cookie.domain,
+            "path": cookie.path,
+            "secure": cookie.secure,
+            "expires": cookie.expires,
+            "rest": dict(getattr(cookie, "_rest", {}) or {})
+        }
+        for cookie in jar
+        if cookie.expires is None or cookie.expires > now
+    ]
+
+
+def add_cookies(jar: CookieJar, cookies: List[Dict]):
+    """Adds serialized cookies to a jar."""
+    for item in cookies:
+        domain = item.get("domain") or ""
+        path = item.get("path") or "/"
+        jar.set_cookie(Cookie(
+            version=0, name=item["name"], value=item["value"],
+            port=None, port_specified=False,
+            domain=domain, domain_specified=bool(domain), domain_initial_dot=domain.startswith("."),
+            path=path, path_specified=True,
+            secure=bool(item.get("secure")), expires=item.get("expires"), discard=item.get("expires") is None,
+            comment=None, comment_url=None, rest=item.get("rest") or {}
+        ))
+
+
+class SessionStore(ProcessLocalConnection):
+    """
+    Per-domain warm-up state backed by a SQLite file.
+
+    The database connection is opened lazily by each process using the store
+    (one inherited through fork is replaced, never used), so an instance can
+    be handed to pool workers. One instance may be shared
+    by several threads.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600.0):
+        """
+        Initializes the store.
+
+        Args:
+            path (str): Path of the SQLite file.
+            ttl (float): Seconds for which a warm-up is reused.
+        """
+        self.path = path
+        self.ttl = ttl
+        self._init_connection()
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "domain TEXT PRIMARY KEY, cookies TEXT NOT NULL, warmed_at REAL NOT NULL)"
+        )
+        conn.commit()
+        return conn
+
+    def load(self, domain: str) -> Optional[List[Dict]]:
+        """Returns the saved cookies of a domain, or None if there are none within the TTL."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT cookies, warmed_at FROM sessions WHERE domain = ?", (domain,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def save(self, domain: str, cookies: List[Dict], warmed_at: Optional[float] = None):
+        """Saves the cookies of a domain obtained by a warm-up at warmed_at (now by default)."""
+        warmed_at = time.time() if warmed_at is None else warmed_at
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (domain, cookies, warmed_at) VALUES (?, ?, ?)",
+                    (domain, json.dumps(cookies), warmed_at)
+                )
+
+    def forget(self, domain: str):
+        """Drops the state of a domain (for example after it blocked the session)."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM sessions WHERE domain = ?", (domain,))
+
+
+def from_config(settings) -> Optional[SessionStore]:
+    """
+    Opens the store configured by the "session_store" configuration.
+
+    Args:
+        settings: The configuration section; None or empty disables the store,
+            True uses the defaults.
+    """
+    if not settings:
+        return None
+    if settings is True:
+        settings = {}
+    return SessionStore(
+        settings.get("path", os.path.join("cache", "sessions.sqlite")),
+        ttl=settings.get("ttl", 3600)
+    )
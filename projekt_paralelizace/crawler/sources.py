@@ -0,0 +1,193 @@
+"""Streaming job sources.
+
+Besides the inline "urls" list, a store in the configuration can read its URLs
+from external files through "sources":
+
+    {"name": "alza", "type": "alza", "sources": [
+        {"path": "urls/alza.txt.gz"},
+        {"path": "urls/alza.csv", "column": "product_url"},
+        {"path": "urls/alza-sitemap.xml"}
+    ]}
+
+Every source is read lazily by a generator, so the crawl holds only the jobs
+currently in flight, no matter how many URLs the files contain.
+"""
+import csv
+import gzip
+import io
+import os
+import xml.etree.ElementTree as ElementTree
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple
+
+from .cache import canonical_url
+from .scheduler import round_robin
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def open_text(path: str) -> TextIO:
+    """Opens a text file for reading, transparently decompressing gzip files."""
+    with open(path, "rb") as f:
+        compressed = f.read(2) == _GZIP_MAGIC
+    if compressed:
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _open_binary(path: str):
+    with open(path, "rb") as f:
+        compressed = f.read(2) == _GZIP_MAGIC
+    return gzip.open(path, "rb") if compressed else open(path, "rb")
+
+
+def iter_text_urls(path: str) -> Iterator[str]:
+    """Yields one URL per line; blank lines and lines starting with '#' are skipped."""
+    with open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def iter_csv_urls(path: str, column: str = "url") -> Iterator[str]:
+    """Yields the non-empty values of one column of a CSV file with a header."""
+    with open_text(path) as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None or column not in reader.fieldnames:
+            raise ValueError(f"CSV source {path} has no '{column}' column")
+        for row in reader:
+            url = (row.get(column) or "").strip()
+            if url:
+                yield url
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_sitemap_entries(f: BinaryIO) -> Iterator[Tuple[str, str]]:
+    """
+    Yields ("url", loc) for every <url> and ("sitemap", loc) for every
+    <sitemap> entry of a sitemap or sitemap index.
+
+    The XML is parsed incrementally and processed entries are removed from
+    the root element, so sitemaps of any size are read in constant memory.
+
+    Args:
+        f (BinaryIO): The uncompressed sitemap XML.
+    """
+    root = None
+    for event, element in ElementTree.iterparse(f, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        kind = _local_name(element.tag)
+        if kind not in ("url", "sitemap"):
+            continue
+        for child in element:
+            if _local_name(child.tag) == "loc" and child.text:
+                yield kind, child.text.strip()
+                break
+        # The root still references every finished entry, so clearing the
+        # entry alone is not enough.
+        root.clear()
+
+
+def iter_sitemap_urls(path: str) -> Iterator[str]:
+    """
+    Yields the <loc> of every <url> entry of a sitemap file.
+
+    Entries of a sitemap index are not followed here; see crawler.discovery.
+    """
+    with _open_binary(path) as f:
+        for kind, loc in iter_sitemap_entries(f):
+            if kind == "url":
+                yield loc
+
+
+def _source_format(source: Dict) -> str:
+    source_format = source.get("format")
+    if source_format:
+        return source_format
+
+    name = source["path"].lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    extension = os.path.splitext(name)[1]
+    return {".csv": "csv", ".xml": "sitemap"}.get(extension, "text")
+
+
+def iter_source_urls(source: Dict) -> Iterator[str]:
+    """
+    Yields the URLs of one configured source.
+
+    Args:
+        source (Dict): {"path": ..., "format": "text" | "csv" | "sitemap",
+            "column": ...}. The format defaults to the file extension
+            (.csv, .xml, anything else is text, with an optional .gz suffix);
+            "column" selects the CSV column (default "url").
+    """
+    source_format = _source_format(source)
+    path = source["path"]
+
+    if source_format == "text":
+        return iter_text_urls(path)
+    if source_format == "csv":
+        return iter_csv_urls(path, source.get("column", "url"))
+    if source_format == "sitemap":
+        return iter_sitemap_urls(path)
+    raise ValueError(f"Unknown source format: {source_format}")
+
+
+def iter_store_jobs(store: Dict, skip: Optional[Set[str]] = None, frontier=None) -> Iterator[Dict]:
+    """
+    Yields the jobs of one configured store: its discovered URLs, then its
+    inline "urls" and every entry of its "sources".
+
+    Listed URLs are checked against the frontier by their canonical form (see
+    canonical_url), so a product that is also discovered, or listed twice in
+    another form, is crawled once; the job keeps the URL as listed. A store
+    with "discover" adds its listed URLs to the frontier; those already in it
+    are left out.
+
+    Args:
+        store (Dict): Store configuration with "type" and "urls", "sources" and/or "discover".
+        skip (Optional[Set[str]]): URLs to leave out (already crawled).
+        frontier (Optional[UrlFrontier]): Frontier holding the discovered URLs.
+    """
+    store_type = store.get("type")
+    name = store.get("name", store_type)
+    discovered = frontier is not None and bool(store.get("discover"))
+
+    def listed() -> Iterator[str]:
+        yield from store.get("urls", [])
+        for source in store.get("sources", []):
+            yield from iter_source_urls(source)
+
+    def urls() -> Iterator[str]:
+        if discovered:
+            yield from frontier.iter_urls(name)
+        for url in listed():
+            url = url.strip()
+            key = canonical_url(url)
+            if key is None:
+                continue
+            if discovered:
+                if frontier.add(name, key, url if url != key else None):
+                    yield url
+            elif frontier is None or key not in frontier:
+                yield url
+
+    for url in urls():
+        if skip and url in skip:
+            continue
+        yield {"type": store_type, "url": url}
+
+
+def iter_jobs(stores: Iterable[Dict], skip: Optional[Set[str]] = None, frontier=None) -> Iterator[Dict]:
+    """
+    Lazily yields the jobs of all stores, alternating between the stores so
+    consecutive jobs target different domains.
+    """
+    return round_robin(iter_store_jobs(store, skip, frontier) for store in stores)
@@ -0,0 +1,65 @@
+"""SQLite connections of the stores shared with worker processes.
+
+The stores (response cache, session store, page archive) are handed to pool
+workers, so each process opens its own connection on first use. A connection
+inherited through fork belongs to the parent: the child must neither use nor
+close it (closing could checkpoint or delete the parent's WAL), so it is kept
+referenced until the process exits.
+"""
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+_inherited_connections: List[sqlite3.Connection] = []
+
+
+class ProcessLocalConnection(ABC):
+    """
+    Mixin giving a store one lazily opened SQLite connection per process.
+
+    Subclasses call _init_connection() from __init__ and implement _open();
+    _connection() must be called with `_lock` held.
+    """
+
+    _conn: Optional[sqlite3.Connection]
+    _pid: Optional[int]
+    _lock: threading.Lock
+
+    def _init_connection(self):
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _open(self) -> sqlite3.Connection:
+        """Opens and prepares a new connection."""
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid != os.getpid():
+            _inherited_connections.append(self._conn)
+            self._conn = None
+        if self._conn is None:
+            self._pid = os.getpid()
+            self._conn = self._open()
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                if self._pid == os.getpid():
+                    self._conn.close()
+                else:
+                    _inherited_connections.append(self._conn)
+                self._conn = None
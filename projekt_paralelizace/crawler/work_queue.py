@@ -0,0 +1,339 @@
+"""Shared work queue for distributed crawling.
+
+A SQLite file on a path shared by all nodes holds the jobs of a crawl, the
+leases held by the workers and the results they send back. Workers lease a
+batch of jobs and keep the lease alive with heartbeats; the coordinator puts
+the jobs of leases that saw no heartbeat for `lease_seconds` (a dead or stuck
+worker) back into the queue. A heartbeat only counts up the lease, and the
+coordinator times the leases with its own clock, so the clocks of the nodes
+need not agree.
+
+Each crawl of the coordinator is a run with its own id. Its jobs and the
+queue's "closed" flag belong to the run, so a worker never mistakes a
+previous crawl for the current one.
+
+Every operation is a short IMMEDIATE transaction, so any number of worker
+processes on any number of machines can share the file (it must live on a
+file system with working locks). The queue uses the rollback journal: WAL
+needs shared memory between the processes and does not work on network file
+systems.
+"""
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class WorkQueue:
+    """
+    Lease based job queue backed by a SQLite file.
+
+    Job states: 0 = pending, 1 = leased, 2 = done.
+
+    Attributes:
+        run_id (Optional[str]): The run the queue works on, set by reset()
+            (coordinator) or join_run() (worker).
+    """
+
+    PENDING = 0
+    LEASED = 1
+    DONE = 2
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, job TEXT NOT NULL, run TEXT, "
+        "state INTEGER NOT NULL DEFAULT 0, attempt INTEGER NOT NULL DEFAULT 0, "
+        "expiries INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL DEFAULT 0, "
+        "owner TEXT, beats INTEGER NOT NULL DEFAULT 0);"
+        "CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, available_at, id);"
+        "CREATE TABLE IF NOT EXISTS results ("
+        "id INTEGER PRIMARY KEY, job_id INTEGER NOT NULL, owner TEXT, row TEXT NOT NULL, metrics TEXT);"
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+    )
+
+    def __init__(self, path: str, lease_seconds: float = 60.0, timeout: float = 30.0):
+        """
+        Opens (or creates) the queue.
+
+        Args:
+            path (str): Path of the SQLite file.
+            lease_seconds (float): How long a lease lasts without a heartbeat,
+                timed by the coordinator.
+            timeout (float): How long to wait for a lock held by another node.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.run_id: Optional[str] = None
+        # Coordinator: job id -> (heartbeat count, monotonic time it was first seen).
+        self._beats: Dict[int, Tuple[int, float]] = {}
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(self._SCHEMA)
+
+    def _transaction(self):
+        return _Immediate(self._conn)
+
+    def reset(self):
+        """
+        Removes all jobs and results and opens a new run (coordinator).
+
+        The tables are recreated, so a queue file of an older version is
+        brought up to date.
+        """
+        self.run_id = uuid.uuid4().hex
+        self._beats.clear()
+        with self._transaction():
+            self._conn.execute("DROP TABLE IF EXISTS jobs")
+            self._conn.execute("DROP TABLE IF EXISTS results")
+            self._conn.execute("DROP TABLE IF EXISTS meta")
+            for statement in self._SCHEMA.split(";"):
+                if statement:
+                    self._conn.execute(statement)
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('run', ?)", (self.run_id,))
+
+    def join_run(self) -> bool:
+        """
+        Joins the run of the queue if it is still open (worker).
+
+        Returns:
+            bool: False if there is no open run yet, e.g. because the queue
+            still holds the closed run of a previous crawl.
+        """
+        rows = dict(self._conn.execute("SELECT key, value FROM meta WHERE key IN ('run', 'closed')").fetchall())
+        if rows.get("run") is None or "closed" in rows:
+            return False
+        self.run_id = rows["run"]
+        return True
+
+    def enqueue(self, jobs: Iterable[Dict], batch_size: int = 1000) -> int:
+        """
+        Adds jobs (ignoring URLs already queued), in transactions of batch_size jobs.
+
+        Returns:
+            int: Number of jobs added.
+        """
+        added = 0
+        batch = []
+
+        def flush():
+            nonlocal added
+            with self._transaction():
+                for job in batch:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO jobs (url, job, run) VALUES (?, ?, ?)",
+                        (job["url"], json.dumps(job, ensure_ascii=False), self.run_id)
+                    )
+                    added += cursor.rowcount
+
+        for job in jobs:
+            batch.append(job)
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+        if batch:
+            flush()
+
+        return added
+
+    def lease(self, worker_id: str, count: int = 1) -> List[Tuple[int, Dict]]:
+        """
+        Leases up to count pending jobs of the queue's run to a worker.
+
+        Returns:
+            List[Tuple[int, Dict]]: The job ids and jobs (with their "attempt").
+        """
+        now = time.time()
+        with self._transaction():
+            rows = self._conn.execute(
+                "SELECT id, job, attempt FROM jobs WHERE state = ? AND available_at <= ? AND run IS ? "
+                "ORDER BY id LIMIT ?",
+                (self.PENDING, now, self.run_id, count)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, owner = ?, beats = beats + 1 WHERE id = ?",
+                [(self.LEASED, worker_id, job_id) for job_id, _, _ in rows]
+            )
+
+        leased = []
+        for job_id, job, attempt in rows:
+            job = json.loads(job)
+            if attempt:
+                job["attempt"] = attempt
+            leased.append((job_id, job))
+        return leased
+
+    def heartbeat(self, worker_id: str) -> int:
+        """
+        Extends all leases of a worker in the queue's run.
+
+        Returns:
+            int: Number of leases still held.
+        """
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE jobs SET beats = beats + 1 WHERE state = ? AND owner = ? AND run IS ?",
+                (self.LEASED, worker_id, self.run_id)
+            )
+            return cursor.rowcount
+
+    def complete(self, worker_id: str, job_id: int, row: Dict, metrics: Optional[Dict] = None) -> bool:
+        """
+        Sends the result of a leased job back to the coordinator.
+
+        Returns:
+            bool: False if the worker had lost the lease (the result is dropped).
+        """
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, owner = NULL "
+                "WHERE id = ? AND state = ? AND owner = ? AND run IS ?",
+                (self.DONE, job_id, self.LEASED, worker_id, self.run_id)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._conn.execute(
+                "INSERT INTO results (job_id, owner, row, metrics) VALUES (?, ?, ?, ?)",
+                (
+                    job_id, worker_id, json.dumps(row, ensure_ascii=False),
+                    json.dumps(metrics) if metrics is not None else None
+                )
+            )
+            return True
+
+    def collect(self, limit: int = 1000) -> List[Tuple[int, Dict, Dict, Optional[Dict]]]:
+        """
+        Takes the results sent by the workers off the queue (coordinator).
+
+        Returns:
+            List[Tuple[int, Dict, Dict, Optional[Dict]]]: Job id, job, result row
+            and metrics snapshot of each result.
+        """
+        with self._transaction():
+            rows = self._conn.execute(
+                "SELECT results.id, results.job_id, jobs.job, jobs.attempt, results.row, results.metrics "
+                "FROM results JOIN jobs ON jobs.id = results.job_id ORDER BY results.id LIMIT ?",
+                (limit,)
+            ).fetchall()
+            if rows:
+                self._conn.execute("DELETE FROM results WHERE id <= ?", (rows[-1][0],))
+
+        collected = []
+        for _, job_id, job, attempt, row, metrics in rows:
+            job = json.loads(job)
+            if attempt:
+                job["attempt"] = attempt
+            collected.append((job_id, job, json.loads(row), json.loads(metrics) if metrics else None))
+        return collected
+
+    def retry(self, job_id: int, delay: float):
+        """Puts a finished job back into the queue after delay seconds (coordinator)."""
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, attempt = attempt + 1, available_at = ? WHERE id = ?",
+                (self.PENDING, time.time() + delay, job_id)
+            )
+
+    def requeue_expired(self, max_leases: int = 3) -> Tuple[int, List[Tuple[int, Dict]]]:
+        """
+        Returns the jobs of expired leases to the queue (coordinator).
+
+        A lease expires once this queue has seen no heartbeat for it during
+        lease_seconds, measured from the first call that saw its current
+        heartbeat count, so it must be called regularly. Jobs whose lease has
+        now expired max_leases times are given up; a retried job keeps its
+        count of expiries.
+
+        Returns:
+            Tuple[int, List[Tuple[int, Dict]]]: The number of requeued jobs and
+            the given up jobs (marked done).
+        """
+        now = time.monotonic()
+        with self._transaction():
+            expired = []
+            beats = {}
+            for job_id, job, expiries, count in self._conn.execute(
+                "SELECT id, job, expiries + 1, beats FROM jobs WHERE state = ?", (self.LEASED,)
+            ).fetchall():
+                seen = self._beats.get(job_id)
+                if seen is None or seen[0] != count:
+                    beats[job_id] = (count, now)
+                elif now - seen[1] >= self.lease_seconds:
+                    expired.append((job_id, job, expiries))
+                else:
+                    beats[job_id] = seen
+            self._beats = beats
+
+            requeued = [job_id for job_id, _, expiries in expired if expiries < max_leases]
+            given_up = [(job_id, json.loads(job)) for job_id, job, expiries in expired if expiries >= max_leases]
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, owner = NULL, expiries = expiries + 1 WHERE id = ?",
+                [(self.PENDING, job_id) for job_id in requeued]
+            )
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, owner = NULL, expiries = expiries + 1 WHERE id = ?",
+                [(self.DONE, job_id) for job_id, _ in given_up]
+            )
+        return len(requeued), given_up
+
+    def unfinished(self) -> int:
+        """Number of jobs that are pending or leased."""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state != ?", (self.DONE,)
+        ).fetchone()[0]
+
+    def started(self) -> List[Dict]:
+        """
+        The unfinished jobs a worker has leased: those leased now, and those
+        waiting in the queue for a retry or after an expired lease.
+        """
+        rows = self._conn.execute(
+            "SELECT job FROM jobs WHERE state = ? OR (state = ? AND (attempt > 0 OR expiries > 0))",
+            (self.LEASED, self.PENDING)
+        ).fetchall()
+        return [json.loads(job) for job, in rows]
+
+    def set_meta(self, key: str, value: str):
+        """Stores a crawl-wide setting for the workers (coordinator)."""
+        with self._transaction():
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def close_queue(self):
+        """Tells the workers that the crawl is over, unless a newer run has started (coordinator)."""
+        with self._transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) "
+                "SELECT 'closed', '1' WHERE (SELECT value FROM meta WHERE key = 'run') IS ?",
+                (self.run_id,)
+            )
+
+    def is_closed(self) -> bool:
+        """Whether the queue's run is over: closed, or replaced by a newer run."""
+        rows = dict(self._conn.execute("SELECT key, value FROM meta WHERE key IN ('run', 'closed')").fetchall())
+        return "closed" in rows or rows.get("run") != self.run_id
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class _Immediate:
+    """Context manager running a BEGIN IMMEDIATE ... COMMIT transaction."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        return False
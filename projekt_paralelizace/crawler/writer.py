@@ -1,6 +1,12 @@
-"""Writer utilities for CSV outputs."""
-import csv, os
-from typing import List, Dict
+"""Writer utilities for the crawl outputs.
+
+Result rows are written through a sink (CSV, JSON Lines, SQLite or Parquet)
+wrapped in a BatchedWriter, which buffers rows and hands them to the sink in
+batches, at the latest `flush_interval` seconds after a row arrived.
+"""
+import csv, json, os, sqlite3, threading, time
+from abc import ABC, abstractmethod
+from typing import Callable, List, Dict, Optional
 
 def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
@@ -17,3 +23,363 @@ def write_csv(path: str, rows: List[Dict]):
         if write_header:
             writer.writeheader()
         writer.writerows(rows)
+
+
+class ResultSink(ABC):
+    """
+    Base class of the output sinks.
+
+    A sink receives whole batches of rows. Its position is an opaque offset
+    (bytes for files, rows for tables) that is journaled after each batch, so
+    a resumed crawl can cut the output back to the last journaled batch.
+
+    Attributes:
+        supports_resume (bool): Whether truncate() can restore an earlier position.
+    """
+
+    supports_resume = True
+
+    def __init__(self, path: str, fieldnames: List[str], types: Optional[Dict[str, type]] = None):
+        """
+        Args:
+            path (str): Output path.
+            fieldnames (List[str]): Column names, in order.
+            types (Optional[Dict[str, type]]): Column types (str, int or float); str by default.
+        """
+        ensure_dir(os.path.dirname(path) or ".")
+        self.path = path
+        self.fieldnames = fieldnames
+        self.types = {name: (types or {}).get(name, str) for name in fieldnames}
+
+    @abstractmethod
+    def write_rows(self, rows: List[Dict]):
+        """Writes one batch of rows."""
+
+    @abstractmethod
+    def position(self) -> int:
+        """Returns the current output offset."""
+
+    @abstractmethod
+    def truncate(self, offset: int) -> bool:
+        """
+        Drops everything written after the offset.
+
+        Returns:
+            bool: False if the output is shorter than the offset (and so does not
+                  match the journal).
+        """
+
+    @abstractmethod
+    def close(self):
+        """Makes the output durable and closes it."""
+
+
+class _FileSink(ResultSink):
+    """Sink writing a text file; the offset is the file size in bytes."""
+
+    def __init__(self, path: str, fieldnames: List[str], types: Optional[Dict[str, type]] = None, append: bool = False):
+        super().__init__(path, fieldnames, types)
+        self._file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+
+    def position(self) -> int:
+        self._file.flush()
+        return self._file.tell()
+
+    def truncate(self, offset: int) -> bool:
+        if self.position() < offset:
+            return False
+        self._file.truncate(offset)
+        return True
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class CsvSink(_FileSink):
+    """CSV file with a header row."""
+
+    def __init__(self, path: str, fieldnames: List[str], types: Optional[Dict[str, type]] = None, append: bool = False):
+        super().__init__(path, fieldnames, types, append)
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction="ignore")
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def write_rows(self, rows: List[Dict]):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+
+class JsonLinesSink(_FileSink):
+    """JSON Lines file with one object per row."""
+
+    def write_rows(self, rows: List[Dict]):
+        fieldnames = self.fieldnames
+        self._file.write("".join(
+            json.dumps({name: row.get(name) for name in fieldnames}, ensure_ascii=False) + "\n"
+            for row in rows
+        ))
+        self._file.flush()
+
+
+class SqliteSink(ResultSink):
+    """
+    SQLite table `results` written with one transaction per batch.
+
+    The database runs in WAL mode, so readers can query it during the crawl.
+    The offset is the number of rows (the largest rowid).
+    """
+
+    _SQL_TYPES = {str: "TEXT", int: "INTEGER", float: "REAL"}
+
+    def __init__(self, path: str, fieldnames: List[str], types: Optional[Dict[str, type]] = None, append: bool = False):
+        super().__init__(path, fieldnames, types)
+        if not append and os.path.exists(path):
+            os.remove(path)
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+        # Batches may be written from the BatchedWriter's flush thread.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f'"{name}" {self._SQL_TYPES.get(self.types[name], "TEXT")}' for name in fieldnames)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS results ({columns})")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_url ON results (url)")
+        self._conn.commit()
+
+        placeholders = ", ".join("?" for _ in fieldnames)
+        column_list = ", ".join(f'"{name}"' for name in fieldnames)
+        self._insert = f"INSERT INTO results ({column_list}) VALUES ({placeholders})"
+
+    def write_rows(self, rows: List[Dict]):
+        fieldnames = self.fieldnames
+        with self._conn:
+            self._conn.executemany(self._insert, ([row.get(name) for name in fieldnames] for row in rows))
+
+    def position(self) -> int:
+        (rowid,) = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM results").fetchone()
+        return rowid
+
+    def truncate(self, offset: int) -> bool:
+        if self.position() < offset:
+            return False
+        with self._conn:
+            self._conn.execute("DELETE FROM results WHERE rowid > ?", (offset,))
+        return True
+
+    def close(self):
+        if self._conn is None:
+            return
+        self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+        self._conn.close()
+        self._conn = None
+
+
+class ParquetSink(ResultSink):
+    """
+    Parquet file with typed columns; every batch becomes one row group.
+
+    Requires pyarrow. A Parquet file is only readable once closed, so this
+    sink cannot continue an interrupted crawl. The offset is the row count.
+    """
+
+    supports_resume = False
+
+    def __init__(self, path: str, fieldnames: List[str], types: Optional[Dict[str, type]] = None, append: bool = False):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as exc:
+            raise RuntimeError("The parquet output format requires the 'pyarrow' package") from exc
+
+        if append:
+            raise ValueError("The parquet output format does not support resuming a crawl")
+
+        super().__init__(path, fieldnames, types)
+        arrow_types = {str: pyarrow.string(), int: pyarrow.int64(), float: pyarrow.float64()}
+        self._pa = pyarrow
+        self._schema = pyarrow.schema([(name, arrow_types[self.types[name]]) for name in fieldnames])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema, compression="zstd")
+        self._rows = 0
+
+    def write_rows(self, rows: List[Dict]):
+        columns = {name: [row.get(name) for row in rows] for name in self.fieldnames}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+        self._rows += len(rows)
+
+    def position(self) -> int:
+        return self._rows
+
+    def truncate(self, offset: int) -> bool:
+        return offset == 0
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+SINKS = {
+    "csv": (CsvSink, "results.csv"),
+    "jsonl": (JsonLinesSink, "results.jsonl"),
+    "sqlite": (SqliteSink, "results.sqlite"),
+    "parquet": (ParquetSink, "results.parquet")
+}
+
+
+def create_sink(
+    output_format: str,
+    output_dir: str,
+    fieldnames: List[str],
+    types: Optional[Dict[str, type]] = None,
+    path: Optional[str] = None,
+    append: bool = False
+) -> ResultSink:
+    """
+    Creates the sink for an output format.
+
+    Args:
+        output_format (str): One of "csv", "jsonl", "sqlite" and "parquet".
+        output_dir (str): Directory of the default output file.
+        fieldnames (List[str]): Column names, in order.
+        types (Optional[Dict[str, type]]): Column types.
+        path (Optional[str]): Output path overriding the default file name.
+        append (bool): Continue an existing output instead of replacing it.
+    """
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    sink_class, file_name = SINKS[output_format]
+    return sink_class(path or os.path.join(output_dir, file_name), fieldnames, types, append=append)
+
+
+class BatchedWriter:
+    """
+    Single writer for the crawl results.
+
+    Rows are buffered in memory and written to the sink in batches, either once
+    the buffer holds `batch_size` rows or, from a background thread, once the
+    oldest buffered row is `flush_interval` seconds old, so rows reach the
+    output on time even while no further rows arrive. The sink stays open for
+    the whole crawl and is made durable (fsync / checkpoint) when the writer is
+    closed.
+
+    After every flushed batch, `on_flush` is called with the batch rows and the
+    sink position at which the batch ended. Batches are written one at a time,
+    but not always from the thread calling write(). An error of a background
+    flush is raised by the next call to write(), flush() or close(); a batch
+    the sink failed to write is kept in the buffer and written by a later flush.
+    """
+
+    def __init__(
+        self,
+        sink: ResultSink,
+        batch_size: int = 100,
+        flush_interval: float = 5.0,
+        on_flush: Optional[Callable[[List[Dict], int], None]] = None
+    ):
+        """
+        Args:
+            sink (ResultSink): Destination of the rows.
+            batch_size (int): Number of buffered rows that triggers a flush.
+            flush_interval (float): Maximum age of a buffered row in seconds.
+            on_flush (Optional[Callable[[List[Dict], int], None]]): Called after each flushed batch.
+        """
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.rows_written = 0
+
+        self._buffer: List[Dict] = []
+        self._buffered_at = 0.0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._flusher = threading.Thread(target=self._flush_on_interval, name="result-flusher", daemon=True)
+        self._flusher.start()
+
+    def write(self, row: Dict):
+        """Buffers one row and flushes the batch if it is full."""
+        with self._cond:
+            self._raise_error()
+            if not self._buffer:
+                self._buffered_at = time.monotonic()
+                self._cond.notify()
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        """Writes all buffered rows to the sink."""
+        with self._cond:
+            self._raise_error()
+            self._flush()
+
+    def _flush(self):
+        batch = self._buffer
+        self._buffer = []
+        if not batch:
+            return
+
+        try:
+            self.sink.write_rows(batch)
+        except BaseException:
+            self._buffer = batch + self._buffer
+            raise
+        self.rows_written += len(batch)
+
+        if self.on_flush is not None:
+            self.on_flush(batch, self.sink.position())
+
+    def _flush_on_interval(self):
+        """
+        Body of the background thread flushing batches that got too old.
+
+        After a failed flush, the thread waits until the error has been raised
+        to the caller before it flushes again.
+        """
+        with self._cond:
+            while not self._closed:
+                if not self._buffer or self._error is not None:
+                    self._cond.wait()
+                    continue
+                remaining = self._buffered_at + self.flush_interval - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                try:
+                    self._flush()
+                except BaseException as exc:
+                    self._error = exc
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            self._cond.notify()
+            raise error
+
+    def close(self):
+        """Flushes the remaining rows and closes the sink."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._flusher.join()
+        try:
+            self.flush()
+        finally:
+            self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
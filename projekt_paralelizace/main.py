@@ -2,17 +2,68 @@
 """Entry point for the Product Price Crawler.
 
 Reads configuration and starts the orchestrator which manages the download,
-parsing and writing of product data.
+parsing and writing of product data, or a worker of a distributed crawl.
+
+Usage:
+    python main.py [--resume]
+    python main.py --worker [--queue PATH] [--worker-id NAME]
+    python main.py --reparse [CRAWL_ID]
+    python main.py --daemon
 """
 
+import argparse
 import json
-from crawler.orchestrator import Orchestrator
+import signal
+import threading
+from crawler.daemon import CrawlDaemon
+from crawler.distributed import run_worker
+from crawler.orchestrator import Orchestrator, configure_logging
 import os
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Product Price Crawler")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted crawl, skipping jobs recorded in the journal"
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="run as a worker of a distributed crawl, pulling jobs from the shared queue"
+    )
+    parser.add_argument("--queue", help="path of the shared work queue (overrides distributed.queue)")
+    parser.add_argument("--worker-id", help="name of this worker (default: host-pid)")
+    parser.add_argument(
+        "--reparse",
+        nargs="?",
+        const="",
+        metavar="CRAWL_ID",
+        help="re-extract an archived crawl (default: the latest) into the output, without downloading"
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and re-crawl each product when its refresh is due, reloading a changed config"
+    )
+    args = parser.parse_args()
+
     config_path = os.path.join(os.path.dirname(__file__), "config", "config.json")
     with open(config_path, "r", encoding="utf-8") as f:
         config = json.load(f)
 
-    orchestrator = Orchestrator(config)
-    orchestrator.run()
+    if args.daemon:
+        # The daemon reloads the configuration itself whenever the file changes,
+        # and logs to the configured logs_dir like a single crawl.
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+        CrawlDaemon(config_path).run(stop)
+    elif args.worker:
+        configure_logging(config.get("logs_dir", "logs"))
+        run_worker(config, worker_id=args.worker_id, queue_path=args.queue)
+    elif args.reparse is not None:
+        Orchestrator(config).reparse(args.reparse or None)
+    else:
+        orchestrator = Orchestrator(config, resume=args.resume)
+        orchestrator.run()
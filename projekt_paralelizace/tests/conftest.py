@@ -0,0 +1,88 @@
+"""Shared test fixtures: a product page and a fake downloader serving it."""
+
+import threading
+import time
+
+import pytest
+
+PAGE = """
+<html><body><h1>Phone</h1>
+<script type="application/ld+json">
+{"@type": "Product", "offers": {"price": "100", "availability": "http://schema.org/InStock"}}
+</script></body></html>
+"""
+
+
+class FakeDownloader:
+    """
+    Downloader answering every URL with PAGE after `delay` seconds, without network.
+
+    URLs ending in "404" fail with HTTP 404 and URLs ending in "flaky" fail
+    with HTTP 503 once. Every instance counts its own fetches and the peak
+    number of concurrent fetches per domain.
+    """
+
+    delay = 0.005
+
+    def __init__(self, timeout=15, **kwargs):
+        self.active = {}
+        self.peak = {}
+        self.fetched = 0
+        self.flaky_failed = set()
+        self.lock = threading.Lock()
+
+    def delay_for(self, url):
+        """Seconds the fetch of the URL takes (called after the fetch was counted)."""
+        return self.delay
+
+    def fetch(self, url):
+        domain = url.split("/")[2]
+        with self.lock:
+            self.fetched += 1
+            self.active[domain] = self.active.get(domain, 0) + 1
+            self.peak[domain] = max(self.peak.get(domain, 0), self.active[domain])
+        try:
+            time.sleep(self.delay_for(url))
+        finally:
+            with self.lock:
+                self.active[domain] -= 1
+        if url.endswith("404"):
+            return None, "HTTP 404 Not Found"
+        if url.endswith("flaky") and url not in self.flaky_failed:
+            self.flaky_failed.add(url)
+            return None, "HTTP 503"
+        return PAGE, None
+
+    def close(self):
+        pass
+
+
+class DownloaderFactory:
+    """Stands in for the Downloader class and keeps the downloaders it created."""
+
+    def __init__(self, downloader_class=FakeDownloader, **options):
+        """
+        Args:
+            downloader_class: Class of the downloaders to create.
+            **options: Extra keyword arguments of every downloader.
+        """
+        self.downloader_class = downloader_class
+        self.options = options
+        self.instances = []
+
+    def __call__(self, *args, **kwargs):
+        downloader = self.downloader_class(*args, **kwargs, **self.options)
+        self.instances.append(downloader)
+        return downloader
+
+    @property
+    def downloader(self):
+        """The only downloader created."""
+        (downloader,) = self.instances
+        return downloader
+
+
+@pytest.fixture
+def fake_downloader():
+    """A DownloaderFactory of FakeDownloader, to monkeypatch over an engine's Downloader."""
+    return DownloaderFactory()
@@ -0,0 +1,100 @@
+"""Tests for the adaptive per-domain concurrency controller."""
+
+import threading
+import time
+
+from crawler import async_engine
+from crawler.adaptive import AdaptiveConcurrency
+from crawler.async_engine import AsyncEngine
+from crawler.metrics import CrawlMetrics
+
+DOMAIN = "www.alza.cz"
+
+
+def drive(controller, outcomes):
+    for error in outcomes:
+        assert controller.try_acquire(DOMAIN)
+        controller.release(DOMAIN, error)
+
+
+def test_additive_increase_up_to_maximum():
+    controller = AdaptiveConcurrency(initial=2, maximum=4)
+
+    drive(controller, [None] * 2)
+    assert controller.limit(DOMAIN) == 3
+    drive(controller, [None] * 3)
+    assert controller.limit(DOMAIN) == 4
+    drive(controller, [None] * 20)
+    assert controller.limit(DOMAIN) == 4
+
+
+def test_blocks_cut_the_limit_and_cooldown_freezes_it():
+    metrics = CrawlMetrics()
+    controller = AdaptiveConcurrency(initial=8, maximum=8, cooldown=0.2, window=4, block_rate=0.25, metrics=metrics)
+
+    # No verdict before a full window of responses.
+    drive(controller, ["HTTP 403 Forbidden (Anti-bot block) - www.alza.cz"] * 3)
+    assert controller.limit(DOMAIN) == 8
+    drive(controller, ["HTTP 403 Forbidden (Anti-bot block) - www.alza.cz"])
+    assert controller.limit(DOMAIN) == 4
+    drive(controller, ["Captcha detected in content"] * 3 + [None] * 10)
+    assert controller.limit(DOMAIN) == 4
+
+    # After the cooldown, a single block is judged against a full window again.
+    time.sleep(0.25)
+    drive(controller, [None] * 3 + ["Captcha detected in content"])
+    assert controller.limit(DOMAIN) == 2
+    assert metrics.summary()["domains"][DOMAIN]["crawler_concurrency_limit"] == 2
+
+
+def test_other_errors_do_not_cut():
+    controller = AdaptiveConcurrency(initial=2, maximum=8)
+    drive(controller, ["HTTP 404 Not Found", "HTTP 503"])
+    assert controller.limit(DOMAIN) == 3
+
+
+def test_acquire_waits_for_a_free_slot():
+    controller = AdaptiveConcurrency(initial=1, maximum=1)
+    controller.acquire(DOMAIN)
+    acquired = threading.Event()
+
+    thread = threading.Thread(target=lambda: (controller.acquire(DOMAIN), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.05)
+    controller.release(DOMAIN)
+    assert acquired.wait(1)
+    thread.join()
+
+
+class BlockingDownloader:
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, timeout=15, **kwargs):
+        pass
+
+    def fetch(self, url):
+        with self.lock:
+            BlockingDownloader.active += 1
+            BlockingDownloader.peak = max(BlockingDownloader.peak, BlockingDownloader.active)
+        time.sleep(0.01)
+        with self.lock:
+            BlockingDownloader.active -= 1
+        return None, f"HTTP 403 Forbidden (Anti-bot block) - {DOMAIN}"
+
+    def close(self):
+        pass
+
+
+def test_async_engine_backs_off_a_blocking_domain(monkeypatch):
+    monkeypatch.setattr(async_engine, "Downloader", BlockingDownloader)
+    controller = AdaptiveConcurrency(initial=4, maximum=8, cooldown=60)
+    jobs = [{"type": "alza", "url": f"https://{DOMAIN}/{i}"} for i in range(30)]
+
+    rows = []
+    AsyncEngine(concurrency=30, per_domain_concurrency=8, parse_processes=1, adaptive=controller).run(jobs, rows.append)
+
+    assert len(rows) == 30
+    assert BlockingDownloader.peak <= 4
+    assert controller.limit(DOMAIN) == 2
@@ -0,0 +1,66 @@
+"""Tests for the content-addressed page archive."""
+
+import multiprocessing
+import os
+
+import pytest
+
+from crawler.archive import HtmlArchive, archive_page
+
+
+def blob_files(root):
+    return [name for _, _, files in os.walk(os.path.join(root, "blobs")) for name in files]
+
+
+def test_identical_pages_are_stored_once(tmp_path):
+    archive = HtmlArchive(str(tmp_path), codec="gzip")
+    first = archive.begin("crawl-1")
+    archive.add("https://www.alza.cz/a", "alza", "<html>same</html>")
+    archive.add("https://www.alza.cz/b", "alza", "<html>same</html>")
+    archive.begin("crawl-2")
+    digest = archive.add("https://www.alza.cz/a", "alza", "<html>same</html>")
+
+    assert first == "crawl-1"
+    assert len(blob_files(str(tmp_path))) == 1
+    assert archive.get_blob(digest) == "<html>same</html>"
+    assert archive.crawls() == [("crawl-1", 2), ("crawl-2", 1)]
+    assert archive.latest_crawl() == "crawl-2"
+
+
+def test_iter_pages_of_a_crawl(tmp_path):
+    archive = HtmlArchive(str(tmp_path), codec="gzip")
+    archive.begin("crawl-1")
+    for i in range(5):
+        archive_page(archive, {"url": f"https://www.alza.cz/{i}", "type": "alza"}, f"<p>{i}</p>")
+    archive_page(archive, {"url": "https://www.alza.cz/failed", "type": "alza"}, None)
+
+    pages = list(archive.iter_pages("crawl-1", page_size=2))
+
+    assert [url for url, _, _ in pages] == [f"https://www.alza.cz/{i}" for i in range(5)]
+    assert {store for _, store, _ in pages} == {"alza"}
+    assert archive.get_blob(pages[3][2]) == "<p>3</p>"
+
+
+def test_unknown_blob(tmp_path):
+    with pytest.raises(KeyError):
+        HtmlArchive(str(tmp_path), codec="gzip").get_blob("0" * 64)
+
+
+def _add_in_child(archive, url):
+    inherited = archive._conn
+    archive.add(url, "alza", "<html>child</html>")
+    os._exit(0 if archive._conn is not inherited else 1)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_forked_process_opens_its_own_connection(tmp_path):
+    archive = HtmlArchive(str(tmp_path), codec="gzip")
+    archive.begin("crawl-1")
+    assert archive._conn is not None
+
+    child = multiprocessing.get_context("fork").Process(target=_add_in_child, args=(archive, "https://www.alza.cz/c"))
+    child.start()
+    child.join()
+
+    assert child.exitcode == 0
+    assert [url for url, _, _ in archive.iter_pages("crawl-1")] == ["https://www.alza.cz/c"]
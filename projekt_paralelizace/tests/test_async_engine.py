@@ -0,0 +1,37 @@
+"""Tests for the asyncio crawl engine with a fake downloader."""
+
+from crawler import async_engine
+from crawler.async_engine import AsyncEngine
+
+
+def test_async_engine_limits_domains_and_collects_rows(monkeypatch, fake_downloader):
+    monkeypatch.setattr(async_engine, "Downloader", fake_downloader)
+    jobs = [{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(20)]
+    jobs.append({"type": "datart", "url": "https://www.datart.cz/404"})
+
+    rows = []
+    engine = AsyncEngine(concurrency=10, per_domain_concurrency=3, parse_processes=1)
+    processed = engine.run(jobs, rows.append)
+
+    assert processed == 21
+    assert fake_downloader.downloader.peak["www.alza.cz"] <= 3
+    by_url = {row["url"]: row for row in rows}
+    assert by_url["https://www.alza.cz/0"]["price"] == "100,-"
+    assert by_url["https://www.datart.cz/404"]["error"] == "HTTP 404 Not Found"
+
+
+def test_async_engine_does_not_fork_parse_processes(monkeypatch, fake_downloader):
+    monkeypatch.setattr(async_engine, "Downloader", fake_downloader)
+    contexts = []
+
+    class RecordingPool(async_engine.ProcessPoolExecutor):
+        def __init__(self, *args, mp_context=None, **kwargs):
+            contexts.append(mp_context)
+            super().__init__(*args, mp_context=mp_context, **kwargs)
+
+    monkeypatch.setattr(async_engine, "ProcessPoolExecutor", RecordingPool)
+    engine = AsyncEngine(concurrency=4, parse_processes=1, job_deadline=5)
+    assert engine.run([{"type": "alza", "url": "https://www.alza.cz/0"}], lambda row: None) == 1
+
+    # Forking while the fetch threads run could copy a lock one of them holds.
+    assert contexts and all(context.get_start_method() != "fork" for context in contexts)
@@ -0,0 +1,109 @@
+"""Tests for the on-disk response cache and conditional revalidation."""
+
+import pickle
+import sqlite3
+
+from crawler import downloader as downloader_module
+from crawler.cache import ResponseCache, normalize_url
+from crawler.downloader import Downloader
+
+BODY = "<html>" + "x" * 20000 + "</html>"
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = headers or {}
+
+
+class RevalidatingSession:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, dict(headers or {})))
+        if url.endswith(".cz/"):
+            return FakeResponse(200)
+        if headers.get("if-none-match") == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(200, BODY, {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    def close(self):
+        pass
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://WWW.Alza.cz:443/p?b=2&a=1#top") == "https://www.alza.cz/p?a=1&b=2"
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+
+    cache.put("https://a.cz/1", "one", None, None)
+    cache.put("https://a.cz/2", "two", None, None)
+    assert cache.get("https://a.cz/1").body == "one"
+    cache.put("https://a.cz/3", "three", None, None)
+
+    assert cache.get("https://a.cz/2") is None
+    assert cache.get("https://a.cz/1").body == "one"
+    assert cache.get("https://a.cz/3").body == "three"
+
+
+def test_cache_counts_pages_and_writes_reads_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE responses (key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, last_modified TEXT, "
+        "fetched_at REAL NOT NULL, last_access REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO responses VALUES ('https://a.cz/old', x'00', NULL, NULL, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    cache = ResponseCache(path, max_entries=3)
+    cache.put("https://a.cz/1", "one", None, None)
+    cache.put("https://a.cz/1", "one again", None, None)
+    count = lambda: cache._connection().execute("SELECT n FROM response_count").fetchone()[0]
+    assert count() == 2
+
+    changes = cache._connection().total_changes
+    assert cache.get("https://a.cz/1").body == "one again"
+    assert cache._connection().total_changes == changes
+
+    cache.put("https://a.cz/2", "two", None, None)
+    cache.put("https://a.cz/3", "three", None, None)
+    assert count() == 3
+    assert cache.get("https://a.cz/old") is None
+    cache.close()
+
+
+def test_cache_survives_pickling(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put("https://a.cz/1", "one", '"e"', None)
+
+    clone = pickle.loads(pickle.dumps(cache))
+
+    assert clone.get("https://a.cz/1").etag == '"e"'
+
+
+def test_downloader_revalidates_and_uses_fresh_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader_module.time, "sleep", lambda _: None)
+    monkeypatch.setattr(Downloader, "_create_session", lambda self: RevalidatingSession())
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    url = "https://www.alza.cz/p.htm"
+
+    first = Downloader(timeout=1, cache=cache)
+    assert first.fetch(url) == (BODY, None)
+
+    second = Downloader(timeout=1, cache=cache)
+    assert second.fetch(url) == (BODY, None)
+    sent = second.sessions["www.alza.cz"].requests[-1][1]
+    assert sent["if-none-match"] == '"v1"'
+    assert sent["if-modified-since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+    cache.max_age = 3600
+    third = Downloader(timeout=1, cache=cache)
+    assert third.fetch(url) == (BODY, None)
+    assert third.sessions == {}
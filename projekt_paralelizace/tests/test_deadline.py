@@ -0,0 +1,179 @@
+"""Tests for the crawl and job deadlines of the engines."""
+
+import os
+import time
+
+import pytest
+
+from crawler import async_engine, pipeline
+from crawler.async_engine import AsyncEngine
+from crawler.deadline import CRAWL_DEADLINE_ERROR, JOB_DEADLINE_ERROR, DeadlineExceeded, call_with_alarm, call_with_deadline
+from crawler.feed import JobFeed
+from crawler.parser import build_result_row
+from crawler.pipeline import PipelineEngine
+from crawler.retry import RetryPolicy
+from tests.conftest import DownloaderFactory, FakeDownloader
+
+class SlowDownloader(FakeDownloader):
+    """Hangs for 3 s on URLs containing "hang"."""
+
+    def delay_for(self, url):
+        return 3 if "hang" in url else 0
+
+
+class SteadyDownloader(FakeDownloader):
+    """Answers every URL after 0.2 s; the "hang" page names the overrun marker file."""
+
+    def __init__(self, timeout=15, marker=None, **kwargs):
+        super().__init__(timeout, **kwargs)
+        self.marker = marker
+
+    def delay_for(self, url):
+        return 0.2
+
+    def fetch(self, url):
+        html, error = super().fetch(url)
+        if "hang" in url:
+            return html + f"<!-- marker: {self.marker} -->", error
+        return html, error
+
+
+def slow_build_result_row(store_type, url, html, error):
+    """Spins for 0.6 s on the "hang" page, then writes the marker file."""
+    if "hang" in url and html is not None:
+        until = time.monotonic() + 0.6
+        while time.monotonic() < until:
+            pass
+        with open(html.rsplit("marker: ", 1)[1].split(" -->")[0], "w") as f:
+            f.write(str(os.getpid()))
+    return build_result_row(store_type, url, html, error)
+
+
+def make_jobs():
+    jobs = [{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(5)]
+    jobs.append({"type": "alza", "url": "https://www.alza.cz/hang"})
+    return jobs
+
+
+def test_call_with_deadline():
+    assert call_with_deadline(None, lambda x: x + 1, 1) == 2
+    assert call_with_deadline(1, lambda x: x + 1, 1) == 2
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(0.05, time.sleep, 1)
+    with pytest.raises(ZeroDivisionError):
+        call_with_deadline(1, lambda: 1 / 0)
+
+
+def spin(seconds):
+    until = time.monotonic() + seconds
+    while time.monotonic() < until:
+        pass
+    return seconds
+
+
+def test_call_with_alarm():
+    assert call_with_alarm(None, spin, 0.01) == 0.01
+    assert call_with_alarm(1, spin, 0.01) == 0.01
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        call_with_alarm(0.05, spin, 2)
+    assert time.monotonic() - start < 1
+
+
+def test_feed_abandon_returns_running_jobs():
+    feed = JobFeed(make_jobs(), max_in_flight=3)
+    running = iter(feed)
+    first, second = next(running), next(running)
+    feed.complete(first, {"error": None})
+
+    assert feed.abandon() == [second]
+    assert list(running) == []
+
+
+def test_feed_abandon_returns_duplicate_and_delayed_jobs():
+    job = {"type": "alza", "url": "https://www.alza.cz/1"}
+    feed = JobFeed([job, dict(job), dict(job)], RetryPolicy(retry_count=1, base_delay=60), max_in_flight=3)
+    running = iter(feed)
+    first, second, third = next(running), next(running), next(running)
+    feed.complete(first, {"error": "HTTP 503"})
+
+    unfinished = feed.abandon()
+    assert [job is second or job is third for job in unfinished] == [True, True, False]
+    assert unfinished[2]["attempt"] == 1
+
+
+@pytest.mark.parametrize("engine_class, module", [(AsyncEngine, async_engine), (PipelineEngine, pipeline)])
+def test_job_deadline(monkeypatch, engine_class, module):
+    monkeypatch.setattr(module, "Downloader", SlowDownloader)
+    rows = []
+
+    start = time.monotonic()
+    engine_class(parse_processes=1, job_deadline=0.3).run(make_jobs(), rows.append)
+
+    assert time.monotonic() - start < 2.5
+    errors = {row["url"]: row["error"] for row in rows}
+    assert errors.pop("https://www.alza.cz/hang") == JOB_DEADLINE_ERROR
+    assert set(errors.values()) == {None}
+
+
+@pytest.mark.parametrize("engine_class, module", [(AsyncEngine, async_engine), (PipelineEngine, pipeline)])
+def test_crawl_deadline(monkeypatch, engine_class, module):
+    monkeypatch.setattr(module, "Downloader", SlowDownloader)
+    rows = []
+
+    start = time.monotonic()
+    engine = engine_class(parse_processes=1, crawl_deadline=0.5)
+    processed = engine.run(make_jobs(), rows.append)
+
+    assert time.monotonic() - start < 2.5
+    assert processed == len(rows) == 6
+    assert engine.timed_out == 1
+    assert {row["url"]: row["error"] for row in rows}["https://www.alza.cz/hang"] == CRAWL_DEADLINE_ERROR
+
+
+@pytest.mark.parametrize("engine_class, module", [(AsyncEngine, async_engine), (PipelineEngine, pipeline)])
+def test_abandoned_fetch_keeps_its_domain_slot(monkeypatch, engine_class, module):
+    class HangingOnceDownloader(FakeDownloader):
+        """The first page hangs past the job deadline, the second one does not."""
+
+        def delay_for(self, url):
+            return 0.8 if url.endswith("/1") else 0
+
+    downloaders = DownloaderFactory(HangingOnceDownloader)
+    monkeypatch.setattr(module, "Downloader", downloaders)
+    rows = []
+
+    engine_class(
+        parse_processes=1, per_domain_concurrency=1, job_deadline=0.3,
+        retry_policy=RetryPolicy(retry_count=1, base_delay=0.01)
+    ).run([{"type": "alza", "url": "https://www.alza.cz/1"}, {"type": "alza", "url": "https://www.alza.cz/2"}], rows.append)
+
+    # The second job waits for the domain slot until the abandoned download
+    # ends, and the wait does not count against its own deadline. The job
+    # that overran its deadline is not retried.
+    assert downloaders.downloader.fetched == 2
+    assert downloaders.downloader.peak == {"www.alza.cz": 1}
+    assert {row["url"]: row["error"] for row in rows} == {
+        "https://www.alza.cz/1": JOB_DEADLINE_ERROR, "https://www.alza.cz/2": None
+    }
+
+
+@pytest.mark.parametrize("parse_processes", [1, 2])
+@pytest.mark.parametrize("engine_class, module, options", [
+    (AsyncEngine, async_engine, {}),
+    (PipelineEngine, pipeline, {"fetch_threads": 1}),
+])
+def test_overrunning_extraction_is_killed(monkeypatch, tmp_path, engine_class, module, options, parse_processes):
+    marker = tmp_path / "overrun"
+    monkeypatch.setattr(module, "Downloader", DownloaderFactory(SteadyDownloader, marker=str(marker)))
+    monkeypatch.setattr(module, "build_result_row", slow_build_result_row)
+    jobs = [{"type": "alza", "url": "https://www.alza.cz/hang"}] + make_jobs()[:5]
+    rows = []
+
+    engine_class(parse_processes=parse_processes, job_deadline=0.5, **options).run(jobs, rows.append)
+
+    errors = {row["url"]: row["error"] for row in rows}
+    assert errors.pop("https://www.alza.cz/hang") == JOB_DEADLINE_ERROR
+    assert set(errors.values()) == {None}
+    # The crawl outlived the extraction, whose process was killed instead of abandoned.
+    assert not marker.exists()
@@ -0,0 +1,101 @@
+"""Tests for sitemap / category discovery and the URL frontier."""
+
+import gzip
+import sqlite3
+
+from crawler.discovery import Discovery, canonical_url
+from crawler.frontier import BloomFilter, UrlFrontier
+
+INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://www.alza.cz/sitemap-products.xml.gz</loc></sitemap>
+  <sitemap><loc>https://www.alza.cz/sitemap-index.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+PRODUCTS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://www.alza.cz/phone-d1.htm?utm_source=x</loc></url>
+  <url><loc>https://www.alza.cz/blog/article</loc></url>
+  <url><loc>https://WWW.ALZA.CZ/phone-d2.htm</loc></url>
+</urlset>
+"""
+
+CATEGORY_1 = b"""<html><body>
+<a href="/phone-d2.htm#reviews">Phone 2</a>
+<a class="x" href="/phone-d3.htm">Phone 3</a>
+<a href="https://other.cz/phone-d9.htm">Elsewhere</a>
+<a rel="next" href="/mobily?page=2">Next</a>
+</body></html>"""
+
+CATEGORY_2 = b"""<html><body><a href="/phone-d4.htm">Phone 4</a></body></html>"""
+
+
+def fake_fetch(url):
+    pages = {
+        "https://www.alza.cz/sitemap-index.xml": INDEX,
+        "https://www.alza.cz/sitemap-products.xml.gz": gzip.compress(PRODUCTS),
+        "https://www.alza.cz/mobily": CATEGORY_1,
+        "https://www.alza.cz/mobily?page=2": CATEGORY_2,
+    }
+    if url not in pages:
+        return None, "HTTP 404"
+    return pages[url], None
+
+
+def test_canonical_url():
+    assert canonical_url("/a.htm?utm_source=x&b=2&a=1#top", "https://WWW.alza.cz/x") == "https://www.alza.cz/a.htm?a=1&b=2"
+    assert canonical_url("mailto:info@alza.cz") is None
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    items = [f"https://www.alza.cz/{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"https://www.datart.cz/{i}" in bloom for i in range(1000))
+    assert false_positives < 50
+
+
+def test_discovery_fills_deduplicating_frontier(tmp_path):
+    path = str(tmp_path / "frontier.sqlite")
+    frontier = UrlFrontier(path, capacity=100)
+    store = {"name": "alza", "type": "alza", "discover": {
+        "sitemaps": ["https://www.alza.cz/sitemap-index.xml"],
+        "categories": ["https://www.alza.cz/mobily"],
+        "product_pattern": r"-d\d+\.htm$",
+    }}
+
+    added = Discovery(fake_fetch).discover(store, frontier)
+
+    assert added == 4
+    assert list(frontier.iter_urls("alza", page_size=2)) == [
+        "https://www.alza.cz/phone-d1.htm",
+        "https://www.alza.cz/phone-d2.htm",
+        "https://www.alza.cz/phone-d3.htm",
+        "https://www.alza.cz/phone-d4.htm",
+    ]
+    frontier.close()
+
+    reopened = UrlFrontier(path, capacity=100)
+    assert "https://www.alza.cz/phone-d3.htm" in reopened
+    assert Discovery(fake_fetch).discover(store, reopened) == 0
+    assert len(reopened) == 4
+    reopened.close()
+
+
+def test_frontier_of_an_older_version_gets_hrefs(tmp_path):
+    path = str(tmp_path / "frontier.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, store TEXT NOT NULL)")
+    conn.execute("INSERT INTO urls (url, store) VALUES ('https://www.alza.cz/old', 'alza')")
+    conn.commit()
+    conn.close()
+
+    frontier = UrlFrontier(path, capacity=100)
+    assert frontier.add("alza", "https://www.alza.cz/new", "https://www.alza.cz/new/")
+    assert list(frontier.iter_urls("alza")) == ["https://www.alza.cz/old", "https://www.alza.cz/new/"]
+    assert "https://www.alza.cz/new" in frontier
+    frontier.close()
@@ -0,0 +1,325 @@
+"""Tests for the shared work queue and the coordinator / worker mode.
+
+The workers run as separate processes on this machine and share the queue
+file with the coordinator, like nodes sharing a network path.
+"""
+
+import csv
+import multiprocessing
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from crawler import distributed, work_queue
+from crawler.distributed import Coordinator
+from crawler.metrics import CrawlMetrics
+from crawler.orchestrator import Orchestrator
+from crawler.parser import build_result_row
+from crawler.retry import RetryPolicy
+from crawler.work_queue import WorkQueue
+from tests.conftest import DownloaderFactory, FakeDownloader
+
+def test_expired_leases_are_requeued(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.05)
+    queue.enqueue([{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(3)])
+
+    leased = queue.lease("dead-worker", 2)
+    assert [job["url"] for _, job in leased] == ["https://www.alza.cz/0", "https://www.alza.cz/1"]
+    # The coordinator times a lease from the first poll that sees it.
+    assert queue.requeue_expired() == (0, [])
+    time.sleep(0.1)
+
+    assert queue.requeue_expired() == (2, [])
+    assert queue.complete("dead-worker", leased[0][0], {"url": "late"}) is False
+
+    job_ids = [job_id for job_id, _ in queue.lease("live-worker", 5)]
+    assert len(job_ids) == 3
+    worker_metrics = CrawlMetrics()
+    for job_id in job_ids:
+        worker_metrics.observe_fetch("www.alza.cz", 200, 0.1, 100, None)
+        assert queue.complete("live-worker", job_id, {"url": str(job_id)}, worker_metrics.drain())
+
+    assert queue.unfinished() == 0
+    collected = queue.collect()
+    assert len(collected) == 3
+    assert queue.collect() == []
+
+    # Metrics snapshots travel as JSON and merge like the original ones.
+    metrics = CrawlMetrics()
+    for _, _, _, snapshot in collected:
+        metrics.merge(snapshot)
+    assert metrics.summary()["domains"]["www.alza.cz"]["requests"] == 3
+    queue.close()
+
+
+def test_retries_do_not_count_as_expired_leases(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.05)
+    queue.enqueue([{"type": "alza", "url": "https://www.alza.cz/0"}])
+
+    for _ in range(3):
+        (job_id, _), = queue.lease("worker", 1)
+        assert queue.complete("worker", job_id, {"url": "0", "error": "HTTP 503"})
+        queue.retry(job_id, 0)
+
+    queue.lease("worker", 1)
+    queue.requeue_expired(max_leases=2)
+    time.sleep(0.1)
+    assert queue.requeue_expired(max_leases=2) == (1, [])
+    queue.lease("worker", 1)
+    queue.requeue_expired(max_leases=2)
+    time.sleep(0.1)
+    requeued, given_up = queue.requeue_expired(max_leases=2)
+    assert requeued == 0 and [job["url"] for _, job in given_up] == ["https://www.alza.cz/0"]
+    queue.close()
+
+
+def test_lease_expiry_uses_the_coordinator_clock(tmp_path, monkeypatch):
+    # Wall clocks of the nodes do not matter, even an hour apart.
+    monkeypatch.setattr(work_queue, "time", SimpleNamespace(time=lambda: time.time() - 3600, monotonic=time.monotonic))
+    path = str(tmp_path / "queue.sqlite")
+    coordinator = WorkQueue(path, lease_seconds=0.2)
+    coordinator.reset()
+    coordinator.enqueue([{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(2)])
+
+    worker = WorkQueue(path)
+    assert worker.join_run()
+    (beating_id, _), = worker.lease("beating-worker", 1)
+    (silent_id, _), = worker.lease("silent-worker", 1)
+
+    requeued = 0
+    until = time.monotonic() + 0.5
+    while time.monotonic() < until:
+        assert worker.heartbeat("beating-worker") == 1
+        requeued += coordinator.requeue_expired()[0]
+        time.sleep(0.02)
+
+    assert requeued == 1
+    assert worker.complete("beating-worker", beating_id, {"url": "0"})
+    assert not worker.complete("silent-worker", silent_id, {"url": "1"})
+    coordinator.close()
+    worker.close()
+
+
+def test_workers_wait_for_a_new_run(tmp_path):
+    path = str(tmp_path / "queue.sqlite")
+    jobs = [{"type": "alza", "url": "https://www.alza.cz/0"}]
+    previous = WorkQueue(path)
+    previous.reset()
+    previous.close_queue()
+
+    # A worker started before the coordinator does not take the closed run
+    # of the previous crawl for the current one.
+    worker = WorkQueue(path)
+    assert not worker.join_run()
+
+    coordinator = WorkQueue(path)
+    coordinator.reset()
+    coordinator.enqueue(jobs)
+    assert worker.join_run() and not worker.is_closed()
+    (job_id, _), = worker.lease("worker", 1)
+
+    # The previous coordinator can no longer close the queue.
+    previous.close_queue()
+    assert not worker.is_closed()
+
+    # A newer run ends the worker's run, and its jobs are not the worker's.
+    coordinator.reset()
+    coordinator.enqueue(jobs)
+    assert worker.is_closed()
+    assert worker.lease("worker", 1) == []
+    assert not worker.complete("worker", job_id, {"url": "0"})
+    for queue in (previous, worker, coordinator):
+        queue.close()
+
+
+def _dying_worker(queue_path, flag_path):
+    queue = WorkQueue(queue_path, lease_seconds=0.5)
+    while not queue.join_run() or not queue.lease("dying-worker", 2):
+        time.sleep(0.01)
+    open(flag_path, "w").close()
+    os._exit(0)
+
+
+def _worker(config, flag_path, worker_id):
+    while not os.path.exists(flag_path):
+        time.sleep(0.01)
+    distributed.run_worker(config, worker_id=worker_id)
+
+
+def test_workers_crawl_and_dead_worker_leases_expire(tmp_path, monkeypatch, fake_downloader):
+    monkeypatch.setattr(distributed, "Downloader", fake_downloader)
+    queue_path = str(tmp_path / "shared" / "queue.sqlite")
+    flag_path = str(tmp_path / "leased")
+    urls = [f"https://www.alza.cz/{i}" for i in range(30)]
+    config = {
+        "stores": [{"name": "alza", "type": "alza", "urls": urls}],
+        "engine": "distributed",
+        "distributed": {"queue": queue_path, "lease_seconds": 0.5, "poll_interval": 0.05, "batch_size": 2},
+        "output_dir": str(tmp_path / "output"),
+        "logs_dir": str(tmp_path / "logs"),
+    }
+
+    # The queue still holds the closed run of a previous crawl.
+    previous = WorkQueue(queue_path)
+    previous.reset()
+    previous.close_queue()
+    previous.close()
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_dying_worker, args=(queue_path, flag_path))]
+    processes += [
+        context.Process(target=_worker, args=(config, flag_path, f"worker-{index}"))
+        for index in range(3)
+    ]
+    for process in processes:
+        process.start()
+
+    Orchestrator(config).run()
+
+    for process in processes:
+        process.join(timeout=10)
+        assert process.exitcode == 0
+
+    with open(os.path.join(config["output_dir"], "results.csv"), newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(row["url"] for row in rows) == sorted(urls)
+    assert all(row["price"] == "100,-" for row in rows)
+
+
+class _SlowDownloader(FakeDownloader):
+    delay = 1.0
+
+
+def test_worker_heartbeat_keeps_a_long_job_leased(tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, "Downloader", DownloaderFactory(_SlowDownloader))
+    path = str(tmp_path / "queue.sqlite")
+    config = {"distributed": {"queue": path, "lease_seconds": 0.3, "poll_interval": 0.01}}
+    queue = WorkQueue(path, lease_seconds=0.3)
+    # Any expired lease gives the job up, so a missed heartbeat shows in the row.
+    coordinator = Coordinator(queue, max_leases=0, poll_interval=0.02)
+    worker = threading.Thread(target=distributed.run_worker, args=(config, "worker"))
+    worker.start()
+
+    rows = []
+    coordinator.run([{"type": "alza", "url": "https://www.alza.cz/0"}], rows.append)
+    worker.join(timeout=10)
+    queue.close()
+
+    assert coordinator.requeued == 0
+    assert [row["error"] for row in rows] == [None]
+
+
+def test_worker_interrupts_an_overrunning_extraction(tmp_path, monkeypatch, fake_downloader):
+    monkeypatch.setattr(distributed, "Downloader", fake_downloader)
+
+    def spinning_build_result_row(store_type, url, html, error, metrics=None):
+        until = time.monotonic() + (3 if "spin" in url and html is not None else 0)
+        while time.monotonic() < until:
+            pass
+        return build_result_row(store_type, url, html, error, metrics)
+
+    monkeypatch.setattr(distributed, "build_result_row", spinning_build_result_row)
+    path = str(tmp_path / "queue.sqlite")
+    config = {"distributed": {"queue": path, "poll_interval": 0.01}, "job_deadline": 0.3}
+    jobs = [{"type": "alza", "url": "https://www.alza.cz/spin"}, {"type": "alza", "url": "https://www.alza.cz/ok"}]
+    rows = []
+
+    def coordinate():
+        queue = WorkQueue(path)
+        Coordinator(queue, poll_interval=0.02).run(jobs, rows.append)
+        queue.close()
+
+    crawl = threading.Thread(target=coordinate)
+    crawl.start()
+
+    # The alarm needs the main thread, where `python main.py --worker` runs the worker.
+    start = time.monotonic()
+    distributed.run_worker(config, worker_id="worker")
+    crawl.join(timeout=10)
+
+    assert time.monotonic() - start < 2.5
+    errors = {row["url"]: row["error"] for row in rows}
+    assert errors == {"https://www.alza.cz/spin": "Job deadline exceeded", "https://www.alza.cz/ok": None}
+    # Only an overrunning download replaces the downloader.
+    assert len(fake_downloader.instances) == 1
+
+
+def test_crawl_deadline_records_leased_jobs(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60)
+    jobs = [{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(3)]
+    coordinator = Coordinator(queue, poll_interval=0.01, crawl_deadline=0.3)
+
+    def stuck_worker():
+        worker_queue = WorkQueue(queue.path)
+        while not worker_queue.join_run() or not worker_queue.lease("stuck-worker", 1):
+            time.sleep(0.01)
+        worker_queue.close()
+
+    thread = threading.Thread(target=stuck_worker)
+    thread.start()
+    rows = []
+    coordinator.run(jobs, rows.append)
+    thread.join()
+
+    assert coordinator.timed_out == 1
+    assert [row["error"] for row in rows] == ["Crawl deadline exceeded"]
+    assert queue.is_closed()
+    queue.close()
+
+
+def test_crawl_deadline_records_jobs_waiting_for_a_retry(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60)
+    jobs = [{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(2)]
+    coordinator = Coordinator(
+        queue, retry_policy=RetryPolicy(retry_count=1, base_delay=60), poll_interval=0.01, crawl_deadline=0.3
+    )
+
+    def failing_worker():
+        worker_queue = WorkQueue(queue.path)
+        leased = []
+        while not leased:
+            leased = worker_queue.join_run() and worker_queue.lease("worker", 1)
+            time.sleep(0.01)
+        (job_id, job), = leased
+        worker_queue.complete("worker", job_id, {"url": job["url"], "error": "HTTP 503"})
+        worker_queue.close()
+
+    thread = threading.Thread(target=failing_worker)
+    thread.start()
+    rows = []
+    coordinator.run(jobs, rows.append)
+    thread.join()
+
+    # The job never leased is left for a resumed crawl.
+    assert coordinator.retried == 1
+    assert coordinator.timed_out == 1
+    assert [row["error"] for row in rows] == ["Crawl deadline exceeded"]
+    queue.close()
+
+
+def test_crawl_deadline_writes_results_not_yet_collected(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60)
+    jobs = [{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(2)]
+    coordinator = Coordinator(queue, poll_interval=5, crawl_deadline=0.3)
+
+    def worker():
+        worker_queue = WorkQueue(queue.path)
+        leased = []
+        while not leased:
+            leased = worker_queue.join_run() and worker_queue.lease("worker", 2)
+            time.sleep(0.01)
+        (job_id, job), _ = leased
+        worker_queue.complete("worker", job_id, {"url": job["url"], "price": "100,-", "error": None})
+        worker_queue.close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    rows = []
+    processed = coordinator.run(jobs, rows.append)
+    thread.join()
+
+    assert processed == 2
+    assert coordinator.timed_out == 1
+    assert [row["error"] for row in rows] == [None, "Crawl deadline exceeded"]
+    assert rows[0]["url"] != rows[1]["url"]
+    queue.close()
@@ -0,0 +1,193 @@
+"""Unit tests for the Downloader session handling.
+
+The TLS sessions are replaced by a fake, so no network access is needed.
+"""
+
+import time
+from http.cookiejar import CookieJar
+
+from crawler import downloader as downloader_module
+from crawler.downloader import Downloader
+from crawler.metrics import CrawlMetrics
+from crawler.prewarm import prewarm
+from crawler.session_store import SessionStore, add_cookies
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="<html>" + "x" * 20000 + "</html>"):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = {}
+
+
+class FakeSession:
+    def __init__(self, status_code=200, text=None):
+        self.requested = []
+        self.status_code = status_code
+        self.text = text
+        self.cookies = CookieJar()
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        if url.endswith(".cz/"):
+            add_cookies(self.cookies, [{"name": "sid", "value": "abc", "domain": ".alza.cz"}])
+        if self.text is not None:
+            return FakeResponse(self.status_code, self.text)
+        return FakeResponse(self.status_code)
+
+    def close(self):
+        pass
+
+
+def make_downloader(monkeypatch, session_store=None, status_code=200, text=None, **kwargs):
+    monkeypatch.setattr(downloader_module.time, "sleep", lambda _: None)
+    monkeypatch.setattr(Downloader, "_create_session", lambda self: FakeSession(status_code, text))
+    return Downloader(timeout=1, session_store=session_store, **kwargs)
+
+
+def test_warm_up_once_per_domain(monkeypatch):
+    dl = make_downloader(monkeypatch)
+
+    dl.fetch("https://www.alza.cz/a.htm")
+    dl.fetch("https://www.alza.cz/b.htm")
+
+    session = dl.sessions["www.alza.cz"]
+    assert session.requested == [
+        "https://www.alza.cz/",
+        "https://www.alza.cz/a.htm",
+        "https://www.alza.cz/b.htm",
+    ]
+
+
+def test_one_session_per_domain(monkeypatch):
+    dl = make_downloader(monkeypatch)
+
+    dl.fetch("https://www.alza.cz/a.htm")
+    dl.fetch("https://www.datart.cz/b")
+
+    assert set(dl.sessions) == {"www.alza.cz", "www.datart.cz"}
+    assert dl.sessions["www.datart.cz"].requested == [
+        "https://www.datart.cz/",
+        "https://www.datart.cz/b",
+    ]
+
+
+def test_saved_warm_up_is_reused_within_ttl(monkeypatch, tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    first = make_downloader(monkeypatch, SessionStore(path))
+    first.fetch("https://www.alza.cz/a.htm")
+    first.close()
+
+    second = make_downloader(monkeypatch, SessionStore(path))
+    second.fetch("https://www.alza.cz/b.htm")
+
+    session = second.sessions["www.alza.cz"]
+    assert session.requested == ["https://www.alza.cz/b.htm"]
+    assert [cookie.value for cookie in session.cookies] == ["abc"]
+
+
+def test_expired_warm_up_is_repeated(monkeypatch, tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"), ttl=60)
+    store.save("www.alza.cz", [], warmed_at=time.time() - 120)
+
+    dl = make_downloader(monkeypatch, store)
+    dl.fetch("https://www.alza.cz/a.htm")
+
+    assert dl.sessions["www.alza.cz"].requested[0] == "https://www.alza.cz/"
+
+
+def test_block_forgets_saved_warm_up(monkeypatch, tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    store.save("www.alza.cz", [])
+
+    dl = make_downloader(monkeypatch, store, status_code=403)
+    html, error = dl.fetch("https://www.alza.cz/a.htm")
+
+    assert html is None and error.startswith("HTTP 403")
+    assert store.load("www.alza.cz") is None
+
+
+def test_failed_warm_up_is_not_saved(monkeypatch, tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+
+    blocked = make_downloader(monkeypatch, store, status_code=403)
+    blocked.fetch("https://www.alza.cz/a.htm")
+    blocked.fetch("https://www.alza.cz/b.htm")
+    assert store.load("www.alza.cz") is None
+    # The failed warm-up is not repeated before every request.
+    assert blocked.sessions["www.alza.cz"].requested.count("https://www.alza.cz/") == 1
+
+    captcha = make_downloader(monkeypatch, store, text="<html>Are you a robot?</html>")
+    captcha.fetch("https://www.alza.cz/a.htm")
+    assert store.load("www.alza.cz") is None
+
+
+def test_oversized_body_is_rejected(monkeypatch):
+    dl = make_downloader(monkeypatch, max_body_size=1000)
+
+    html, error = dl.fetch("https://www.alza.cz/a.htm")
+
+    assert html is None
+    assert error.startswith("Response body too large")
+
+
+def test_sitemaps_have_their_own_size_limit(monkeypatch):
+    dl = make_downloader(monkeypatch, max_body_size=1000, max_sitemap_size=100000)
+
+    body, error = dl.fetch_bytes("https://www.alza.cz/sitemap.xml")
+    assert error is None and len(body) > 1000
+
+    dl.max_sitemap_size = 1000
+    body, error = dl.fetch_bytes("https://www.alza.cz/sitemap.xml")
+    assert body is None
+    assert error.startswith("Response body too large")
+
+
+def test_captcha_scan_only_on_small_bodies(monkeypatch):
+    small = make_downloader(monkeypatch, text="<html>Please solve the CAPTCHA</html>")
+    assert small.fetch("https://www.alza.cz/a.htm") == (None, "Captcha detected in content")
+
+    page = "<html><meta name='Robots' content='index'>" + "x" * 20000 + "</html>"
+    large = make_downloader(monkeypatch, text=page)
+    assert large.fetch("https://www.alza.cz/a.htm") == (page, None)
+
+
+def test_prewarmed_state_reaches_other_downloaders(monkeypatch, tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    warm = make_downloader(monkeypatch, store)
+    assert prewarm(warm, {"www.alza.cz": "https://www.alza.cz/"}, resolve_names=False) == {"www.alza.cz": None}
+
+    worker = make_downloader(monkeypatch, store)
+    worker.fetch("https://www.alza.cz/a.htm")
+    assert worker.sessions["www.alza.cz"].requested == ["https://www.alza.cz/a.htm"]
+
+
+def test_prewarm_reports_a_blocked_warm_up(monkeypatch, tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    dl = make_downloader(monkeypatch, store, status_code=403)
+
+    assert dl.warm_up("https://www.alza.cz/") is False
+    assert dl.warm_up("https://www.alza.cz/") is False
+    assert prewarm(dl, {"www.alza.cz": "https://www.alza.cz/"}, resolve_names=False) == {
+        "www.alza.cz": "Warm-up request failed"
+    }
+
+
+def test_fetch_latency_excludes_politeness_waits(monkeypatch):
+    def throttle(domain):
+        until = time.perf_counter() + 0.1
+        while time.perf_counter() < until:
+            pass
+
+    metrics = CrawlMetrics()
+    dl = make_downloader(monkeypatch, throttle=throttle, metrics=metrics)
+
+    dl.fetch("https://www.alza.cz/a.htm")
+
+    domain = metrics.summary()["domains"]["www.alza.cz"]
+    assert domain["fetch_seconds"]["count"] == 1
+    assert domain["fetch_seconds"]["mean"] < 0.05
+    # The warm-up and the page request each waited for their turn.
+    assert domain["wait_seconds"]["count"] == 2
+    assert domain["wait_seconds"]["mean"] >= 0.1
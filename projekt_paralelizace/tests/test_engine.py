@@ -0,0 +1,63 @@
+"""Tests for the declarative JSON-LD extraction engine."""
+
+from crawler.extractors.engine import JsonLdExtractor, StoreSpec
+from crawler.parser import EXTRACTOR_MAP, parse_product, register_store
+
+
+def test_engine_reads_product_from_graph():
+    html = """
+    <h1>Notebook</h1>
+    <script type="application/ld+json">
+    {"@context": "https://schema.org", "@graph": [
+        {"@type": "WebPage"},
+        {"@type": "Product", "image": {"url": "https://img/1.jpg"},
+         "offers": [{"price": 1999, "availability": "https://schema.org/Discontinued"}]}
+    ]}
+    </script>
+    """
+    res = JsonLdExtractor(StoreSpec(store="shop", resolve_image_objects=True))(html, "url")
+
+    assert res == {
+        "url": "url",
+        "name": "Notebook",
+        "price": "1999,-",
+        "availability": "Nedostupné",
+        "image": "https://img/1.jpg",
+        "store": "shop",
+        "price_halere": 199900,
+        "availability_code": "out_of_stock",
+    }
+
+
+def test_engine_skips_invalid_json_and_uses_next_block():
+    html = """
+    <script type="application/ld+json">{ broken</script>
+    <script type="application/ld+json">{"@type": "Product", "offers": {"price": "5"}}</script>
+    """
+    res = JsonLdExtractor(StoreSpec(store="shop"))(html, "url")
+
+    assert res["price"] == "5,-"
+    assert res["name"] == "Unknown"
+
+
+def test_register_store_adds_extractor():
+    spec = StoreSpec(store="czc", availability=(("InStock", "Na skladě"),))
+    try:
+        register_store(spec)
+        html = '<script type="application/ld+json">{"@type": "Product", ' \
+               '"offers": {"availability": "http://schema.org/InStock"}}</script>'
+        res = parse_product("czc", html, "url")
+        assert res["availability"] == "Na skladě"
+        assert res["availability_code"] == "in_stock"
+        assert res["store"] == "czc"
+    finally:
+        EXTRACTOR_MAP.pop("czc", None)
+
+
+def test_availability_code_covers_values_without_a_store_label():
+    html = '<script type="application/ld+json">{"@type": "Product", ' \
+           '"offers": {"price": "5", "availability": "https://schema.org/SoldOut"}}</script>'
+    res = JsonLdExtractor(StoreSpec(store="shop"))(html, "url")
+
+    assert res["availability"] == "Neznámá"
+    assert res["availability_code"] == "out_of_stock"
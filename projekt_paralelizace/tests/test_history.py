@@ -0,0 +1,40 @@
+"""Tests for the price history store."""
+
+from crawler.history import PriceHistory
+
+
+def row(price, availability="Skladem", name="iPhone", error=None):
+    return {"store": "alza", "url": "https://www.alza.cz/p", "name": name,
+            "price": price, "availability": availability, "error": error}
+
+
+def test_history_appends_only_changes(tmp_path):
+    history = PriceHistory(str(tmp_path / "history.sqlite"))
+
+    assert history.record([row("100,-")], observed_at=1.0) == 1
+    assert history.record([row("100,-")], observed_at=2.0) == 0
+    assert history.record([row(None, error="HTTP 503")], observed_at=3.0) == 0
+    assert history.record([row("90,-")], observed_at=4.0) == 1
+    assert history.record([row("90,-", availability="Nedostupné")], observed_at=5.0) == 1
+
+    assert [h["observed_at"] for h in history.history("alza", "https://www.alza.cz/p")] == [1.0, 4.0, 5.0]
+    latest = history.latest("alza", "https://www.alza.cz/p")
+    assert latest["price"] == "90,-"
+    assert latest["availability"] == "Nedostupné"
+    assert latest["first_seen"] == 1.0
+    assert latest["last_changed"] == 5.0
+    history.close()
+
+
+def test_history_snapshot_per_store(tmp_path):
+    history = PriceHistory(str(tmp_path / "history.sqlite"))
+    history.record([
+        row("100,-"),
+        {"store": "datart", "url": "https://www.datart.cz/p", "name": "TV", "price": "5,-",
+         "availability": "Skladem", "error": None},
+    ])
+
+    assert [p["store"] for p in history.snapshot()] == ["alza", "datart"]
+    assert [p["url"] for p in history.snapshot("datart")] == ["https://www.datart.cz/p"]
+    assert history.latest("mironet", "x") is None
+    history.close()
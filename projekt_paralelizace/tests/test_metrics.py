@@ -0,0 +1,95 @@
+"""Tests for the crawl metrics and the downloader / parser hooks."""
+
+import json
+import pickle
+
+from crawler import downloader as downloader_module
+from crawler.downloader import Downloader
+from crawler.metrics import CrawlMetrics, Histogram
+from crawler.parser import build_result_row
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = {}
+
+
+class FakeSession:
+    def get(self, url, **kwargs):
+        if url.endswith(".cz/"):
+            return FakeResponse(200)
+        if "blocked" in url:
+            return FakeResponse(403)
+        if "captcha" in url:
+            return FakeResponse(200, "<html>captcha</html>")
+        return FakeResponse(200, "<html>" + "x" * 20000 + "</html>")
+
+    def close(self):
+        pass
+
+
+def test_histogram_quantile():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    # Past the last bucket the last bound is reported, which stays valid JSON.
+    assert histogram.quantile(1.0) == 1.0
+
+
+def test_prometheus_escapes_label_values():
+    metrics = CrawlMetrics()
+    metrics.inc("crawler_parse_errors_total", store='a"b\\c\nd')
+
+    assert 'store="a\\"b\\\\c\\nd"' in metrics.to_prometheus()
+
+
+def test_drain_and_merge():
+    worker = CrawlMetrics()
+    worker.observe_fetch("www.alza.cz", 200, 0.2, 1000, None)
+    worker.observe_fetch("www.alza.cz", 403, 0.1, 10, "HTTP 403 Forbidden")
+
+    parent = CrawlMetrics()
+    parent.merge(pickle.loads(pickle.dumps(worker.drain())))
+    parent.merge(worker.drain())
+
+    summary = parent.summary()["domains"]["www.alza.cz"]
+    assert summary["requests"] == 2
+    assert summary["status_codes"] == {"200": 1, "403": 1}
+    assert summary["bytes"] == 1010
+    assert summary["blocked_rate"] == 0.5
+    assert summary["fetch_seconds"]["count"] == 2
+
+
+def test_downloader_and_parser_record_metrics(monkeypatch, tmp_path):
+    monkeypatch.setattr(downloader_module.time, "sleep", lambda _: None)
+    monkeypatch.setattr(Downloader, "_create_session", lambda self: FakeSession())
+    metrics = CrawlMetrics()
+    dl = Downloader(timeout=1, metrics=metrics)
+
+    html, _ = dl.fetch("https://www.alza.cz/ok")
+    dl.fetch("https://www.alza.cz/blocked")
+    dl.fetch("https://www.alza.cz/captcha")
+    build_result_row("alza", "https://www.alza.cz/ok", html, None, metrics)
+
+    metrics.write(str(tmp_path))
+    with open(tmp_path / "metrics.json", encoding="utf-8") as f:
+        summary = json.load(f)
+
+    domain = summary["domains"]["www.alza.cz"]
+    assert domain["requests"] == 3
+    assert domain["errors"] == 2
+    assert domain["warm_up_seconds"]["count"] == 1
+    assert round(domain["captcha_rate"], 2) == 0.33
+    assert summary["stores"]["alza"]["parse_seconds"]["count"] == 1
+
+    prom = (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+    assert "# TYPE crawler_fetch_seconds histogram" in prom
+    assert 'crawler_fetch_seconds_bucket{domain="www.alza.cz",le="+Inf"} 3' in prom
+    assert 'crawler_responses_total{domain="www.alza.cz",status="403"} 1' in prom
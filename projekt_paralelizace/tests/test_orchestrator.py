@@ -0,0 +1,240 @@
+"""End-to-end tests of the Orchestrator with a fake downloader (no network)."""
+
+import csv
+import gzip
+import logging
+import os
+import time
+
+from crawler import orchestrator as orchestrator_module
+from crawler.orchestrator import Orchestrator, configure_logging
+from crawler.parser import build_result_row
+from tests.conftest import PAGE
+
+SITEMAP = """<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>https://www.alza.cz/found-1</loc></url>
+<url><loc>https://www.alza.cz/found-2?utm_source=feed</loc></url>
+<url><loc>https://www.alza.cz/found-1</loc></url>
+</urlset>"""
+
+
+class FakeDownloader:
+    """Fails the first request to flaky URLs; the flag file is shared by all workers."""
+
+    def __init__(self, timeout=15, **kwargs):
+        self.flag_dir = os.environ["FAKE_DOWNLOADER_DIR"]
+
+    def fetch(self, url):
+        if "hang" in url:
+            time.sleep(3)
+        if "missing" in url:
+            return None, "HTTP 404 Not Found"
+        if "flaky" in url:
+            flag = os.path.join(self.flag_dir, url.rsplit("/", 1)[-1])
+            if not os.path.exists(flag):
+                open(flag, "w").close()
+                return None, "HTTP 503"
+        return PAGE, None
+
+    def fetch_bytes(self, url):
+        return SITEMAP.encode("utf-8"), None
+
+    def warm_up(self, url):
+        with open(os.path.join(self.flag_dir, "warmed"), "a") as f:
+            f.write(url + "\n")
+        return True
+
+    def close(self):
+        pass
+
+
+def make_config(tmp_path, urls, **extra):
+    config = {
+        "stores": [{"name": "alza", "type": "alza", "urls": urls}],
+        "num_processes": 2,
+        "retry_count": 2,
+        "retry_backoff": 0.01,
+        "output_dir": str(tmp_path / "output"),
+        "logs_dir": str(tmp_path / "logs"),
+    }
+    config.update(extra)
+    return config
+
+
+def read_results(config):
+    with open(os.path.join(config["output_dir"], "results.csv"), newline="", encoding="utf-8") as f:
+        return {row["url"]: row for row in csv.DictReader(f)}
+
+
+def test_process_engine_retries_and_writes_final_rows(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOWNLOADER_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator_module, "Downloader", FakeDownloader)
+    monkeypatch.setattr(orchestrator_module, "_worker_downloader", None)
+    urls = [
+        "https://www.alza.cz/ok",
+        "https://www.alza.cz/flaky-1",
+        "https://www.alza.cz/missing",
+    ]
+    config = make_config(tmp_path, urls)
+
+    Orchestrator(config).run()
+
+    rows = read_results(config)
+    assert set(rows) == set(urls)
+    assert rows["https://www.alza.cz/flaky-1"]["price"] == "100,-"
+    assert rows["https://www.alza.cz/flaky-1"]["error"] == ""
+    assert rows["https://www.alza.cz/missing"]["error"] == "HTTP 404 Not Found"
+
+
+def test_resume_skips_journaled_jobs_and_drops_unjournaled_rows(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOWNLOADER_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator_module, "Downloader", FakeDownloader)
+    monkeypatch.setattr(orchestrator_module, "_worker_downloader", None)
+    first_urls = ["https://www.alza.cz/a", "https://www.alza.cz/b"]
+    config = make_config(tmp_path, first_urls)
+    Orchestrator(config).run()
+
+    results_path = os.path.join(config["output_dir"], "results.csv")
+    journal_path = os.path.join(config["output_dir"], "journal.jsonl")
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write("https://www.alza.cz/c,half written row\n")
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"url": "https://www.alza.cz/c", "sta')
+
+    config = make_config(tmp_path, first_urls + ["https://www.alza.cz/c"])
+    Orchestrator(config, resume=True).run()
+
+    with open(results_path, newline="", encoding="utf-8") as f:
+        urls = [row["url"] for row in csv.DictReader(f)]
+    assert sorted(urls) == ["https://www.alza.cz/a", "https://www.alza.cz/b", "https://www.alza.cz/c"]
+    assert read_results(config)["https://www.alza.cz/c"]["price"] == "100,-"
+
+    with open(journal_path, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 3
+
+
+def test_streams_jobs_from_sources_with_chunks(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOWNLOADER_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator_module, "Downloader", FakeDownloader)
+    monkeypatch.setattr(orchestrator_module, "_worker_downloader", None)
+    urls = [f"https://www.alza.cz/p-{i}" for i in range(50)] + ["https://www.alza.cz/flaky-2"]
+    source = tmp_path / "urls.txt.gz"
+    with gzip.open(source, "wt", encoding="utf-8") as f:
+        f.write("\n".join(urls))
+    config = make_config(tmp_path, [], chunksize=4)
+    config["stores"][0]["sources"] = [{"path": str(source)}]
+
+    Orchestrator(config).run()
+
+    rows = read_results(config)
+    assert set(rows) == set(urls)
+    assert rows["https://www.alza.cz/flaky-2"]["error"] == ""
+
+
+def test_crawls_discovered_urls(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOWNLOADER_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator_module, "Downloader", FakeDownloader)
+    monkeypatch.setattr(orchestrator_module, "_worker_downloader", None)
+    config = make_config(tmp_path, ["https://www.alza.cz/inline"])
+    config["stores"][0]["discover"] = {"sitemaps": ["https://www.alza.cz/sitemap.xml"]}
+
+    Orchestrator(config).run()
+
+    assert set(read_results(config)) == {
+        "https://www.alza.cz/inline", "https://www.alza.cz/found-1", "https://www.alza.cz/found-2"
+    }
+
+
+def test_archived_crawl_is_reparsed_without_downloads(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOWNLOADER_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator_module, "Downloader", FakeDownloader)
+    monkeypatch.setattr(orchestrator_module, "_worker_downloader", None)
+    urls = ["https://www.alza.cz/a", "https://www.alza.cz/b", "https://www.alza.cz/missing"]
+    config = make_config(tmp_path, urls, archive={"path": str(tmp_path / "archive"), "codec": "gzip"})
+    Orchestrator(config).run()
+    os.remove(os.path.join(config["output_dir"], "results.csv"))
+
+    monkeypatch.setattr(orchestrator_module, "Downloader", None)
+    assert Orchestrator(config).reparse() == 2
+
+    rows = read_results(config)
+    assert set(rows) == {"https://www.alza.cz/a", "https://www.alza.cz/b"}
+    assert rows["https://www.alza.cz/a"]["price"] == "100,-"
+
+
+def test_process_engine_deadlines(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOWNLOADER_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator_module, "Downloader", FakeDownloader)
+    monkeypatch.setattr(orchestrator_module, "_worker_downloader", None)
+    urls = ["https://www.alza.cz/ok", "https://www.alza.cz/hang"]
+
+    config = make_config(tmp_path, urls, retry_count=0, job_deadline=0.3)
+    Orchestrator(config).run()
+    assert read_results(config)["https://www.alza.cz/hang"]["error"] == "Job deadline exceeded"
+
+    def spinning_build_result_row(store_type, url, html, error, metrics=None):
+        until = time.monotonic() + (3 if "spin" in url and html is not None else 0)
+        while time.monotonic() < until:
+            pass
+        return build_result_row(store_type, url, html, error, metrics)
+
+    # An extraction is interrupted instead of left running in the worker.
+    monkeypatch.setattr(orchestrator_module, "build_result_row", spinning_build_result_row)
+    config = make_config(tmp_path, ["https://www.alza.cz/ok", "https://www.alza.cz/spin"], retry_count=0, job_deadline=0.3)
+    start = time.monotonic()
+    Orchestrator(config).run()
+    assert time.monotonic() - start < 2.5
+    rows = read_results(config)
+    assert rows["https://www.alza.cz/spin"]["error"] == "Job deadline exceeded"
+    assert rows["https://www.alza.cz/ok"]["error"] == ""
+    monkeypatch.setattr(orchestrator_module, "build_result_row", build_result_row)
+
+    config = make_config(tmp_path, urls, crawl_deadline=0.5)
+    start = time.monotonic()
+    Orchestrator(config).run()
+    assert time.monotonic() - start < 2.5
+    rows = read_results(config)
+    assert rows["https://www.alza.cz/ok"]["error"] == ""
+    assert rows["https://www.alza.cz/hang"]["error"] == "Crawl deadline exceeded"
+
+
+def test_prewarm_runs_before_the_crawl(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOWNLOADER_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator_module, "Downloader", FakeDownloader)
+    monkeypatch.setattr(orchestrator_module, "_worker_downloader", None)
+    urls = ["https://www.alza.cz/a", "https://www.alza.cz/b", "https://www.datart.cz/c"]
+    config = make_config(tmp_path, urls, prewarm={"resolve": False})
+
+    Orchestrator(config).run()
+
+    with open(tmp_path / "warmed") as f:
+        assert sorted(f.read().split()) == ["https://www.alza.cz/", "https://www.datart.cz/"]
+    assert set(read_results(config)) == set(urls)
+
+
+def test_runs_given_jobs_and_reports_rows(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_DOWNLOADER_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator_module, "Downloader", FakeDownloader)
+    monkeypatch.setattr(orchestrator_module, "_worker_downloader", None)
+    config = make_config(tmp_path, ["https://www.alza.cz/configured"])
+    rows = []
+
+    Orchestrator(config).run([{"type": "alza", "url": "https://www.alza.cz/given"}], on_rows=rows.extend)
+
+    assert set(read_results(config)) == {"https://www.alza.cz/given"}
+    assert [(row["url"], row["error"]) for row in rows] == [("https://www.alza.cz/given", None)]
+
+
+def test_logging_is_configured_once_per_directory(tmp_path):
+    root = logging.getLogger()
+    configure_logging(str(tmp_path / "first"))
+    handlers = list(root.handlers)
+    configure_logging(str(tmp_path / "first"))
+    assert root.handlers == handlers
+
+    first = orchestrator_module._log_file_handler
+    configure_logging(str(tmp_path / "second"))
+    second = orchestrator_module._log_file_handler
+    assert second.baseFilename == str(tmp_path / "second" / "crawler.log")
+    assert first not in root.handlers and first.stream is None
+    assert len(root.handlers) == len(handlers)
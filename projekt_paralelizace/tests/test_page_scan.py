@@ -0,0 +1,52 @@
+"""Tests for the fast h1 / JSON-LD page scanner.
+
+The scanner must return the same values as the full BeautifulSoup parse.
+"""
+
+from crawler.extractors.engine import JsonLdExtractor, StoreSpec
+from crawler.extractors.page_scan import parse_page, read_page, scan_page
+
+PAGE = """
+<html>
+<head>
+    <script>var tpl = '<h1>not a heading</h1><script type="application/ld+json">';</script>
+    <!-- <h1>commented out</h1> -->
+    <SCRIPT TYPE='application/ld+json'>{"@type": "BreadcrumbList"}</SCRIPT>
+</head>
+<body>
+    <h1 class="title"> Apple <span>iPhone&nbsp;17</span> &amp; case </h1>
+    <h1>Second</h1>
+    <script type="application/ld+json">{"@type": "Product", "name": "iPhone"}</script>
+</body>
+</html>
+"""
+
+
+def test_scan_matches_full_parse():
+    assert scan_page(PAGE) == parse_page(PAGE)
+
+
+def test_scan_skips_scripts_and_comments():
+    heading, scripts = scan_page(PAGE)
+    assert heading == "AppleiPhone\xa017& case"
+    assert scripts == ['{"@type": "BreadcrumbList"}', '{"@type": "Product", "name": "iPhone"}']
+
+
+def test_read_page_falls_back_on_unclosed_heading():
+    html = '<html><body><h1>Broken <b>heading</b></body></html>'
+    assert scan_page(html) == (None, [])
+    assert read_page(html) == parse_page(html)
+    assert read_page(html)[0] == "Brokenheading"
+
+
+def test_extractor_falls_back_when_scanned_scripts_hold_no_product():
+    html = (
+        '<html><body><h1>Phone</h1>'
+        '<script type="application/ld+json">{"@type": "BreadcrumbList"}</script>'
+        '<script data-note="a>b" type="application/ld+json">'
+        '{"@type": "Product", "offers": {"price": "100"}}</script>'
+        '</body></html>'
+    )
+    assert len(read_page(html)[1]) == 1
+
+    assert JsonLdExtractor(StoreSpec(store="shop"))(html, "url")["price"] == "100,-"
@@ -0,0 +1,60 @@
+"""Tests for the pipelined crawl engine with a fake downloader."""
+
+import threading
+
+from crawler import pipeline
+from crawler.metrics import CrawlMetrics
+from crawler.pipeline import PipelineEngine
+from crawler.retry import RetryPolicy
+from tests.conftest import DownloaderFactory, FakeDownloader
+
+
+class SlowDownloader(FakeDownloader):
+    delay = 1.0
+
+
+def test_pipeline_engine_crawls_with_bounded_stages(monkeypatch, fake_downloader):
+    monkeypatch.setattr(pipeline, "Downloader", fake_downloader)
+    jobs = [{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(60)]
+    jobs.append({"type": "datart", "url": "https://www.datart.cz/404"})
+    jobs.append({"type": "datart", "url": "https://www.datart.cz/flaky"})
+
+    engine = PipelineEngine(
+        fetch_threads=8,
+        parse_processes=1,
+        queue_size=4,
+        per_domain_concurrency=3,
+        retry_policy=RetryPolicy(retry_count=1, base_delay=0.01),
+        metrics=CrawlMetrics()
+    )
+    max_in_flight = engine.fetch_threads + 2 * engine.queue_size + engine.parse_processes
+    rows = []
+    ahead = []
+
+    def on_result(row):
+        rows.append(row)
+        ahead.append(fake_downloader.downloader.fetched - len(rows))
+
+    processed = engine.run(jobs, on_result)
+
+    assert processed == 62
+    assert engine.retried == 1
+    assert fake_downloader.downloader.peak["www.alza.cz"] <= 3
+    assert max(ahead) <= max_in_flight
+    by_url = {row["url"]: row for row in rows}
+    assert by_url["https://www.alza.cz/0"]["price"] == "100,-"
+    assert by_url["https://www.datart.cz/flaky"]["error"] is None
+    assert by_url["https://www.datart.cz/404"]["error"] == "HTTP 404 Not Found"
+    assert engine.metrics.summary()["stores"]["alza"]["parse_seconds"]["count"] == 60
+
+
+def test_pipeline_stopped_by_the_crawl_deadline_ends_its_parse_stage(monkeypatch):
+    monkeypatch.setattr(pipeline, "Downloader", DownloaderFactory(SlowDownloader))
+    jobs = [{"type": "alza", "url": f"https://www.alza.cz/{i}"} for i in range(4)]
+
+    engine = PipelineEngine(fetch_threads=2, parse_processes=1, crawl_deadline=0.3)
+    processed = engine.run(jobs, lambda row: None)
+
+    assert processed == engine.timed_out > 0
+    # The parse stage was idle, waiting for a page, when the deadline passed.
+    assert not [thread for thread in threading.enumerate() if thread.name == "pipeline-parse"]
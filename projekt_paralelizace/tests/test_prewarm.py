@@ -0,0 +1,48 @@
+"""Tests for the concurrent pre-warm of the crawled domains."""
+
+import threading
+import time
+
+from crawler.prewarm import home_urls, prewarm
+
+
+class FakeDownloader:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def warm_up(self, url):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return "broken" not in url
+
+
+def test_home_urls_of_distinct_domains():
+    jobs = [
+        {"url": "https://www.alza.cz/a"},
+        {"url": "https://www.datart.cz/b"},
+        {"url": "https://www.alza.cz/c"},
+        {"url": "http://shop.example:8080/d"},
+    ]
+    assert home_urls(jobs) == {
+        "www.alza.cz": "https://www.alza.cz/",
+        "www.datart.cz": "https://www.datart.cz/",
+        "shop.example:8080": "http://shop.example:8080/",
+    }
+
+
+def test_domains_are_warmed_up_concurrently():
+    downloader = FakeDownloader()
+    urls = {f"shop{i}.cz": f"https://shop{i}.cz/" for i in range(6)}
+    urls["broken.cz"] = "https://broken.cz/"
+
+    results = prewarm(downloader, urls, concurrency=4, resolve_names=False)
+
+    assert downloader.peak == 4
+    assert results.pop("broken.cz") == "Warm-up request failed"
+    assert set(results.values()) == {None}
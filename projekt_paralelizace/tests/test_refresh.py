@@ -0,0 +1,180 @@
+"""Tests for the adaptive refresh schedule and the crawl daemon."""
+
+import json
+import os
+import time
+
+from crawler import daemon as daemon_module
+from crawler.daemon import CrawlDaemon
+from crawler.frontier import UrlFrontier
+from crawler.refresh import RefreshSchedule
+
+STABLE = {"type": "alza", "url": "https://www.alza.cz/stable"}
+VOLATILE = {"type": "alza", "url": "https://www.alza.cz/volatile"}
+
+
+def row(job, price, error=None):
+    return {"store": job["type"], "url": job["url"], "name": "Phone", "price": price,
+            "availability": "Skladem", "error": error}
+
+
+def make_schedule(tmp_path):
+    return RefreshSchedule(
+        str(tmp_path / "schedule.sqlite"),
+        initial_interval=100, min_interval=10, max_interval=1000, speedup=0.5, slowdown=2
+    )
+
+
+def test_intervals_adapt_to_changes(tmp_path):
+    schedule = make_schedule(tmp_path)
+    assert schedule.sync([STABLE, VOLATILE], now=0) == (2, 0)
+    assert schedule.pop_due(10, now=0) == [STABLE, VOLATILE]
+
+    # The first crawl only records the state.
+    assert schedule.complete(STABLE, row(STABLE, "100,-"), now=0) == 100
+    assert schedule.complete(VOLATILE, row(VOLATILE, "100,-"), now=0) == 100
+
+    prices = ["90,-", "80,-", "70,-", "60,-"]
+    for i, price in enumerate(prices, 1):
+        now = i * 1000
+        assert len(schedule.pop_due(10, now=now)) == 2
+        stable = schedule.complete(STABLE, row(STABLE, "100,-"), now=now)
+        volatile = schedule.complete(VOLATILE, row(VOLATILE, price), now=now)
+
+    assert stable == 1000  # 100 * 2^4, capped by max_interval
+    assert volatile == 10  # 100 / 2^4, raised to min_interval
+
+    # A failure keeps the interval and retries after min_interval.
+    now = 10000
+    schedule.pop_due(10, now=now)
+    assert schedule.complete(VOLATILE, row(VOLATILE, None, error="HTTP 503"), now=now) == 10
+    assert schedule.complete(STABLE, None, now=now) == 1000
+    assert schedule.next_due() == now + 10
+    schedule.close()
+
+
+def test_due_order_sync_and_persistence(tmp_path):
+    schedule = make_schedule(tmp_path)
+    schedule.sync([STABLE, VOLATILE], now=0)
+    schedule.pop_due(10, now=0)
+    schedule.complete(VOLATILE, row(VOLATILE, "1,-"), now=50)
+    schedule.complete(STABLE, row(STABLE, "1,-"), now=0)
+
+    assert schedule.pop_due(10, now=99) == []
+    assert schedule.pop_due(1, now=500) == [STABLE]
+    schedule.complete(STABLE, row(STABLE, "1,-"), now=500)
+    schedule.close()
+
+    # Reopened, the schedule keeps the due times; a product removed from the
+    # configuration is dropped.
+    schedule = make_schedule(tmp_path)
+    assert schedule.next_due() == 150
+    assert schedule.sync([STABLE], now=600) == (0, 1)
+    assert schedule.pop_due(10, now=600) == []
+    assert schedule.next_due() == 700
+    schedule.close()
+
+
+class FakeOrchestrator:
+    crawled = []
+
+    def __init__(self, config, resume=False):
+        self.config = config
+
+    def run(self, jobs=None, on_rows=None):
+        jobs = list(jobs)
+        FakeOrchestrator.crawled.append([job["url"] for job in jobs])
+        on_rows([row(job, "100,-") for job in jobs if "down" not in job["url"]])
+
+
+def write_config(path, urls):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "stores": [{"name": "alza", "type": "alza", "urls": urls}],
+            "output_dir": os.path.join(os.path.dirname(path), "output"),
+            "logs_dir": os.path.join(os.path.dirname(path), "logs"),
+            "daemon": {"min_interval": 60, "initial_interval": 3600},
+        }, f)
+
+
+def test_daemon_crawls_due_products_and_reloads_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon_module, "Orchestrator", FakeOrchestrator)
+    FakeOrchestrator.crawled = []
+    config_path = str(tmp_path / "config.json")
+    write_config(config_path, [STABLE["url"], "https://www.alza.cz/down"])
+
+    daemon = CrawlDaemon(config_path)
+    assert daemon.run_once() == 1
+    assert daemon.run_once() == 0
+    assert FakeOrchestrator.crawled == [["https://www.alza.cz/down", STABLE["url"]]]
+    # The product without a row is retried after min_interval.
+    assert daemon.schedule.next_due() < time.time() + 120
+
+    write_config(config_path, [STABLE["url"], VOLATILE["url"]])
+    os.utime(config_path, (1, 1))
+    assert daemon.reload()
+    assert not daemon.reload()
+    assert daemon.run_once() == 1
+    assert FakeOrchestrator.crawled[-1] == [VOLATILE["url"]]
+
+    # An invalid configuration is ignored.
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write("{")
+    os.utime(config_path, (2, 2))
+    assert not daemon.reload()
+    assert len(daemon.schedule) == 2
+    daemon.schedule.close()
+
+    with open(os.path.join(tmp_path, "logs", "crawler.log"), encoding="utf-8") as f:
+        assert "Reloading the configuration failed" in f.read()
+
+
+def test_daemon_closes_the_schedule_of_a_failed_reload(tmp_path, monkeypatch):
+    config_path = str(tmp_path / "config.json")
+    write_config(config_path, [STABLE["url"]])
+    daemon = CrawlDaemon(config_path)
+    previous = daemon.schedule
+
+    closed = []
+    monkeypatch.setattr(RefreshSchedule, "sync", lambda self, jobs, now=None: 1 / 0)
+    monkeypatch.setattr(RefreshSchedule, "close", lambda self: closed.append(self))
+    assert not daemon.reload(force=True)
+
+    assert daemon.schedule is previous
+    assert len(closed) == 1 and closed[0] is not previous
+    monkeypatch.undo()
+    previous.close()
+
+
+
+def test_daemon_schedules_discovered_products(tmp_path, monkeypatch):
+    frontier_path = str(tmp_path / "frontier.sqlite")
+    discovered = ["https://www.alza.cz/found-1"]
+
+    def discover(self):
+        frontier = UrlFrontier(frontier_path, capacity=100)
+        frontier.add_many(("alza", url) for url in discovered)
+        return frontier
+
+    monkeypatch.setattr(daemon_module, "Orchestrator", FakeOrchestrator)
+    monkeypatch.setattr(FakeOrchestrator, "discover", discover, raising=False)
+    FakeOrchestrator.crawled = []
+    config_path = str(tmp_path / "config.json")
+    write_config(config_path, [STABLE["url"]])
+    with open(config_path, encoding="utf-8") as f:
+        config = json.load(f)
+    config["stores"][0]["discover"] = {"sitemaps": ["https://www.alza.cz/sitemap.xml"]}
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    daemon = CrawlDaemon(config_path)
+    assert len(daemon.schedule) == 2
+    assert not daemon.rediscover()
+
+    discovered.append("https://www.alza.cz/found-2")
+    assert daemon.rediscover(now=time.time() + 86400)
+    assert daemon.run_once() == 3
+    assert sorted(FakeOrchestrator.crawled[-1]) == [
+        "https://www.alza.cz/found-1", "https://www.alza.cz/found-2", STABLE["url"]
+    ]
+    daemon.schedule.close()
@@ -0,0 +1,56 @@
+"""Tests for price normalization and the cross-store comparison report."""
+
+import pytest
+
+from crawler.normalize import price_to_halere, product_key, schema_availability_code
+
+
+def test_price_to_halere():
+    assert price_to_halere("29990,-") == 2999000
+    assert price_to_halere("29 990,50 Kč") == 2999050
+    assert price_to_halere(12000) == 1200000
+    assert price_to_halere("1999.9") == 199990
+    assert price_to_halere(19.99) == 1999
+    assert price_to_halere("1.299,90") == 129990
+    assert price_to_halere("1,299.90") == 129990
+    assert price_to_halere("29,990") == 2999000
+    assert price_to_halere("1.299.000 Kč") == 129900000
+    assert price_to_halere("N/A") is None
+    assert price_to_halere(None) is None
+
+
+def test_availability_code_and_product_key():
+    assert schema_availability_code("https://schema.org/PreOrder") == "preorder"
+    assert schema_availability_code("SoldOut") == "out_of_stock"
+    assert schema_availability_code(None) == "unknown"
+    assert product_key("Apple iPhone 17 Pro, stříbrná") == "apple iphone 17 pro stribrna"
+
+
+def test_compare_stores_ranks_cheapest():
+    pytest.importorskip("numpy")
+    from crawler.report import compare_stores, load_columns, report_rows
+
+    rows = [
+        {"name": "iPhone 17", "store": "alza", "price": "30000,-", "price_halere": "3000000"},
+        {"name": "iPhone 17", "store": "datart", "price": "29000,-", "price_halere": ""},
+        {"name": "IPHONE 17", "store": "mironet", "price": "31000,-"},
+        {"name": "iPhone 17", "store": "alza", "price": "29500,-"},
+        {"name": "TV", "store": "datart", "price": "5000,-"},
+        {"name": "TV", "store": "alza", "price": None, "error": "HTTP 404 Not Found"},
+        {"name": "Unknown", "store": "alza", "price": "100,-"},
+        {"name": "Unknown", "store": "datart", "price": "200,-"},
+        {"name": "", "store": "mironet", "price": "300,-"},
+    ]
+
+    report = {row["product"]: row for row in report_rows(compare_stores(load_columns(rows)))}
+
+    iphone = report["iphone 17"]
+    assert iphone["stores"] == 3
+    assert iphone["min_price_halere"] == 2900000
+    assert iphone["max_price_halere"] == 3100000
+    assert iphone["spread_halere"] == 200000
+    assert iphone["cheapest_store"] == "datart"
+    assert iphone["ranking"] == "datart < alza < mironet"
+    assert report["tv"]["stores"] == 1
+    # Pages without a heading are not merged into one product.
+    assert set(report) == {"iphone 17", "tv"}
@@ -0,0 +1,91 @@
+"""Tests for the retry classification and the job feed."""
+
+import threading
+
+from crawler.deadline import CRAWL_DEADLINE_ERROR, JOB_DEADLINE_ERROR
+from crawler.feed import JobFeed
+from crawler.retry import RetryPolicy, is_retryable
+
+
+def test_is_retryable_classification():
+    assert is_retryable("HTTP 503")
+    assert is_retryable("HTTP 429")
+    assert is_retryable("failed to do request: context deadline exceeded (Client.Timeout exceeded)")
+    assert is_retryable("read tcp 10.0.0.1:443: connection reset by peer")
+    assert not is_retryable("HTTP 404 Not Found")
+    assert not is_retryable("HTTP 403 Forbidden (Anti-bot block) - www.alza.cz")
+    assert not is_retryable("Captcha detected in content")
+    assert not is_retryable(None)
+
+
+def test_deadline_errors_are_not_retryable():
+    assert not is_retryable(JOB_DEADLINE_ERROR)
+    assert not is_retryable(CRAWL_DEADLINE_ERROR)
+    assert not RetryPolicy(retry_count=2).should_retry(0, JOB_DEADLINE_ERROR)
+
+
+def test_retry_policy_limits_attempts_and_delay():
+    policy = RetryPolicy(retry_count=2, base_delay=1.0, max_delay=3.0)
+
+    assert policy.should_retry(0, "HTTP 500")
+    assert policy.should_retry(1, "HTTP 500")
+    assert not policy.should_retry(2, "HTTP 500")
+    assert all(0 <= policy.delay(5) <= 3.0 for _ in range(50))
+
+
+def test_job_feed_reinjects_retryable_jobs():
+    jobs = [{"url": "ok"}, {"url": "flaky"}, {"url": "gone"}]
+    feed = JobFeed(jobs, RetryPolicy(retry_count=2, base_delay=0.01), max_in_flight=2)
+    attempts = {}
+    final = []
+
+    def consume():
+        for job in feed:
+            attempts[job["url"]] = attempts.get(job["url"], 0) + 1
+            error = None
+            if job["url"] == "flaky" and job.get("attempt", 0) < 1:
+                error = "HTTP 502"
+            elif job["url"] == "gone":
+                error = "HTTP 404 Not Found"
+            row = {"url": job["url"], "error": error}
+            if feed.complete(job, row):
+                final.append(row)
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert attempts == {"ok": 1, "flaky": 2, "gone": 1}
+    assert sorted((row["url"], row["error"]) for row in final) == [
+        ("flaky", None), ("gone", "HTTP 404 Not Found"), ("ok", None)
+    ]
+    assert feed.retried == 1
+
+
+def test_job_feed_close_unblocks_iterator():
+    feed = JobFeed([{"url": "a"}], max_in_flight=1)
+    iterator = iter(feed)
+    next(iterator)
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(next(iterator, None)))
+    thread.start()
+    feed.close()
+    thread.join(5)
+
+    assert result == [None]
+
+
+def test_job_feed_batches_are_cut_short_instead_of_waiting():
+    feed = JobFeed([{"url": str(i)} for i in range(5)], max_in_flight=10)
+    batches = feed.batches(4)
+
+    first = next(batches)
+    assert [job["url"] for job in first] == ["0", "1", "2", "3"]
+    assert [job["url"] for job in next(batches)] == ["4"]
+
+    for job in first:
+        feed.complete(job, {"error": None})
+    feed.complete({"url": "4"}, {"error": None})
+    assert list(batches) == []
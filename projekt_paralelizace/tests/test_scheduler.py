@@ -0,0 +1,39 @@
+"""Tests for the per-domain politeness scheduler."""
+
+from crawler.scheduler import PolitenessScheduler, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=10.0, burst=3)
+
+    delays = [bucket.reserve() for _ in range(5)]
+
+    assert delays[:3] == [0.0, 0.0, 0.0]
+    assert 0.05 < delays[3] <= 0.1
+    assert 0.15 < delays[4] <= 0.2
+
+
+def test_scheduler_matches_subdomains_and_default():
+    scheduler = PolitenessScheduler({
+        "alza.cz": {"rate": 2.0, "burst": 4},
+        "default": {"rate": 1.0, "burst": 1},
+    })
+
+    alza = scheduler.bucket_for("www.alza.cz")
+    assert alza is scheduler.buckets["alza.cz"]
+    assert alza.burst == 4
+
+    other = scheduler.bucket_for("www.datart.cz")
+    assert other is not alza
+    assert other.rate == 1.0
+    assert scheduler.bucket_for("www.datart.cz") is other
+    # Default buckets are allocated up front, so forked workers share them.
+    assert len(scheduler.default_buckets) == 64
+    assert any(other is bucket for bucket in scheduler.default_buckets)
+
+
+def test_scheduler_without_default_does_not_throttle():
+    scheduler = PolitenessScheduler({"alza.cz": {"rate": 1.0}})
+
+    assert scheduler.bucket_for("www.mironet.cz") is None
+    assert scheduler.reserve("www.mironet.cz") == 0.0
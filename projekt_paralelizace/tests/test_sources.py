@@ -0,0 +1,101 @@
+"""Tests for the streaming job sources."""
+
+import gzip
+import io
+import tracemalloc
+
+import pytest
+
+from crawler.frontier import UrlFrontier
+from crawler.sources import iter_jobs, iter_sitemap_entries, iter_source_urls
+
+SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://www.alza.cz/a.htm</loc><lastmod>2024-01-01</lastmod></url>
+  <url><loc> https://www.alza.cz/b.htm </loc></url>
+</urlset>
+"""
+
+
+def test_text_source_gzip(tmp_path):
+    path = tmp_path / "urls.txt.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("# comment\nhttps://www.alza.cz/a.htm\n\nhttps://www.alza.cz/b.htm\r\n")
+
+    assert list(iter_source_urls({"path": str(path)})) == [
+        "https://www.alza.cz/a.htm", "https://www.alza.cz/b.htm"
+    ]
+
+
+def test_csv_source_column(tmp_path):
+    path = tmp_path / "urls.csv"
+    path.write_text("id,product_url\n1,https://www.alza.cz/a.htm\n2,\n", encoding="utf-8")
+
+    assert list(iter_source_urls({"path": str(path), "column": "product_url"})) == ["https://www.alza.cz/a.htm"]
+    with pytest.raises(ValueError):
+        list(iter_source_urls({"path": str(path)}))
+
+
+def test_sitemap_source(tmp_path):
+    path = tmp_path / "sitemap.xml.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(SITEMAP)
+
+    assert list(iter_source_urls({"path": str(path)})) == [
+        "https://www.alza.cz/a.htm", "https://www.alza.cz/b.htm"
+    ]
+
+
+def test_iter_jobs_alternates_stores_and_skips(tmp_path):
+    path = tmp_path / "datart.txt"
+    path.write_text("https://www.datart.cz/1\nhttps://www.datart.cz/2\n", encoding="utf-8")
+    stores = [
+        {"type": "alza", "urls": ["https://www.alza.cz/1", "https://www.alza.cz/2", "https://www.alza.cz/3"]},
+        {"type": "datart", "sources": [{"path": str(path)}]},
+    ]
+
+    jobs = iter_jobs(stores, skip={"https://www.alza.cz/2"})
+
+    assert next(jobs) == {"type": "alza", "url": "https://www.alza.cz/1"}
+    assert [job["url"] for job in jobs] == [
+        "https://www.datart.cz/1", "https://www.alza.cz/3", "https://www.datart.cz/2"
+    ]
+
+
+def test_sitemap_memory_does_not_grow_with_entries():
+    def peak(entries):
+        data = (
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            + "".join(f"<url><loc>https://www.alza.cz/{i}.htm</loc></url>" for i in range(entries))
+            + "</urlset>"
+        ).encode("utf-8")
+        tracemalloc.start()
+        try:
+            assert sum(1 for _ in iter_sitemap_entries(io.BytesIO(data))) == entries
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak(50000) < 2 * peak(2000)
+
+
+def test_listed_urls_are_checked_against_the_frontier_by_canonical_form(tmp_path):
+    frontier = UrlFrontier(str(tmp_path / "frontier.sqlite"), capacity=100)
+    frontier.add("alza", "https://www.alza.cz/found.htm")
+    stores = [
+        {"name": "alza", "type": "alza", "discover": {"sitemaps": []}, "urls": [
+            "https://www.alza.cz/found.htm?utm_source=feed",
+            "https://WWW.alza.cz/new.htm/",
+            "https://www.alza.cz/new.htm",
+            "mailto:info@alza.cz",
+        ]},
+        {"type": "datart", "urls": ["https://www.alza.cz/found.htm/", "https://www.datart.cz/1?b=2&a=1"]},
+    ]
+
+    # The jobs keep the URLs as listed.
+    expected = ["https://www.alza.cz/found.htm", "https://www.datart.cz/1?b=2&a=1", "https://WWW.alza.cz/new.htm/"]
+    assert [job["url"] for job in iter_jobs(stores, frontier=frontier)] == expected
+    assert len(frontier) == 2
+    # The next run reads the listed URL back from the frontier in its listed form.
+    assert [job["url"] for job in iter_jobs(stores, frontier=frontier)] == expected
+    frontier.close()
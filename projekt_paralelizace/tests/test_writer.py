@@ -0,0 +1,152 @@
+"""Tests for the batched result writer."""
+
+import csv
+import json
+import sqlite3
+import time
+
+import pytest
+
+from crawler.writer import BatchedWriter, CsvSink, create_sink
+
+FIELDS = ["url", "price", "error"]
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_batched_writer_flushes_full_batches(tmp_path):
+    path = str(tmp_path / "results.csv")
+    writer = BatchedWriter(CsvSink(path, FIELDS), batch_size=2, flush_interval=3600)
+
+    writer.write({"url": "a", "price": "1,-", "error": None})
+    assert read_rows(path) == [FIELDS]
+
+    writer.write({"url": "b", "price": "2,-", "error": None})
+    assert len(read_rows(path)) == 3
+
+    writer.write({"url": "c", "price": None, "error": "HTTP 404 Not Found"})
+    writer.close()
+
+    rows = read_rows(path)
+    assert rows[-1] == ["c", "", "HTTP 404 Not Found"]
+    assert writer.rows_written == 3
+
+
+def test_batched_writer_truncates_previous_results(tmp_path):
+    path = tmp_path / "results.csv"
+    path.write_text("old,data\n", encoding="utf-8")
+
+    with BatchedWriter(CsvSink(str(path), FIELDS)) as writer:
+        writer.write({"url": "a", "price": "1,-", "error": None, "extra": "ignored"})
+
+    assert read_rows(str(path)) == [FIELDS, ["a", "1,-", ""]]
+
+
+def test_batched_writer_flushes_old_rows_without_new_writes(tmp_path):
+    path = str(tmp_path / "results.csv")
+    offsets = []
+    writer = BatchedWriter(
+        CsvSink(path, FIELDS),
+        batch_size=100,
+        flush_interval=0.05,
+        on_flush=lambda rows, offset: offsets.append(offset)
+    )
+
+    writer.write({"url": "a", "price": "1,-", "error": None})
+    deadline = time.monotonic() + 5
+    while not offsets and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert read_rows(path) == [FIELDS, ["a", "1,-", ""]]
+    assert writer.rows_written == 1
+    writer.close()
+    assert len(offsets) == 1
+
+
+def test_batched_writer_raises_background_flush_errors(tmp_path):
+    def fail(rows, offset):
+        raise OSError("disk full")
+
+    writer = BatchedWriter(CsvSink(str(tmp_path / "results.csv"), FIELDS), flush_interval=0.01, on_flush=fail)
+    writer.write({"url": "a", "price": "1,-", "error": None})
+    wait_for(lambda: writer._error is not None)
+
+    with pytest.raises(OSError, match="disk full"):
+        writer.write({"url": "b", "price": "2,-", "error": None})
+    assert writer._flusher.is_alive()
+    writer.close()
+
+
+def test_batched_writer_keeps_the_batch_of_a_failed_background_flush(tmp_path):
+    class FlakySink(CsvSink):
+        failures = 1
+
+        def write_rows(self, rows):
+            if self.failures:
+                self.failures -= 1
+                raise OSError("disk full")
+            super().write_rows(rows)
+
+    path = str(tmp_path / "results.csv")
+    writer = BatchedWriter(FlakySink(path, FIELDS), flush_interval=0.01)
+    writer.write({"url": "a", "price": "1,-", "error": None})
+    wait_for(lambda: writer._error is not None)
+
+    with pytest.raises(OSError, match="disk full"):
+        writer.write({"url": "b", "price": "2,-", "error": None})
+    writer.write({"url": "c", "price": "3,-", "error": None})
+    # The flusher keeps running and writes the kept batch with the new rows.
+    wait_for(lambda: writer.rows_written == 2)
+
+    assert read_rows(path) == [FIELDS, ["a", "1,-", ""], ["c", "3,-", ""]]
+    writer.close()
+
+
+def test_sqlite_sink_batches_and_truncates(tmp_path):
+
+    offsets = []
+    sink = create_sink("sqlite", str(tmp_path), FIELDS)
+    with BatchedWriter(sink, batch_size=2, on_flush=lambda rows, offset: offsets.append(offset)) as writer:
+        for i in range(5):
+            writer.write({"url": str(i), "price": f"{i},-", "error": None})
+    assert offsets == [2, 4, 5]
+
+    sink = create_sink("sqlite", str(tmp_path), FIELDS, append=True)
+    assert sink.truncate(4)
+    assert not sink.truncate(10)
+    sink.close()
+
+    conn = sqlite3.connect(str(tmp_path / "results.sqlite"))
+    assert [r[0] for r in conn.execute("SELECT url FROM results ORDER BY rowid")] == ["0", "1", "2", "3"]
+    conn.close()
+
+
+def test_jsonl_sink_writes_objects(tmp_path):
+
+    with BatchedWriter(create_sink("jsonl", str(tmp_path), FIELDS)) as writer:
+        writer.write({"url": "a", "price": "1,-", "error": None, "extra": 1})
+
+    lines = (tmp_path / "results.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{"url": "a", "price": "1,-", "error": None}]
+
+
+def test_parquet_sink_typed_columns(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    sink = create_sink("parquet", str(tmp_path), ["url", "count"], types={"count": int})
+    with BatchedWriter(sink, batch_size=1) as writer:
+        writer.write({"url": "a", "count": 1})
+        writer.write({"url": "b", "count": None})
+
+    table = pq.read_table(str(tmp_path / "results.parquet"))
+    assert str(table.schema.field("count").type) == "int64"
+    assert table.column("url").to_pylist() == ["a", "b"]